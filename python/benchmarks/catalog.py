@@ -0,0 +1,94 @@
+"""Writes synthetic videos files for benchmarks.
+
+Titles are drawn from a word vocabulary and tags from a tag vocabulary,
+both with Zipf-skewed frequencies, so a few words and tags are very
+common and most are rare, as in a real catalog. The number of words per
+title follows a normal distribution, clipped to [1, max_title_words].
+
+Run from the python/ directory:
+
+    python3 -m benchmarks.catalog videos.txt --count 100000
+"""
+
+import argparse
+import itertools
+import random
+
+
+def _zipf_weights(size, exponent):
+    """Returns the cumulative Zipf weights of ranks 1 to size."""
+    return list(itertools.accumulate(
+        1 / rank ** exponent for rank in range(1, size + 1)))
+
+
+def _word(index):
+    """Returns a pronounceable word unique to index."""
+    syllables = ("ka", "lo", "mi", "ne", "ru", "ta", "vo", "zi", "be", "do",
+                 "fa", "gu", "hi", "jo", "pe", "si")
+    word = ""
+    index += len(syllables)
+    while index:
+        index, syllable = divmod(index, len(syllables))
+        word += syllables[syllable]
+    return word
+
+
+def generate_catalog(path, count, seed=0, mean_title_words=5.0,
+                     title_words_deviation=2.0, max_title_words=16,
+                     word_vocabulary=20_000, tag_vocabulary=2_000,
+                     max_tags=5, zipf_exponent=1.1):
+    """Writes a videos file with count videos.
+
+    Args:
+        path: The file to write.
+        count: The number of videos.
+        seed: The seed of the random generator; the same arguments always
+            write the same file.
+        mean_title_words: The mean number of words per title.
+        title_words_deviation: The standard deviation of the number of
+            words per title.
+        max_title_words: The largest number of words per title.
+        word_vocabulary: The number of distinct title words.
+        tag_vocabulary: The number of distinct tags.
+        max_tags: The largest number of tags per video. Each video gets
+            between 0 and max_tags distinct tags.
+        zipf_exponent: The skew of the word and tag frequencies. Higher
+            values concentrate the catalog on fewer words and tags.
+    """
+    rng = random.Random(seed)
+    words = [_word(i) for i in range(word_vocabulary)]
+    word_weights = _zipf_weights(word_vocabulary, zipf_exponent)
+    tags = [f"#{_word(i)}" for i in range(tag_vocabulary)]
+    tag_weights = _zipf_weights(tag_vocabulary, zipf_exponent)
+
+    with open(path, "w") as video_file:
+        for i in range(count):
+            length = round(rng.gauss(mean_title_words, title_words_deviation))
+            length = min(max(length, 1), max_title_words)
+            title = " ".join(rng.choices(
+                words, cum_weights=word_weights, k=length)).capitalize()
+            video_tags = dict.fromkeys(rng.choices(
+                tags, cum_weights=tag_weights, k=rng.randint(0, max_tags)))
+            video_file.write(
+                f"{title} | video_{i:08d}_id | {' , '.join(video_tags)}\n")
+
+
+def main(argv=None):
+    arguments = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arguments.add_argument("path")
+    arguments.add_argument("--count", type=int, default=100_000)
+    arguments.add_argument("--seed", type=int, default=0)
+    arguments.add_argument("--mean-title-words", type=float, default=5.0)
+    arguments.add_argument("--title-words-deviation", type=float,
+                           default=2.0)
+    arguments.add_argument("--max-title-words", type=int, default=16)
+    arguments.add_argument("--word-vocabulary", type=int, default=20_000)
+    arguments.add_argument("--tag-vocabulary", type=int, default=2_000)
+    arguments.add_argument("--max-tags", type=int, default=5)
+    arguments.add_argument("--zipf-exponent", type=float, default=1.1)
+    args = vars(arguments.parse_args(argv))
+    generate_catalog(args.pop("path"), args.pop("count"), **args)
+
+
+if __name__ == "__main__":
+    main()
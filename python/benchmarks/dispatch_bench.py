@@ -0,0 +1,65 @@
+"""Measures the cost of dispatching each command in CommandParser.
+
+The parser drives a player whose methods do nothing, so the numbers only
+cover looking up the command, checking its arguments and calling the
+handler. Each command is timed with the metrics disabled, then enabled.
+
+Run from the python/ directory:
+
+    python3 -m benchmarks.dispatch_bench [iterations]
+"""
+
+import sys
+import timeit
+
+from src.command_parser import CommandParser
+from src.metrics import Metrics
+
+
+class _NullPlayer:
+    """A player that accepts every VideoPlayer call and does nothing."""
+
+    def __getattr__(self, name):
+        return lambda *args: None
+
+
+_COMMANDS = [
+    ["NUMBER_OF_VIDEOS"],
+    ["SHOW_ALL_VIDEOS"],
+    ["PLAY", "video_id"],
+    ["PLAY_RANDOM"],
+    ["STOP"],
+    ["PAUSE"],
+    ["CONTINUE"],
+    ["SHOW_PLAYING"],
+    ["CREATE_PLAYLIST", "playlist"],
+    ["ADD_TO_PLAYLIST", "playlist", "video_id"],
+    ["REMOVE_FROM_PLAYLIST", "playlist", "video_id"],
+    ["CLEAR_PLAYLIST", "playlist"],
+    ["DELETE_PLAYLIST", "playlist"],
+    ["SHOW_PLAYLIST", "playlist"],
+    ["SHOW_ALL_PLAYLISTS"],
+    ["SEARCH_VIDEOS", "term"],
+    ["SEARCH_VIDEOS_WITH_TAG", "#tag"],
+    ["FLAG_VIDEO", "video_id", "reason"],
+    ["ALLOW_VIDEO", "video_id"],
+]
+
+
+def _time(execute, command, iterations):
+    seconds = min(timeit.repeat(
+        lambda: execute(command), number=iterations, repeat=5))
+    return seconds / iterations * 1e9
+
+
+def main(iterations):
+    plain = CommandParser(_NullPlayer()).execute_command
+    timed = CommandParser(_NullPlayer(), metrics=Metrics()).execute_command
+    print(f"{'command':<24}{'disabled':>11}{'metrics':>11}")
+    for command in _COMMANDS:
+        print(f"{command[0]:<24}{_time(plain, command, iterations):8.0f} ns"
+              f"{_time(timed, command, iterations):8.0f} ns")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
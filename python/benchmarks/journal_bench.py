@@ -0,0 +1,83 @@
+"""Measures how long a player takes to recover its state from a journal.
+
+Writes a journal of playlist changes and flags, then times a player
+restoring it from the full journal, and from a compacted snapshot plus a
+short journal tail.
+
+Run from the python/ directory:
+
+    python3 -m benchmarks.journal_bench [number_of_records] [tail_length]
+"""
+
+import io
+import sys
+import tempfile
+import time
+
+from src.state_journal import StateJournal
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+
+
+_PLAYLISTS = 100
+
+
+def _write_records(journal, video_ids, count, start=0):
+    for i in range(start, start + count):
+        name = f"playlist{i % _PLAYLISTS}"
+        video_id = video_ids[i // _PLAYLISTS % len(video_ids)]
+        if i < _PLAYLISTS:
+            journal.append("create", name)
+        elif i % 7 == 0:
+            journal.append("flag", video_id, "benchmark")
+        elif i % 7 == 1:
+            journal.append("allow", video_id)
+        elif i // _PLAYLISTS % 2:
+            journal.append("add", name, video_id)
+        else:
+            journal.append("remove", name, video_id)
+
+
+def _time_recovery(library, directory):
+    start = time.perf_counter()
+    player = VideoPlayer(video_library=library,
+                         journal=StateJournal(directory))
+    elapsed = time.perf_counter() - start
+    player.close()
+    return elapsed
+
+
+def main(count, tail):
+    library = VideoLibrary()
+    video_ids = [video.video_id for video in library.get_all_videos()]
+    with tempfile.TemporaryDirectory() as directory:
+        journal = StateJournal(directory, sync_batch=4096,
+                               snapshot_every=count + tail + 1)
+        list(journal.recover())
+        start = time.perf_counter()
+        _write_records(journal, video_ids, count)
+        journal.sync()
+        elapsed = time.perf_counter() - start
+        journal.close()
+        print(f"append: {count / elapsed:.0f} records/s")
+
+        elapsed = _time_recovery(library, directory)
+        print(f"replay {count} records: {elapsed:.2f} s "
+              f"({elapsed / count * 1e6:.2f} us per record)")
+
+        # Any change made while a snapshot is due compacts the journal.
+        player = VideoPlayer(video_library=library, output=io.StringIO(),
+                             journal=StateJournal(directory, snapshot_every=1))
+        player.create_playlist("compacted")
+        player.close()
+        journal = StateJournal(directory, sync_batch=4096)
+        list(journal.recover())
+        _write_records(journal, video_ids, tail, count)
+        journal.close()
+        elapsed = _time_recovery(library, directory)
+        print(f"snapshot + {tail} record tail: {elapsed * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 10_000)
@@ -0,0 +1,69 @@
+"""Measures how loading a large catalog scales with the number of worker
+processes parsing the videos file.
+
+For each worker count, times parsing the file alone, then loading it into
+a library, whose indexing still runs in the calling process.
+
+Run from the python/ directory:
+
+    python3 -m benchmarks.loader_bench [number_of_videos] [max_workers]
+        [--library video|columnar]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.catalog import generate_catalog
+from src.columnar_library import ColumnarVideoLibrary
+from src.video_file import read_video_file_parallel
+from src.video_library import VideoLibrary
+
+
+_LIBRARIES = {"video": VideoLibrary, "columnar": ColumnarVideoLibrary}
+
+
+def _timed(function):
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    arguments = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arguments.add_argument("count", type=int, nargs="?", default=1_000_000)
+    arguments.add_argument("max_workers", type=int, nargs="?",
+                           default=os.cpu_count() or 1)
+    arguments.add_argument("--library", choices=_LIBRARIES,
+                           default="columnar")
+    args = arguments.parse_args(argv)
+    library_class = _LIBRARIES[args.library]
+
+    worker_counts = [1]
+    while worker_counts[-1] * 2 <= args.max_workers:
+        worker_counts.append(worker_counts[-1] * 2)
+    if worker_counts[-1] != args.max_workers:
+        worker_counts.append(args.max_workers)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "videos.txt"
+        generate_catalog(path, args.count)
+        print(f"{args.count} videos, {path.stat().st_size / 1e6:.0f} MB, "
+              f"{args.library} library")
+        print(f"{'workers':>7}{'parse s':>10}{'speedup':>9}"
+              f"{'load s':>10}{'speedup':>9}")
+        base_parse = base_load = None
+        for workers in worker_counts:
+            parse = _timed(lambda: sum(
+                1 for _ in read_video_file_parallel(path, workers)))
+            load = _timed(lambda: library_class(path, workers=workers))
+            base_parse = base_parse or parse
+            base_load = base_load or load
+            print(f"{workers:>7}{parse:>10.2f}{base_parse / parse:>8.2f}x"
+                  f"{load:>10.2f}{base_load / load:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Measures the memory cost of each video in the catalog.
+
+Run from the python/ directory:
+
+    python3 -m benchmarks.memory_bench [number_of_videos]
+"""
+
+import gc
+import random
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+from src.video import Video
+from src.mapped_library import MappedVideoLibrary
+from src.video_file import _read_video_file
+from src.video_library import VideoLibrary
+
+
+class _LegacyVideo:
+    """The Video layout before slots and tag interning."""
+
+    def __init__(self, video_title, video_id, video_tags):
+        self._title = video_title
+        self._video_id = video_id
+        self._is_playing = False
+        self._is_paused = False
+        self._is_flagged = False
+        self._flag_reason = ""
+        self._tags = tuple(video_tags)
+
+
+def _write_catalog(path, count):
+    rng = random.Random(0)
+    vocabulary = [f"#tag{i}" for i in range(200)]
+    with open(path, "w") as video_file:
+        for i in range(count):
+            tags = " , ".join(rng.sample(vocabulary[:rng.randint(2, 200)], 2))
+            video_file.write(f"Video number {i} | video_{i}_id | {tags}\n")
+
+
+def _measure(build):
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current
+
+
+def main(count):
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "videos.txt"
+        _write_catalog(path, count)
+        records = list(_read_video_file(path))
+
+        def legacy():
+            return {video_id: _LegacyVideo(title, video_id, tags)
+                    for title, video_id, tags in records}
+
+        def compact():
+            library = VideoLibrary(path)
+            return {video_id: Video(title, video_id,
+                                    library._intern_tags(tags))
+                    for title, video_id, tags in records}
+
+        # The titles and ids are shared with the parsed records, so both
+        # measurements only count the video objects and their tags.
+        results = {
+            "legacy videos": _measure(legacy),
+            "slotted videos with interned tags": _measure(compact),
+            "whole VideoLibrary with indexes": _measure(
+                lambda: VideoLibrary(path)),
+            # The mapped file itself lives in the page cache, outside the
+            # Python heap, and is shared by every process mapping it.
+            "MappedVideoLibrary offsets and tables": _measure(
+                lambda: MappedVideoLibrary(path)),
+        }
+
+    for name, total in results.items():
+        print(f"{name}: {total / count:.1f} bytes per video")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
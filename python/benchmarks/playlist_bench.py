@@ -0,0 +1,48 @@
+"""Measures playlist operations as a playlist grows to many videos.
+
+Run from the python/ directory:
+
+    python3 -m benchmarks.playlist_bench [number_of_videos]
+"""
+
+import sys
+import time
+
+from src.video import Video
+from src.video_playlist import Playlist
+
+
+def _timed(name, count, operation):
+    start = time.perf_counter()
+    operation()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<16}{elapsed * 1e3:10.1f} ms {elapsed / count * 1e9:8.0f} "
+          f"ns/op")
+
+
+def main(count):
+    videos = [Video(f"Video {i}", f"video_{i}_id", ()) for i in range(count)]
+    playlist = Playlist("My Playlist", "myplaylist")
+
+    def add_all():
+        for video in videos:
+            if not playlist.has_video(video):
+                playlist.add_video(video)
+
+    def has_all():
+        for video in videos:
+            playlist.has_video(video)
+
+    def remove_all():
+        # Remove from the front, the worst case for a plain list.
+        for video in videos:
+            playlist.remove_video(video)
+
+    _timed("add", count, add_all)
+    _timed("has_video", count, has_all)
+    _timed("iterate", count, lambda: sum(1 for _ in playlist.videos))
+    _timed("remove", count, remove_all)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,183 @@
+"""Measures how the library and player scale with the catalog size.
+
+For each size, a synthetic catalog is generated and the suite measures
+load time, memory, title and tag searches, listings, random play and
+playlist changes. Searches bypass the search cache, so they measure the
+library itself. The results are printed as a table on stderr and as JSON
+on stdout, or in the --output file.
+
+Given the JSON of an earlier run, the suite fails when a measurement got
+slower or bigger than the tolerance allows:
+
+    python3 -m benchmarks.scaling_bench --output baseline.json
+    python3 -m benchmarks.scaling_bench --baseline baseline.json
+
+Run from the python/ directory:
+
+    python3 -m benchmarks.scaling_bench [--sizes 10000,100000,1000000]
+        [--library video|columnar|mapped] [--skip-memory]
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from benchmarks.catalog import generate_catalog, _word
+from src.columnar_library import ColumnarVideoLibrary
+from src.mapped_library import MappedVideoLibrary
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+
+
+_LIBRARIES = {"video": VideoLibrary, "columnar": ColumnarVideoLibrary,
+              "mapped": MappedVideoLibrary}
+_PLAYLIST_SIZE = 1000
+
+
+def _per_call(function, calls, repeat=5):
+    """Returns the median time of one call to function, in microseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for _ in range(calls):
+            function()
+        samples.append((time.perf_counter_ns() - start) / calls / 1e3)
+    return statistics.median(samples)
+
+
+def _seconds(function):
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def _measure_size(library_class, path, count, skip_memory):
+    results = {}
+    gc.collect()
+    start = time.perf_counter()
+    library = library_class(path)
+    results["load_seconds"] = time.perf_counter() - start
+
+    if not skip_memory:
+        gc.collect()
+        tracemalloc.start()
+        measured = library_class(path)
+        results["memory_bytes_per_video"] = (
+            tracemalloc.get_traced_memory()[0] / count)
+        tracemalloc.stop()
+        del measured
+        gc.collect()
+
+    with open(os.devnull, "w") as devnull:
+        player = VideoPlayer(seed=0, video_library=library,
+                             search_cache_size=0, interactive=False,
+                             output=devnull)
+
+        # The vocabularies are Zipf-skewed: word 0 is in a large part of
+        # the titles, word 5000 in a handful.
+        for name, term in (("search_common_us", _word(0)),
+                           ("search_rare_us", _word(5000)),
+                           ("search_short_us", "zi"),
+                           ("search_missing_us", "qqqq")):
+            results[name] = _per_call(lambda: player.find_videos(term), 3)
+        for name, tag in (("tag_search_common_us", f"#{_word(0)}"),
+                          ("tag_search_rare_us", f"#{_word(1500)}")):
+            results[name] = _per_call(
+                lambda: player.find_videos_with_tag(tag), 3)
+
+        middle = count // 2
+        results["list_page_us"] = _per_call(
+            lambda: list(player.iter_all_videos(middle, 100)), 20)
+        results["list_all_seconds"] = _seconds(
+            lambda: list(player.iter_all_videos()))
+        results["random_play_us"] = _per_call(player.play_random_video, 1000)
+
+        video_ids = [video.video_id for video in
+                     library.videos_sorted_by_title(0, _PLAYLIST_SIZE)]
+        player.create_playlist("bench")
+
+        def add_all():
+            for video_id in video_ids:
+                player.add_to_playlist("bench", video_id)
+
+        def remove_all():
+            for video_id in video_ids:
+                player.remove_from_playlist("bench", video_id)
+
+        results["playlist_add_us"] = _seconds(add_all) / len(video_ids) * 1e6
+        results["playlist_show_us"] = _per_call(
+            lambda: player.show_playlist("bench"), 5)
+        results["playlist_remove_us"] = (
+            _seconds(remove_all) / len(video_ids) * 1e6)
+    return results
+
+
+def _regressions(results, baseline, tolerance):
+    """Yields a message for each measurement worse than the baseline."""
+    for size, measurements in results.items():
+        for name, value in measurements.items():
+            before = baseline.get(size, {}).get(name)
+            if before and value > before * (1 + tolerance):
+                yield (f"{name} at {size} videos: {value:.3f} "
+                       f"(baseline {before:.3f}, +{value / before - 1:.0%})")
+
+
+def main(argv=None):
+    arguments = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arguments.add_argument(
+        "--sizes", default="10000,100000,1000000",
+        type=lambda sizes: [int(size) for size in sizes.split(",")])
+    arguments.add_argument("--library", choices=_LIBRARIES, default="video")
+    arguments.add_argument("--skip-memory", action="store_true",
+                           help="skip the memory measurement, which loads "
+                                "each catalog a second time")
+    arguments.add_argument("--output", metavar="FILE",
+                           help="write the JSON results to FILE")
+    arguments.add_argument("--baseline", metavar="FILE",
+                           help="fail if a result is worse than in FILE")
+    arguments.add_argument("--tolerance", type=float, default=0.25,
+                           help="allowed slowdown against the baseline")
+    args = arguments.parse_args(argv)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for count in args.sizes:
+            path = Path(directory) / f"videos_{count}.txt"
+            generate_catalog(path, count)
+            measurements = _measure_size(_LIBRARIES[args.library], path,
+                                         count, args.skip_memory)
+            results[str(count)] = measurements
+            path.unlink()
+            for name, value in measurements.items():
+                print(f"{count:>9} {name:<26}{value:14.3f}", file=sys.stderr)
+
+    report = json.dumps({
+        "benchmark": "scaling",
+        "library": args.library,
+        "python": platform.python_version(),
+        "results": results,
+    }, indent=2)
+    if args.output:
+        Path(args.output).write_text(report + "\n")
+    else:
+        print(report)
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())["results"]
+        regressions = list(_regressions(results, baseline, args.tolerance))
+        for message in regressions:
+            print(f"REGRESSION {message}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""Measures the throughput and latency of the command server.
+
+Opens concurrent client connections, each sending the same mix of commands
+and waiting for every response before sending the next command, and
+reports the commands per second and the latency percentiles.
+
+Run from the python/ directory:
+
+    python3 -m benchmarks.server_bench [clients] [commands_per_client] \
+        [host:port]
+
+Without an address, a server is started inside the benchmark process.
+"""
+
+import asyncio
+import sys
+import time
+
+from src.server import CommandServer, PROMPT
+
+
+_COMMANDS = (
+    "SEARCH_VIDEOS cat",
+    "PLAY_RESULT 1",
+    "SHOW_PLAYING",
+    "SEARCH_VIDEOS_WITH_TAG #dog",
+    "NUMBER_OF_VIDEOS",
+    "PLAY_RANDOM",
+    "SHOW_ALL_VIDEOS --limit 3",
+    "STOP",
+)
+
+
+async def _client(host, port, count, latencies):
+    reader, writer = await asyncio.open_connection(host, port)
+    prompt = PROMPT.encode()
+    await reader.readuntil(prompt)
+    for i in range(count):
+        command = _COMMANDS[i % len(_COMMANDS)]
+        start = time.perf_counter()
+        writer.write(command.encode() + b"\n")
+        await reader.readuntil(prompt)
+        latencies.append(time.perf_counter() - start)
+    writer.write(b"EXIT\n")
+    await reader.read()
+    writer.close()
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def main(clients, count, address):
+    server = None
+    if address is None:
+        server = CommandServer()
+        host, port = await server.start_tcp()
+    else:
+        host, port = address.rsplit(":", 1)
+
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, count, latencies)
+                           for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+    if server is not None:
+        await server.shutdown()
+
+    latencies.sort()
+    print(f"{clients} clients x {count} commands: "
+          f"{len(latencies) / elapsed:.0f} commands/s")
+    print("latency ms: " + ", ".join(
+        f"{name} {_percentile(latencies, fraction) * 1e3:.2f}"
+        for name, fraction in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99),
+                               ("max", 1.0))))
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 50,
+                     int(sys.argv[2]) if len(sys.argv) > 2 else 200,
+                     sys.argv[3] if len(sys.argv) > 3 else None))
@@ -0,0 +1,31 @@
+"""Measures the memory cost of each session of a SessionManager.
+
+Run from the python/ directory:
+
+    python3 -m benchmarks.session_bench [number_of_sessions]
+"""
+
+import gc
+import sys
+import time
+import tracemalloc
+
+from src.session_manager import SessionManager
+
+
+def main(count):
+    manager = SessionManager()
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(count):
+        manager.open_session()
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{count} sessions: {current / count:.0f} bytes and "
+          f"{elapsed / count * 1e6:.1f} us per session")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
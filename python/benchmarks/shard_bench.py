@@ -0,0 +1,82 @@
+"""Compares search latency of a VideoLibrary and ShardedVideoLibrary.
+
+A synthetic catalog is loaded once in a single VideoLibrary and once per
+shard count, and the same title and tag searches are timed against each.
+Sharding pays off when the shards get cores of their own and a search
+does enough work to outweigh sending the results back.
+
+Run from the python/ directory:
+
+    python3 -m benchmarks.shard_bench [number_of_videos] [shard_counts]
+
+for instance python3 -m benchmarks.shard_bench 1000000 1,2,4,8.
+"""
+
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.catalog import generate_catalog, _word
+from src.sharded_library import ShardedVideoLibrary
+from src.video_library import VideoLibrary
+
+
+_QUERIES = (
+    ("search_titles", "common title", _word(0)),
+    ("search_titles", "rare title", _word(5000)),
+    ("search_titles", "missing title", "qqqq"),
+    ("videos_with_tag", "common tag", f"#{_word(0)}"),
+    ("videos_with_tag", "rare tag", f"#{_word(1500)}"),
+)
+
+
+def _per_call(function, calls=5):
+    """Returns the median time of one call to function, in milliseconds."""
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - start) * 1e3)
+    return statistics.median(samples)
+
+
+def _measure(library):
+    return [_per_call(lambda: getattr(library, method)(query))
+            for method, _, query in _QUERIES]
+
+
+def main(count, shard_counts):
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "videos.txt"
+        generate_catalog(path, count)
+
+        columns = {}
+        start = time.perf_counter()
+        library = VideoLibrary(path)
+        load = time.perf_counter() - start
+        columns["single"] = [load * 1e3] + _measure(library)
+        del library
+
+        for shards in shard_counts:
+            start = time.perf_counter()
+            sharded = ShardedVideoLibrary(path, shards=shards)
+            load = time.perf_counter() - start
+            try:
+                columns[f"{shards} shards"] = [load * 1e3] + _measure(sharded)
+            finally:
+                sharded.close()
+
+    print(f"{count} videos, milliseconds")
+    print(f"{'':<16}" + "".join(f"{name:>12}" for name in columns))
+    names = ["load"] + [name for _, name, _ in _QUERIES]
+    for row, name in enumerate(names):
+        print(f"{name:<16}" + "".join(
+            f"{values[row]:12.2f}" for values in columns.values()))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000,
+         [int(shards) for shards in sys.argv[2].split(",")]
+         if len(sys.argv) > 2 else [1, 2, 4])
@@ -0,0 +1,84 @@
+"""Compares a VideoLibrary per worker with one SharedVideoLibrary.
+
+For a synthetic catalog, measures what each worker of a pool pays for its
+catalog: the time to get a usable library and the Python memory it holds,
+for a worker loading its own VideoLibrary and for one attaching to a
+SharedVideoLibrary built by the parent. Searches are timed on both.
+
+Run from the python/ directory:
+
+    python3 -m benchmarks.shared_bench [number_of_videos]
+"""
+
+import gc
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from benchmarks.catalog import generate_catalog, _word
+from src.shared_library import SharedVideoLibrary
+from src.video_library import VideoLibrary
+
+
+def _load(build):
+    """Returns what build returns, the seconds it took and the Python
+    memory it allocated."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    library = build()
+    seconds = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return library, seconds, memory
+
+
+def _per_call(function, calls=5):
+    """Returns the median time of one call to function, in milliseconds."""
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - start) * 1e3)
+    return statistics.median(samples)
+
+
+def main(count):
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "videos.txt"
+        generate_catalog(path, count)
+
+        start = time.perf_counter()
+        shared = SharedVideoLibrary(path)
+        build = time.perf_counter() - start
+        try:
+            libraries = {
+                "own VideoLibrary": _load(lambda: VideoLibrary(path)),
+                "attached shared": _load(
+                    lambda: SharedVideoLibrary.attach(shared.name,
+                                                      shared._lock)),
+            }
+            print(f"{count} videos; the parent builds the shared block in "
+                  f"{build:.2f} s")
+            print(f"{'per worker':<22}{'start s':>10}{'bytes/video':>13}"
+                  f"{'common ms':>11}{'rare ms':>9}{'tag ms':>8}")
+            for name, (library, seconds, memory) in libraries.items():
+                searches = [
+                    _per_call(lambda: library.search_titles(_word(0))),
+                    _per_call(lambda: library.search_titles(_word(5000))),
+                    _per_call(lambda: library.videos_with_tag(
+                        f"#{_word(1500)}")),
+                ]
+                print(f"{name:<22}{seconds:10.3f}{memory / count:13.1f}"
+                      + "".join(f"{value:{width}.2f}" for value, width
+                                in zip(searches, (11, 9, 8))))
+            libraries["attached shared"][0].close()
+        finally:
+            shared.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
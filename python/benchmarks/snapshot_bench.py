@@ -0,0 +1,43 @@
+"""Measures how much a snapshot speeds up loading a VideoLibrary.
+
+For a synthetic catalog, times loading the library from the videos file,
+loading it while compiling a snapshot, and loading it from the snapshot.
+
+Run from the python/ directory:
+
+    python3 -m benchmarks.snapshot_bench [number_of_videos]
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.catalog import generate_catalog
+from src.video_library import VideoLibrary
+
+
+def _timed(function):
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def main(count):
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "videos.txt"
+        snapshot = Path(directory) / "videos.snapshot"
+        generate_catalog(path, count)
+        plain = _timed(lambda: VideoLibrary(path))
+        writing = _timed(lambda: VideoLibrary(path, snapshot))
+        cached = _timed(lambda: VideoLibrary(path, snapshot))
+        print(f"{count} videos, snapshot of "
+              f"{snapshot.stat().st_size / 1e6:.0f} MB")
+        print(f"{'plain load':<24}{plain:8.2f} s")
+        print(f"{'load + write snapshot':<24}{writing:8.2f} s")
+        print(f"{'load from snapshot':<24}{cached:8.2f} s"
+              f"{plain / cached:8.2f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
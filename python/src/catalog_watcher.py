@@ -0,0 +1,85 @@
+"""A watcher reloading a library when its videos file changes."""
+
+import os
+import threading
+
+
+def _file_stamp(path):
+    """Returns what identifies a version of a file: replacing the file or
+    writing to it changes the stamp."""
+    stat = os.stat(path)
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+class CatalogWatcher:
+    """A class used to keep a library in sync with its videos file.
+
+    The file is polled, and the library reloaded once a change has been
+    stable for a whole polling interval, so a file that is still being
+    written is not loaded half way. Listeners receive the CatalogDiff of
+    every reload that changed the library.
+    """
+
+    def __init__(self, video_library, interval=1.0):
+        """CatalogWatcher constructor.
+
+        Args:
+            video_library: The VideoLibrary or ColumnarVideoLibrary to
+                reload.
+            interval: The number of seconds between two polls.
+        """
+        self._video_library = video_library
+        self._interval = interval
+        self._listeners = []
+        self._loaded_stamp = _file_stamp(video_library.video_file)
+        self._seen_stamp = self._loaded_stamp
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def subscribe(self, listener):
+        """Registers a callable called with the CatalogDiff of each
+        reload that changed the library."""
+        self._listeners.append(listener)
+
+    def check(self):
+        """Polls the videos file once and reloads the library if the file
+        changed before the previous poll and not since.
+
+        Returns:
+            The CatalogDiff of the reload, None if there was none.
+        """
+        stamp = _file_stamp(self._video_library.video_file)
+        stable = stamp == self._seen_stamp
+        self._seen_stamp = stamp
+        if not stable or stamp == self._loaded_stamp:
+            return None
+
+        diff = self._video_library.reload()
+        self._loaded_stamp = stamp
+        if diff:
+            for listener in self._listeners:
+                listener(diff)
+        return diff
+
+    def start(self):
+        """Starts polling in a daemon thread."""
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._poll, name="catalog-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops polling and waits for the thread to finish."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _poll(self):
+        while not self._stopped.wait(self._interval):
+            try:
+                self.check()
+            except (OSError, ValueError):
+                # The file is missing or malformed, for instance while it
+                # is being replaced; try again at the next poll.
+                pass
@@ -0,0 +1,518 @@
+"""A column-oriented video library class."""
+
+from .video import Video
+from .library_rows import IdTable, Listeners, _rows_in_title_order, \
+    _set_bit, _test_bit
+from .rwlock import ReadWriteLock, reader, writer
+from .video_file import read_video_file_parallel
+from .video_library import CatalogDiff
+from array import array
+from bisect import bisect_right
+from pathlib import Path
+
+
+# Stale row versions tolerated however small the library is, so a small
+# library is not rewritten on every change.
+_MIN_STALE_ROWS = 64
+
+
+class ColumnarVideoLibrary(Listeners):
+    """A Video Library that stores the catalog column-wise.
+
+    Titles, ids and lowercase titles live in contiguous byte buffers
+    addressed by per-row start/end arrays, tags are stored CSR-style as
+    ranges of a tag id array, and the flag state is a bitmap with a side
+    table for the reasons. A new Video object is built each time a video is
+    returned to the caller and is not kept, so it does not follow later
+    flag changes. It offers the same methods as VideoLibrary, and the same
+    reader/writer locking.
+
+    Replacing a video points its row at newly appended bytes and removing
+    one marks the row as removed, so the row number doubles as the catalog
+    order. The bytes left behind are reclaimed by rewriting the columns
+    once stale row versions outnumber the live rows.
+    """
+
+    def __init__(self, video_file=None, workers=1):
+        """The ColumnarVideoLibrary class is initialized.
+
+        Args:
+            video_file: The videos file to load. Defaults to the videos.txt
+                shipped next to this module.
+            workers: The number of processes parsing the videos file, None
+                for one per CPU.
+        """
+        self._init_columns()
+        self._init_listeners()
+        # Searches and listings share the lock, changes hold it alone.
+        self._lock = ReadWriteLock()
+
+        if video_file is None:
+            video_file = Path(__file__).parent / "videos.txt"
+        self._video_file = video_file
+        self._workers = workers
+        for title, video_id, tags in read_video_file_parallel(video_file,
+                                                              workers):
+            self._store(title, video_id, tags)
+        self._title_order = array(
+            "Q", sorted(self._live_rows(), key=self._order_key))
+
+    def _init_columns(self):
+        self._titles = bytearray()
+        self._title_starts = array("Q")
+        self._title_ends = array("Q")
+        self._ids = bytearray()
+        self._id_starts = array("Q")
+        self._id_ends = array("Q")
+
+        # Lowercase titles, one segment per stored title. The segment
+        # arrays map a buffer position back to its row during a search.
+        self._lower_titles = bytearray()
+        self._lower_starts = array("Q")
+        self._segment_starts = array("Q")
+        self._segment_ends = array("Q")
+        self._segment_rows = array("Q")
+
+        # Live rows sorted by (encoded title, row). UTF-8 byte order is code
+        # point order, so this is the order of the decoded titles. None
+        # while the catalog is loaded, and sorted once afterwards.
+        self._title_order = None
+
+        self._tag_starts = array("Q")
+        self._tag_ends = array("Q")
+        self._tag_ids = array("L")
+        self._tag_names = []
+        self._tag_lookup = {}
+        # Rows of each tag id, and the tag ids of each lowercase tag.
+        self._tag_rows = []
+        self._tag_groups = {}
+
+        self._removed = bytearray()
+        self._flags = bytearray()
+        self._flag_reasons = {}
+        self._playable_rows = array("Q")
+        self._playable_positions = array("q")
+
+        self._id_rows = IdTable(self._id_bytes)
+        self._row_count = 0
+        self._count = 0
+        # Replaced and removed row versions whose bytes are still stored.
+        self._stale_rows = 0
+
+    # Column access
+
+    def _title(self, row):
+        return self._titles[
+            self._title_starts[row]:self._title_ends[row]].decode("utf-8")
+
+    def _id_bytes(self, row):
+        return self._ids[self._id_starts[row]:self._id_ends[row]]
+
+    def _tags(self, row):
+        return tuple(self._tag_names[tag_id] for tag_id in
+                     self._tag_ids[self._tag_starts[row]:self._tag_ends[row]])
+
+    def _order_key(self, row):
+        return self._titles[self._title_starts[row]:self._title_ends[row]], row
+
+    def _order_position(self, row):
+        """Returns where a row belongs in the title order."""
+        key = self._order_key(row)
+        order = self._title_order
+        low, high = 0, len(order)
+        while low < high:
+            middle = (low + high) // 2
+            if self._order_key(order[middle]) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _is_live(self, row):
+        return not _test_bit(self._removed, row)
+
+    def _video(self, row):
+        """Returns a new Video object built from the columns of a row."""
+        video = Video(self._title(row), self._id_bytes(row).decode("utf-8"),
+                      self._tags(row))
+        if _test_bit(self._flags, row):
+            video.flag(self._flag_reasons[row])
+        return video
+
+    # Id lookup
+
+    def _row(self, video_id):
+        """Returns the row of a live video, or None."""
+        row = self._id_rows.get(video_id.encode("utf-8"))
+        if row is None or not self._is_live(row):
+            return None
+        return row
+
+    # Mutation
+
+    def _store(self, title, video_id, tags):
+        """Adds a video, rewriting the row of a live video with the same id
+        in place."""
+        key = video_id.encode("utf-8")
+        row = self._id_rows.get(key)
+        if row is not None and self._is_live(row):
+            self._set_flag(row, None)
+            self._stale_rows += 1
+            if self._title_order is not None:
+                del self._title_order[self._order_position(row)]
+        else:
+            row = self._append_row(key)
+            self._id_rows.put(key, row)
+            self._count += 1
+
+        encoded = title.encode("utf-8")
+        self._title_starts[row] = len(self._titles)
+        self._titles += encoded
+        self._title_ends[row] = len(self._titles)
+        if self._title_order is not None:
+            self._title_order.insert(self._order_position(row), row)
+
+        self._lower_starts[row] = len(self._lower_titles)
+        self._segment_starts.append(len(self._lower_titles))
+        self._segment_rows.append(row)
+        self._lower_titles += title.lower().encode("utf-8")
+        self._segment_ends.append(len(self._lower_titles))
+        # The separator keeps a search from matching across two titles.
+        self._lower_titles.append(0)
+
+        self._tag_starts[row] = len(self._tag_ids)
+        for tag in tags:
+            tag_id = self._tag_id(tag)
+            self._tag_ids.append(tag_id)
+            self._tag_rows[tag_id].append(row)
+        self._tag_ends[row] = len(self._tag_ids)
+
+        self._add_playable(row)
+
+    def _append_row(self, key):
+        row = self._row_count
+        self._row_count += 1
+        self._id_starts.append(len(self._ids))
+        self._ids += key
+        self._id_ends.append(len(self._ids))
+        for column in (self._title_starts, self._title_ends,
+                       self._lower_starts, self._tag_starts, self._tag_ends):
+            column.append(0)
+        self._playable_positions.append(-1)
+        if row >> 3 == len(self._flags):
+            self._flags.append(0)
+            self._removed.append(0)
+        return row
+
+    def _tag_id(self, tag):
+        tag_id = self._tag_lookup.get(tag)
+        if tag_id is None:
+            tag_id = self._tag_lookup[tag] = len(self._tag_names)
+            self._tag_names.append(tag)
+            self._tag_rows.append(array("Q"))
+            self._tag_groups.setdefault(tag.lower(), []).append(tag_id)
+        return tag_id
+
+    def _set_flag(self, row, reason):
+        """Sets the flag of a row, or clears it when reason is None."""
+        if reason is None:
+            _set_bit(self._flags, row, False)
+            self._flag_reasons.pop(row, None)
+        else:
+            _set_bit(self._flags, row, True)
+            self._flag_reasons[row] = reason
+
+    def _add_playable(self, row):
+        if self._playable_positions[row] < 0:
+            self._playable_positions[row] = len(self._playable_rows)
+            self._playable_rows.append(row)
+
+    def _remove_playable(self, row):
+        position = self._playable_positions[row]
+        if position < 0:
+            return
+        self._playable_positions[row] = -1
+        last_row = self._playable_rows.pop()
+        if last_row != row:
+            self._playable_rows[position] = last_row
+            self._playable_positions[last_row] = position
+
+    def _compact_if_stale(self):
+        """Rewrites the columns with the live rows only, once stale row
+        versions outnumber them.
+
+        The live rows keep their relative order, so the catalog order is
+        unchanged, and so do their flags. Row numbers change, so this must
+        only run between two changes, never while rows are being read.
+        """
+        if self._stale_rows <= max(self._count, _MIN_STALE_ROWS):
+            return
+        videos = [(self._title(row), self._id_bytes(row).decode("utf-8"),
+                   self._tags(row), self._flag_reasons.get(row))
+                  for row in self._live_rows()]
+        self._init_columns()
+        for title, video_id, tags, reason in videos:
+            self._store(title, video_id, tags)
+            if reason is not None:
+                row = self._row_count - 1
+                self._set_flag(row, reason)
+                self._remove_playable(row)
+        self._title_order = array(
+            "Q", sorted(self._live_rows(), key=self._order_key))
+
+    @writer
+    def add_video(self, video):
+        """Adds a video to the library, replacing any video with the same id.
+
+        Args:
+            video: The Video object to add.
+        """
+        self._add_video(video)
+        self._compact_if_stale()
+
+    def _add_video(self, video, notify=True):
+        row = (self._row(video.video_id) if notify and self._listeners
+               else None)
+        replaced = None if row is None else self._video(row)
+        self._store(video.title, video.video_id, video.tags)
+        row = self._row(video.video_id)
+        if video.is_flagged:
+            self._set_flag(row, video.flag_reason)
+            self._remove_playable(row)
+        if not notify:
+            return
+        if replaced:
+            self._notify("remove", replaced)
+        self._notify("add", video)
+
+    @writer
+    def remove_video(self, video_id):
+        """Removes a video from the library.
+
+        Args:
+            video_id: The video url.
+
+        Returns:
+            The removed Video object. None if the video does not exist.
+        """
+        video = self._remove_video(video_id)
+        self._compact_if_stale()
+        return video
+
+    def _remove_video(self, video_id, notify=True):
+        row = self._row(video_id)
+        if row is None:
+            return None
+        video = self._video(row)
+        self._remove_playable(row)
+        self._set_flag(row, None)
+        del self._title_order[self._order_position(row)]
+        _set_bit(self._removed, row, True)
+        self._count -= 1
+        self._stale_rows += 1
+        if notify:
+            self._notify("remove", video)
+        return video
+
+    @writer
+    def flag_video(self, video_id, flag_reason):
+        """Marks a video as flagged so it can no longer be played.
+
+        Args:
+            video_id: The video url.
+            flag_reason: Reason for flagging the video.
+
+        Returns:
+            True if the video was flagged, False if it does not exist or was
+            already flagged.
+        """
+        row = self._row(video_id)
+        if row is None or _test_bit(self._flags, row):
+            return False
+        self._set_flag(row, flag_reason)
+        self._remove_playable(row)
+        if self._listeners:
+            self._notify("flag", self._video(row))
+        return True
+
+    @writer
+    def allow_video(self, video_id):
+        """Removes the flag from a video.
+
+        Args:
+            video_id: The video url.
+
+        Returns:
+            True if the flag was removed, False if the video does not exist
+            or was not flagged.
+        """
+        row = self._row(video_id)
+        if row is None or not _test_bit(self._flags, row):
+            return False
+        self._set_flag(row, None)
+        self._add_playable(row)
+        if self._listeners:
+            self._notify("allow", self._video(row))
+        return True
+
+    @property
+    def video_file(self):
+        """Returns the path of the videos file the library was loaded
+        from."""
+        return self._video_file
+
+    def reload(self):
+        """Applies the changes made to the videos file since it was loaded.
+
+        Only the rows of added, removed or changed videos are written, and
+        a changed video keeps its flag. The file is parsed before the
+        library is locked.
+
+        Returns:
+            The CatalogDiff of the applied changes.
+        """
+        records = {video_id: (title, tags) for title, video_id, tags
+                   in read_video_file_parallel(self._video_file,
+                                               self._workers)}
+        return self._apply_records(records)
+
+    @writer
+    def _apply_records(self, records):
+        diff = CatalogDiff()
+        for row in list(self._live_rows()):
+            video_id = self._id_bytes(row).decode("utf-8")
+            if video_id not in records:
+                self._remove_video(video_id, notify=False)
+                diff.removed.append(video_id)
+
+        for video_id, (title, tags) in records.items():
+            row = self._row(video_id)
+            if row is None:
+                diff.added.append(video_id)
+            elif self._title(row) != title or self._tags(row) != tuple(tags):
+                diff.changed.append(video_id)
+            else:
+                continue
+            replacement = Video(title, video_id, tags)
+            if row is not None and _test_bit(self._flags, row):
+                replacement.flag(self._flag_reasons[row])
+            self._add_video(replacement, notify=False)
+        self._compact_if_stale()
+        if diff:
+            self._notify("reload", diff)
+        return diff
+
+    # Queries
+
+    def __len__(self):
+        """Returns the number of videos in the library."""
+        return self._count
+
+    def _live_rows(self):
+        return (row for row in range(self._row_count) if self._is_live(row))
+
+    @reader
+    def get_all_videos(self):
+        """Returns all available video information from the video library."""
+        return [self._video(row) for row in self._live_rows()]
+
+    @reader
+    def get_video(self, video_id):
+        """Returns the video object (title, url, tags) from the video library.
+
+        Args:
+            video_id: The video url.
+
+        Returns:
+            The Video object for the requested video_id. None if the video
+            does not exist.
+        """
+        row = self._row(video_id)
+        return None if row is None else self._video(row)
+
+    def _in_title_order(self, rows):
+        """Returns the videos of the given rows sorted by title."""
+        return [self._video(row) for row in _rows_in_title_order(
+            rows, self._title_order, self._order_key)]
+
+    @reader
+    def videos_sorted_by_title(self, offset=0, limit=None):
+        """Returns all videos sorted by title.
+
+        Videos with the same title are in the order of get_all_videos.
+
+        Args:
+            offset: The number of videos to skip.
+            limit: The maximum number of videos to return, None for all.
+        """
+        stop = None if limit is None else offset + limit
+        return [self._video(row) for row in self._title_order[offset:stop]]
+
+    @reader
+    def search_titles(self, search_term):
+        """Returns all videos whose title contains the search term.
+
+        The comparison is case insensitive. The lowercase title buffer is
+        scanned with bytes.find; each hit is mapped back to its row and
+        the scan resumes after that row's title.
+
+        Args:
+            search_term: The text to look for in the video titles.
+
+        Returns:
+            A list of Video objects, in the same order as
+            videos_sorted_by_title.
+        """
+        term = search_term.lower().encode("utf-8")
+        buffer = self._lower_titles
+        rows = set()
+        position = buffer.find(term) if buffer else -1
+        while position >= 0:
+            segment = bisect_right(self._segment_starts, position) - 1
+            start = self._segment_starts[segment]
+            end = self._segment_ends[segment]
+            row = self._segment_rows[segment]
+            if (position + len(term) <= end
+                    and self._lower_starts[row] == start
+                    and self._is_live(row)):
+                rows.add(row)
+                position = buffer.find(term, end + 1)
+            else:
+                position = buffer.find(term, position + 1)
+        return self._in_title_order(rows)
+
+    @reader
+    def videos_with_tag(self, video_tag):
+        """Returns all videos that have the given tag.
+
+        The comparison is case insensitive.
+
+        Args:
+            video_tag: The tag to look for.
+
+        Returns:
+            A list of Video objects, in the same order as
+            videos_sorted_by_title.
+        """
+        rows = set()
+        for tag_id in self._tag_groups.get(video_tag.lower(), ()):
+            for row in self._tag_rows[tag_id]:
+                if (self._is_live(row) and tag_id in self._tag_ids[
+                        self._tag_starts[row]:self._tag_ends[row]]):
+                    rows.add(row)
+        return self._in_title_order(rows)
+
+    @reader
+    def random_playable_video(self, rng):
+        """Returns a random video that is not flagged.
+
+        Args:
+            rng: The random.Random instance used to draw the video.
+
+        Returns:
+            A Video object. None if every video is flagged.
+        """
+        if not self._playable_rows:
+            return None
+        return self._video(
+            self._playable_rows[rng.randrange(len(self._playable_rows))])
@@ -1,6 +1,7 @@
 """A command parser class."""
 
 import textwrap
+import time
 from typing import Sequence
 
 
@@ -9,137 +10,218 @@ class CommandException(Exception):
     pass
 
 
+class _Command:
+    """A registered command: its handler and the arguments it accepts."""
+
+    __slots__ = ("handler", "arities", "usage", "paginated")
+
+    def __init__(self, handler, arities, usage, paginated):
+        self.handler = handler
+        self.arities = arities
+        self.usage = usage
+        self.paginated = paginated
+
+
+# Options accepted by the commands that list videos.
+_PAGE_OPTIONS = {"--limit": "limit", "--offset": "offset"}
+
+
+def _parse_page_options(arguments):
+    """Splits the --limit and --offset options from the other arguments.
+
+    Returns:
+        The remaining arguments and a dict of keyword arguments for the
+        handler.
+    """
+    remaining = []
+    options = {}
+    words = iter(arguments)
+    for word in words:
+        option, equals, value = word.partition("=")
+        if option.lower() not in _PAGE_OPTIONS:
+            remaining.append(word)
+            continue
+        if not equals:
+            value = next(words, "")
+        if not value.isdecimal():
+            raise CommandException(
+                f"Please enter a non-negative number after {option}.")
+        options[_PAGE_OPTIONS[option.lower()]] = int(value)
+    return remaining, options
+
+
 class CommandParser:
     """A class used to parse and execute a user Command."""
 
-    def __init__(self, video_player):
+    # The built-in commands as (name, VideoPlayer method, argument counts,
+    # error message shown when the argument count is not accepted). Commands
+    # listing videos also accept the --limit and --offset options.
+    _PLAYER_COMMANDS = (
+        ("NUMBER_OF_VIDEOS", "number_of_videos", None, ""),
+        ("SHOW_ALL_VIDEOS", "show_all_videos", None, ""),
+        ("PLAY", "play_video", (1,),
+         "Please enter PLAY command followed by video_id."),
+        ("PLAY_RANDOM", "play_random_video", None, ""),
+        ("STOP", "stop_video", None, ""),
+        ("PAUSE", "pause_video", None, ""),
+        ("CONTINUE", "continue_video", None, ""),
+        ("SHOW_PLAYING", "show_playing", None, ""),
+        ("CREATE_PLAYLIST", "create_playlist", (1,),
+         "Please enter CREATE_PLAYLIST command followed by a "
+         "playlist name."),
+        ("ADD_TO_PLAYLIST", "add_to_playlist", (2,),
+         "Please enter ADD_TO_PLAYLIST command followed by a "
+         "playlist name and video_id to add."),
+        ("REMOVE_FROM_PLAYLIST", "remove_from_playlist", (2,),
+         "Please enter REMOVE_FROM_PLAYLIST command followed by a "
+         "playlist name and video_id to remove."),
+        ("CLEAR_PLAYLIST", "clear_playlist", (1,),
+         "Please enter CLEAR_PLAYLIST command followed by a "
+         "playlist name."),
+        ("DELETE_PLAYLIST", "delete_playlist", (1,),
+         "Please enter DELETE_PLAYLIST command followed by a "
+         "playlist name."),
+        ("SHOW_PLAYLIST", "show_playlist", (1,),
+         "Please enter SHOW_PLAYLIST command followed by a "
+         "playlist name."),
+        ("SHOW_ALL_PLAYLISTS", "show_all_playlists", None, ""),
+        ("SEARCH_VIDEOS_WITH_TAG", "search_videos_tag", (1,),
+         "Please enter SEARCH_VIDEOS_WITH_TAG command followed by a "
+         "video tag."),
+        ("PLAY_RESULT", "play_result", (1,),
+         "Please enter PLAY_RESULT command followed by the number of a "
+         "search result."),
+        ("FLAG_VIDEO", "flag_video", (1, 2),
+         "Please enter FLAG_VIDEO command followed by a "
+         "video_id and an optional flag reason."),
+        ("ALLOW_VIDEO", "allow_video", (1,),
+         "Please enter ALLOW_VIDEO command followed by a "
+         "video_id."),
+    )
+
+    _PAGINATED_COMMANDS = frozenset((
+        "SHOW_ALL_VIDEOS", "SHOW_PLAYLIST", "SEARCH_VIDEOS",
+        "SEARCH_VIDEOS_WITH_TAG"))
+
+    def __init__(self, video_player, output=None, metrics=None):
+        """CommandParser constructor.
+
+        Args:
+            video_player: The VideoPlayer executing the commands.
+            output: The text stream the parser writes to. Defaults to the
+                current sys.stdout.
+            metrics: Optional Metrics recording the latency and errors of
+                every command. None disables the timing.
+        """
         self._player = video_player
+        self._output = output
+        self._metrics = metrics
+        self._commands = {}
+        for name, method, arities, usage in self._PLAYER_COMMANDS:
+            self.register_command(
+                name, getattr(video_player, method), arities, usage,
+                paginated=name in self._PAGINATED_COMMANDS)
+        self.register_command(
+            "SEARCH_VIDEOS", self._search_videos, (1, 3),
+            "Please enter SEARCH_VIDEOS command followed by a "
+            "search term and optionally TOP and a number of results.",
+            paginated=True)
+        self.register_command("STATS", self._show_stats)
+        self.register_command("HELP", self._get_help)
+
+    def register_command(self, name, handler, arities=None, usage="",
+                         paginated=False):
+        """Registers a command, replacing any command with the same name.
+
+        Args:
+            name: The command name, matched case insensitively.
+            handler: The callable executing the command. It is called with
+                the command arguments.
+            arities: The accepted numbers of arguments. None means the
+                command takes no arguments and ignores any that are given.
+            usage: The message of the CommandException raised when the
+                number of arguments is not accepted.
+            paginated: Whether the command accepts the --limit and
+                --offset options, which are passed to the handler as the
+                limit and offset keyword arguments.
+        """
+        self._commands[name.upper()] = _Command(
+            handler, arities, usage, paginated)
 
     def execute_command(self, command: Sequence[str]):
         """Executes the user command. Expects the command to be upper case.
            Raises CommandException if a command cannot be parsed.
         """
+        metrics = self._metrics
+        if metrics is None:
+            self._execute_command(command)
+            return
+
+        # Unknown commands share one name, so bad input cannot grow the
+        # metrics without bound.
+        name = command[0].upper() if command else ""
+        if name not in self._commands:
+            name = "UNKNOWN"
+        start = time.perf_counter_ns()
+        failed = True
+        try:
+            self._execute_command(command)
+            failed = name == "UNKNOWN"
+        finally:
+            metrics.observe(name, time.perf_counter_ns() - start, failed)
+
+    def _execute_command(self, command):
         if not command:
             raise CommandException(
                 "Please enter a valid command, "
                 "type HELP for a list of available commands.")
 
-        if command[0].upper() == "NUMBER_OF_VIDEOS":
-            self._player.number_of_videos()
-
-        elif command[0].upper() == "SHOW_ALL_VIDEOS":
-            self._player.show_all_videos()
-
-        elif command[0].upper() == "PLAY":
-            if len(command) != 2:
-                raise CommandException(
-                    "Please enter PLAY command followed by video_id.")
-            self._player.play_video(command[1])
-
-        elif command[0].upper() == "PLAY_RANDOM":
-            self._player.play_random_video()
-
-        elif command[0].upper() == "STOP":
-            self._player.stop_video()
-
-        elif command[0].upper() == "PAUSE":
-            self._player.pause_video()
-
-        elif command[0].upper() == "CONTINUE":
-            self._player.continue_video()
-
-        elif command[0].upper() == "SHOW_PLAYING":
-            self._player.show_playing()
-
-        elif command[0].upper() == "CREATE_PLAYLIST":
-            if len(command) != 2:
-                raise CommandException(
-                    "Please enter CREATE_PLAYLIST command followed by a "
-                    "playlist name.")
-            self._player.create_playlist(command[1])
-
-        elif command[0].upper() == "ADD_TO_PLAYLIST":
-            if len(command) != 3:
-                raise CommandException(
-                    "Please enter ADD_TO_PLAYLIST command followed by a "
-                    "playlist name and video_id to add.")
-            self._player.add_to_playlist(command[1], command[2])
-
-        elif command[0].upper() == "REMOVE_FROM_PLAYLIST":
-            if len(command) != 3:
-                raise CommandException(
-                    "Please enter REMOVE_FROM_PLAYLIST command followed by a "
-                    "playlist name and video_id to remove.")
-            self._player.remove_from_playlist(command[1], command[2])
-
-        elif command[0].upper() == "CLEAR_PLAYLIST":
-            if len(command) != 2:
-                raise CommandException(
-                    "Please enter CLEAR_PLAYLIST command followed by a "
-                    "playlist name.")
-            self._player.clear_playlist(command[1])
-
-        elif command[0].upper() == "DELETE_PLAYLIST":
-            if len(command) != 2:
-                raise CommandException(
-                    "Please enter DELETE_PLAYLIST command followed by a "
-                    "playlist name.")
-            self._player.delete_playlist(command[1])
-
-        elif command[0].upper() == "SHOW_PLAYLIST":
-            if len(command) != 2:
-                raise CommandException(
-                    "Please enter SHOW_PLAYLIST command followed by a "
-                    "playlist name.")
-            self._player.show_playlist(command[1])
-
-        elif command[0].upper() == "SHOW_ALL_PLAYLISTS":
-            self._player.show_all_playlists()
-
-        elif command[0].upper() == "SEARCH_VIDEOS":
-            if len(command) != 2:
-                raise CommandException(
-                    "Please enter SEARCH_VIDEOS command followed by a "
-                    "search term.")
-            self._player.search_videos(command[1])
-
-        elif command[0].upper() == "SEARCH_VIDEOS_WITH_TAG":
-            if len(command) != 2:
-                raise CommandException(
-                    "Please enter SEARCH_VIDEOS_WITH_TAG command followed by a "
-                    "video tag.")
-            self._player.search_videos_tag(command[1])
-
-        elif command[0].upper() == "FLAG_VIDEO":
-            if len(command) == 3:
-                self._player.flag_video(command[1], command[2])
-            elif len(command) == 2:
-                self._player.flag_video(command[1])
-            else:
-                raise CommandException(
-                    "Please enter FLAG_VIDEO command followed by a "
-                    "video_id and an optional flag reason.")
-
-        elif command[0].upper() == "ALLOW_VIDEO":
-            if len(command) != 2:
-                raise CommandException(
-                    "Please enter ALLOW_VIDEO command followed by a "
-                    "video_id.")
-            self._player.allow_video(command[1])
-
-        elif command[0].upper() == "HELP":
-            self._get_help()
-        else:
+        registered = self._commands.get(command[0].upper())
+        if registered is None:
             print(
                 "Please enter a valid command, type HELP for a list of "
-                "available commands.")
+                "available commands.", file=self._output)
+            return
+
+        arguments = command[1:]
+        options = {}
+        if registered.paginated:
+            arguments, options = _parse_page_options(arguments)
+        if registered.arities is None:
+            registered.handler(**options)
+        elif len(arguments) in registered.arities:
+            registered.handler(*arguments, **options)
+        else:
+            raise CommandException(registered.usage)
+
+    def _search_videos(self, search_term, *top, **page_options):
+        """Runs SEARCH_VIDEOS <search_term> [TOP <k>]."""
+        if not top:
+            self._player.search_videos(search_term, **page_options)
+            return
+        if (top[0].upper() != "TOP" or not top[1].isdecimal()
+                or int(top[1]) < 1):
+            raise CommandException(
+                "Please enter SEARCH_VIDEOS command followed by a "
+                "search term and optionally TOP and a number of results.")
+        if page_options:
+            raise CommandException(
+                "Please use either TOP or --limit and --offset.")
+        self._player.search_videos_top(search_term, int(top[1]))
+
+    def _show_stats(self):
+        """Displays the call counts and latencies of the commands."""
+        if self._metrics is None:
+            print("Statistics are not being collected.", file=self._output)
+            return
+        print(self._metrics.format_stats(), file=self._output)
 
     def _get_help(self):
         """Displays all available commands to the user."""
         help_text = textwrap.dedent("""
         Available commands:
             NUMBER_OF_VIDEOS - Shows how many videos are in the library.
-            SHOW_ALL_VIDEOS - Lists all videos from the library.
+            SHOW_ALL_VIDEOS [--limit N] [--offset M] - Lists all videos from the library.
             PLAY <video_id> - Plays specified video.
             PLAY_RANDOM - Plays a random video from the library.
             STOP - Stop the current video.
@@ -151,13 +233,17 @@ class CommandParser:
             REMOVE_FROM_PLAYLIST <playlist_name> <video_id> - Removes the specified video from the specified playlist
             CLEAR_PLAYLIST <playlist_name> - Removes all the videos from the playlist.
             DELETE_PLAYLIST <playlist_name> - Deletes the playlist.
-            SHOW_PLAYLIST <playlist_name> - List all the videos in this playlist.
+            SHOW_PLAYLIST <playlist_name> [--limit N] [--offset M] - List all the videos in this playlist.
             SHOW_ALL_PLAYLISTS - Display all the available playlists.
-            SEARCH_VIDEOS <search_term> - Display all the videos whose titles contain the search_term.
-            SEARCH_VIDEOS_WITH_TAG <tag_name> -Display all videos whose tags contains the provided tag.
+            SEARCH_VIDEOS <search_term> [--limit N] [--offset M] - Display all the videos whose titles contain the search_term.
+            SEARCH_VIDEOS <search_term> TOP <k> - Display the k best matches, whole-word and earlier matches first.
+            SEARCH_VIDEOS_WITH_TAG <tag_name> [--limit N] [--offset M] -Display all videos whose tags contains the provided tag.
+            PLAY_RESULT <number> - Plays one of the results of the last search.
             FLAG_VIDEO <video_id> <flag_reason> - Mark a video as flagged.
             ALLOW_VIDEO <video_id> - Removes a flag from a video.
+            STATS - Displays the call counts, errors and latencies of the commands.
             HELP - Displays help.
+            --limit N and --offset M show at most N results, after skipping the first M.
             EXIT - Terminates the program execution.
         """)
-        print(help_text)
+        print(help_text, file=self._output)
@@ -0,0 +1,119 @@
+"""Building blocks shared by the video library classes storing rows.
+
+The columnar, mapped, sharded and shared libraries keep each video in a
+numbered row instead of a Video object. This module holds what they have
+in common: flag bitmaps, the hash table from video id to row, the title
+order walk and the listeners notified of changes.
+"""
+
+from array import array
+import threading
+import zlib
+
+
+def _test_bit(bitmap, row):
+    return bitmap[row >> 3] & (1 << (row & 7))
+
+
+def _set_bit(bitmap, row, value):
+    if value:
+        bitmap[row >> 3] |= 1 << (row & 7)
+    else:
+        bitmap[row >> 3] &= ~(1 << (row & 7)) & 0xFF
+
+
+def _rows_in_title_order(rows, title_order, order_key):
+    """Returns the given rows sorted by title.
+
+    Small sets are sorted directly, large ones are collected by walking
+    the title order, whichever takes fewer steps.
+
+    Args:
+        rows: A set of rows.
+        title_order: Every row, sorted by order_key.
+        order_key: The function returning the sort key of a row.
+    """
+    if len(rows) * len(rows).bit_length() < len(title_order):
+        return sorted(rows, key=order_key)
+    return [row for row in title_order if row in rows]
+
+
+class IdTable:
+    """An open-addressing hash table from encoded video ids to rows.
+
+    Only the rows are stored: the table reads the id of a row back with
+    the function it was given, so the ids are not held twice.
+    """
+
+    def __init__(self, row_id):
+        """The IdTable class is initialized.
+
+        Args:
+            row_id: The function returning the encoded id of a row, as
+                bytes or a memoryview.
+        """
+        self._row_id = row_id
+        self._slots = array("q", [-1] * 8)
+        self._count = 0
+
+    def _find_slot(self, key):
+        """Returns the slot holding the row of the given encoded id, or the
+        empty slot where it would be inserted."""
+        mask = len(self._slots) - 1
+        slot = zlib.crc32(key) & mask
+        while True:
+            row = self._slots[slot]
+            if row < 0 or self._row_id(row) == key:
+                return slot
+            slot = (slot + 1) & mask
+
+    def get(self, key):
+        """Returns the row of an encoded id, or None."""
+        row = self._slots[self._find_slot(key)]
+        return None if row < 0 else row
+
+    def put(self, key, row):
+        """Maps an encoded id to a row, replacing any row it had. The id of
+        the row must already be readable."""
+        slot = self._find_slot(key)
+        if self._slots[slot] < 0:
+            self._count += 1
+        self._slots[slot] = row
+        if 2 * self._count > len(self._slots):
+            rows = [row for row in self._slots if row >= 0]
+            self._slots = array("q", [-1] * (len(self._slots) * 2))
+            for row in rows:
+                self._slots[self._find_slot(self._row_id(row))] = row
+
+
+class Listeners:
+    """Mixin registering the callables notified of changes to a library.
+
+    The listeners are called outside of the registration lock, so they may
+    subscribe or unsubscribe themselves. _init_listeners must be called
+    before any other method.
+    """
+
+    def _init_listeners(self):
+        self._listeners = []
+        self._listeners_lock = threading.Lock()
+
+    def subscribe(self, listener):
+        """Registers a callable notified of every change to the library.
+
+        The listener is called with the event, such as "flag" or "allow",
+        and the Video object concerned.
+        """
+        with self._listeners_lock:
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        """Stops notifying a listener registered with subscribe."""
+        with self._listeners_lock:
+            self._listeners.remove(listener)
+
+    def _notify(self, event, video):
+        with self._listeners_lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(event, video)
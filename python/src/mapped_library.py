@@ -0,0 +1,389 @@
+"""A video library class reading the catalog from a memory-mapped file."""
+
+from .video import Video
+from .library_rows import IdTable, Listeners, _rows_in_title_order, \
+    _set_bit, _test_bit
+from .rwlock import ReadWriteLock, reader, writer
+from array import array
+from bisect import bisect_right
+from pathlib import Path
+import mmap
+import re
+
+
+# Offsets of the title end, id start, id end, tags start and tags end of a
+# line, relative to the start of its title.
+_FIELDS = 5
+
+
+def _strip_span(field, offset):
+    """Returns the start and end offsets of a field without its leading and
+    trailing whitespace."""
+    start = offset + len(field) - len(field.lstrip())
+    return start, max(start, offset + len(field.rstrip()))
+
+
+class MappedVideoLibrary(Listeners):
+    """A Video Library that leaves the catalog in the videos file.
+
+    The file is mapped read-only and only the byte offsets of the fields of
+    each line are kept, a few dozen bytes per video. Titles, ids and tags
+    are decoded from the mapping when a video is returned, and searches
+    scan the mapping directly, so processes that map the same file share
+    one copy of it in the page cache. It offers the same queries and flag
+    changes as VideoLibrary, with the same reader/writer locking, but the
+    catalog itself is read-only.
+
+    Fields are separated by "|" and lines end with a newline; quoted
+    fields are not supported.
+    """
+
+    def __init__(self, video_file=None):
+        """The MappedVideoLibrary class is initialized.
+
+        Args:
+            video_file: The videos file to map. Defaults to the videos.txt
+                shipped next to this module.
+        """
+        if video_file is None:
+            video_file = Path(__file__).parent / "videos.txt"
+        self._video_file = video_file
+        with open(video_file, "rb") as data:
+            try:
+                self._mmap = mmap.mmap(data.fileno(), 0,
+                                       access=mmap.ACCESS_READ)
+            except ValueError:
+                # An empty file cannot be mapped.
+                self._mmap = b""
+        self._view = memoryview(self._mmap)
+
+        # Per line: the absolute offset of its title and the relative
+        # offsets of the other fields, the row it holds, or -1 when a later
+        # line has the same id.
+        self._title_starts = array("Q")
+        self._field_offsets = array("L")
+        self._line_rows = array("q")
+        # Lines holding non-ASCII bytes, which searches check by decoding.
+        self._non_ascii_lines = array("Q")
+        # Per row: the line holding its current contents.
+        self._row_lines = array("Q")
+        self._id_rows = IdTable(self._id_view)
+        self._flags = bytearray()
+        self._flag_reasons = {}
+        self._playable_rows = array("Q")
+        self._playable_positions = array("q")
+        self._init_listeners()
+        # Searches and listings share the lock, flag changes hold it alone.
+        self._lock = ReadWriteLock()
+
+        try:
+            self._scan()
+        except ValueError:
+            self.close()
+            raise
+        self._title_order = array(
+            "Q", sorted(range(len(self._row_lines)), key=self._order_key))
+
+    def _scan(self):
+        buffer = self._mmap
+        size = len(buffer)
+        position = 0
+        while position < size:
+            end = buffer.find(b"\n", position)
+            if end < 0:
+                end = size
+            line = buffer[position:end]
+            fields = line.split(b"|")
+            if len(fields) != 3:
+                raise ValueError(
+                    f"{self._video_file}: expected 3 fields in line "
+                    f"{len(self._title_starts) + 1}")
+            title, video_id, tags = fields
+            title_start, title_end = _strip_span(title, position)
+            id_offset = position + len(title) + 1
+            id_start, id_end = _strip_span(video_id, id_offset)
+            tags_start, tags_end = _strip_span(
+                tags, id_offset + len(video_id) + 1)
+
+            line_index = len(self._title_starts)
+            self._title_starts.append(title_start)
+            self._field_offsets.extend(
+                offset - title_start for offset in
+                (title_end, id_start, id_end, tags_start, tags_end))
+            if not line.isascii():
+                self._non_ascii_lines.append(line_index)
+
+            key = buffer[id_start:id_end]
+            row = self._id_rows.get(key)
+            if row is None:
+                row = len(self._row_lines)
+                self._row_lines.append(line_index)
+                self._id_rows.put(key, row)
+                self._playable_positions.append(len(self._playable_rows))
+                self._playable_rows.append(row)
+                if row >> 3 == len(self._flags):
+                    self._flags.append(0)
+            else:
+                # The last line with an id wins, in the first one's place.
+                self._line_rows[self._row_lines[row]] = -1
+                self._row_lines[row] = line_index
+            self._line_rows.append(row)
+            position = end + 1
+
+    def close(self):
+        """Unmaps the videos file. The library cannot be used afterwards."""
+        self._view.release()
+        if isinstance(self._mmap, mmap.mmap):
+            self._mmap.close()
+
+    # Field access
+
+    def _span(self, line, field):
+        """Returns the absolute start and end offsets of a field of a line:
+        0 for the title, 1 for the id and 2 for the tags."""
+        title_start = self._title_starts[line]
+        offsets = self._field_offsets
+        base = line * _FIELDS
+        if field == 0:
+            return title_start, title_start + offsets[base]
+        return (title_start + offsets[base + 2 * field - 1],
+                title_start + offsets[base + 2 * field])
+
+    def _text(self, line, field):
+        start, end = self._span(line, field)
+        return str(self._view[start:end], "utf-8").strip()
+
+    def _tags(self, line):
+        tags = self._text(line, 2)
+        return [tag.strip() for tag in tags.split(",")] if tags else []
+
+    def _order_key(self, row):
+        start, end = self._span(self._row_lines[row], 0)
+        return self._mmap[start:end], row
+
+    def _video(self, row):
+        """Returns a new Video object decoded from the mapped file."""
+        line = self._row_lines[row]
+        video = Video(self._text(line, 0), self._text(line, 1),
+                      self._tags(line))
+        if _test_bit(self._flags, row):
+            video.flag(self._flag_reasons[row])
+        return video
+
+    # Id lookup
+
+    def _id_view(self, row):
+        start, end = self._span(self._row_lines[row], 1)
+        return self._view[start:end]
+
+    def _row(self, video_id):
+        """Returns the row of a video, or None."""
+        return self._id_rows.get(video_id.encode("utf-8"))
+
+    # Flags
+
+    @writer
+    def flag_video(self, video_id, flag_reason):
+        """Marks a video as flagged so it can no longer be played.
+
+        Args:
+            video_id: The video url.
+            flag_reason: Reason for flagging the video.
+
+        Returns:
+            True if the video was flagged, False if it does not exist or was
+            already flagged.
+        """
+        row = self._row(video_id)
+        if row is None or _test_bit(self._flags, row):
+            return False
+        _set_bit(self._flags, row, True)
+        self._flag_reasons[row] = flag_reason
+        position = self._playable_positions[row]
+        self._playable_positions[row] = -1
+        last_row = self._playable_rows.pop()
+        if last_row != row:
+            self._playable_rows[position] = last_row
+            self._playable_positions[last_row] = position
+        if self._listeners:
+            self._notify("flag", self._video(row))
+        return True
+
+    @writer
+    def allow_video(self, video_id):
+        """Removes the flag from a video.
+
+        Args:
+            video_id: The video url.
+
+        Returns:
+            True if the flag was removed, False if the video does not exist
+            or was not flagged.
+        """
+        row = self._row(video_id)
+        if row is None or not _test_bit(self._flags, row):
+            return False
+        _set_bit(self._flags, row, False)
+        del self._flag_reasons[row]
+        self._playable_positions[row] = len(self._playable_rows)
+        self._playable_rows.append(row)
+        if self._listeners:
+            self._notify("allow", self._video(row))
+        return True
+
+    # Queries
+
+    @property
+    def video_file(self):
+        """Returns the path of the mapped videos file."""
+        return self._video_file
+
+    def __len__(self):
+        """Returns the number of videos in the library."""
+        return len(self._row_lines)
+
+    @reader
+    def get_all_videos(self):
+        """Returns all available video information from the video library."""
+        return [self._video(row) for row in range(len(self._row_lines))]
+
+    @reader
+    def get_video(self, video_id):
+        """Returns the video object (title, url, tags) from the video library.
+
+        Args:
+            video_id: The video url.
+
+        Returns:
+            A Video object for the requested video_id. None if the video
+            does not exist.
+        """
+        row = self._row(video_id)
+        return None if row is None else self._video(row)
+
+    def _in_title_order(self, rows):
+        """Returns the videos of the given rows sorted by title."""
+        return [self._video(row) for row in _rows_in_title_order(
+            rows, self._title_order, self._order_key)]
+
+    @reader
+    def videos_sorted_by_title(self, offset=0, limit=None):
+        """Returns all videos sorted by title.
+
+        Videos with the same title are in the order of get_all_videos.
+
+        Args:
+            offset: The number of videos to skip.
+            limit: The maximum number of videos to return, None for all.
+        """
+        stop = None if limit is None else offset + limit
+        return [self._video(row) for row in self._title_order[offset:stop]]
+
+    def _scan_field(self, text, field):
+        """Yields the live ASCII lines where a case insensitive match of
+        text starts in the given field, at most once per line.
+
+        Non-ASCII lines are skipped: bytes patterns only fold ASCII case,
+        so those lines are left to the caller.
+        """
+        pattern = re.compile(re.escape(text.encode("ascii")), re.IGNORECASE)
+        starts = self._title_starts
+        position = 0
+        search = pattern.search
+        while position < len(self._mmap):
+            match = search(self._mmap, position)
+            if match is None:
+                return
+            line = bisect_right(starts, match.start()) - 1
+            if line < 0:
+                # The match is in the leading whitespace of the first line.
+                position = starts[0]
+                continue
+            start, end = self._span(line, field)
+            if match.start() < start:
+                # The match is in an earlier field; go on from this one.
+                position = max(start, match.start() + 1)
+                continue
+            if match.start() <= end and self._line_rows[line] >= 0:
+                yield line, match
+            position = (starts[line + 1] if line + 1 < len(starts)
+                        else len(self._mmap))
+
+    def _non_ascii_rows(self, matches):
+        """Returns the live rows of the non-ASCII lines for which
+        matches(line) is true."""
+        return {self._line_rows[line] for line in self._non_ascii_lines
+                if self._line_rows[line] >= 0 and matches(line)}
+
+    @reader
+    def search_titles(self, search_term):
+        """Returns all videos whose title contains the search term.
+
+        The comparison is case insensitive. The mapped file is scanned with
+        a case insensitive bytes pattern, and lines with non-ASCII bytes are
+        decoded and compared as text.
+
+        Args:
+            search_term: The text to look for in the video titles.
+
+        Returns:
+            A list of Video objects, in the same order as
+            videos_sorted_by_title.
+        """
+        term = search_term.lower()
+        if not term:
+            return [self._video(row) for row in self._title_order]
+        rows = self._non_ascii_rows(
+            lambda line: term in self._text(line, 0).lower())
+        # No title holds a field separator or a line break.
+        if term.isascii() and not any(c in term for c in "|\r\n"):
+            non_ascii = set(self._non_ascii_lines)
+            for line, match in self._scan_field(term, 0):
+                if (match.end() <= self._span(line, 0)[1]
+                        and line not in non_ascii):
+                    rows.add(self._line_rows[line])
+        return self._in_title_order(rows)
+
+    @reader
+    def videos_with_tag(self, video_tag):
+        """Returns all videos that have the given tag.
+
+        The comparison is case insensitive. Candidate lines are found with a
+        case insensitive bytes pattern over the mapped file, then their
+        tags are decoded and compared.
+
+        Args:
+            video_tag: The tag to look for.
+
+        Returns:
+            A list of Video objects, in the same order as
+            videos_sorted_by_title.
+        """
+        tag = video_tag.lower()
+
+        def has_tag(line):
+            return any(tag == candidate.lower()
+                       for candidate in self._tags(line))
+
+        rows = self._non_ascii_rows(has_tag)
+        if tag.isascii() and not any(c in tag for c in ",|\r\n"):
+            non_ascii = set(self._non_ascii_lines)
+            for line, _ in self._scan_field(tag, 2):
+                if line not in non_ascii and has_tag(line):
+                    rows.add(self._line_rows[line])
+        return self._in_title_order(rows)
+
+    @reader
+    def random_playable_video(self, rng):
+        """Returns a random video that is not flagged.
+
+        Args:
+            rng: The random.Random instance used to draw the video.
+
+        Returns:
+            A Video object. None if every video is flagged.
+        """
+        if not self._playable_rows:
+            return None
+        return self._video(
+            self._playable_rows[rng.randrange(len(self._playable_rows))])
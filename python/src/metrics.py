@@ -0,0 +1,173 @@
+"""Latency histograms and counters for commands and player operations."""
+
+from pathlib import Path
+import os
+import threading
+
+
+# Each power of two of latency is split into 2 ** (_SUB_BUCKET_BITS - 1)
+# buckets, so a recorded value is off by at most 1 / 16 = 6%.
+_SUB_BUCKET_BITS = 5
+_HALF_BUCKETS = 1 << (_SUB_BUCKET_BITS - 1)
+
+_QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _bucket_limit(bucket):
+    """Returns the largest value counted in a bucket."""
+    if bucket < 2 * _HALF_BUCKETS:
+        return bucket
+    magnitude = bucket // _HALF_BUCKETS - 1
+    return ((bucket - magnitude * _HALF_BUCKETS + 1) << magnitude) - 1
+
+
+class LatencyHistogram:
+    """A class used to count latencies in logarithmic buckets.
+
+    As in an HDR histogram, buckets are linear within each power of two,
+    so the quantiles keep the same relative precision from microseconds to
+    seconds while the histogram stays a few hundred counters large.
+    """
+
+    __slots__ = ("_counts", "count", "total", "max")
+
+    def __init__(self):
+        self._counts = {}
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, value):
+        """Counts a latency, in nanoseconds."""
+        magnitude = value.bit_length() - _SUB_BUCKET_BITS
+        bucket = (value if magnitude <= 0 else
+                  magnitude * _HALF_BUCKETS + (value >> magnitude))
+        counts = self._counts
+        counts[bucket] = counts.get(bucket, 0) + 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, fraction):
+        """Returns the latency under which the given fraction of the
+        recorded latencies fall, in nanoseconds. 0 if nothing was
+        recorded."""
+        rank = fraction * self.count
+        seen = 0
+        for bucket in sorted(self._counts):
+            seen += self._counts[bucket]
+            if seen >= rank:
+                return min(_bucket_limit(bucket), self.max)
+        return self.max
+
+
+class _Operation:
+    """The histogram and counters of one command or operation."""
+
+    __slots__ = ("latency", "errors", "results")
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.errors = 0
+        self.results = 0
+
+
+class Metrics:
+    """A class used to collect per-operation latencies and counters.
+
+    One instance can be shared by many parsers and players, from many
+    threads. Leaving the metrics argument of CommandParser and VideoPlayer
+    at None disables the instrumentation entirely.
+    """
+
+    def __init__(self):
+        self._operations = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, elapsed_ns, error=False, results=0):
+        """Records one call of an operation.
+
+        Args:
+            name: The command or operation name.
+            elapsed_ns: How long the call took, in nanoseconds.
+            error: Whether the call failed.
+            results: The number of results the call returned.
+        """
+        with self._lock:
+            operation = self._operations.get(name)
+            if operation is None:
+                operation = self._operations[name] = _Operation()
+            operation.latency.record(elapsed_ns)
+            operation.errors += error
+            operation.results += results
+
+    def summary(self):
+        """Returns a dict mapping each operation name to a dict of its
+        calls, errors, results, p50, p95, p99 and max, the latencies being
+        in seconds."""
+        with self._lock:
+            return {
+                name: {
+                    "calls": operation.latency.count,
+                    "errors": operation.errors,
+                    "results": operation.results,
+                    "p50": operation.latency.quantile(0.5) / 1e9,
+                    "p95": operation.latency.quantile(0.95) / 1e9,
+                    "p99": operation.latency.quantile(0.99) / 1e9,
+                    "max": operation.latency.max / 1e9,
+                }
+                for name, operation in sorted(self._operations.items())
+            }
+
+    def format_stats(self):
+        """Returns the STATS table, one line per operation."""
+        lines = [f"{'operation':<24}{'calls':>9}{'errors':>8}{'results':>9}"
+                 f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"]
+        for name, stats in self.summary().items():
+            lines.append(
+                f"{name:<24}{stats['calls']:>9}{stats['errors']:>8}"
+                f"{stats['results']:>9}" + "".join(
+                    f"{stats[key] * 1e3:>10.3f}"
+                    for key in ("p50", "p95", "p99", "max")))
+        return "\n".join(lines)
+
+    def prometheus_text(self):
+        """Returns the metrics in the Prometheus text exposition format."""
+        with self._lock:
+            operations = sorted(self._operations.items())
+            lines = [
+                "# HELP youtube_operation_latency_seconds Latency of the "
+                "commands and player operations.",
+                "# TYPE youtube_operation_latency_seconds summary",
+            ]
+            for name, operation in operations:
+                latency = operation.latency
+                label = f'operation="{name}"'
+                for fraction in _QUANTILES:
+                    lines.append(
+                        f'youtube_operation_latency_seconds{{{label},'
+                        f'quantile="{fraction}"}} '
+                        f"{latency.quantile(fraction) / 1e9:.9f}")
+                lines.append(f"youtube_operation_latency_seconds_sum"
+                             f"{{{label}}} {latency.total / 1e9:.9f}")
+                lines.append(f"youtube_operation_latency_seconds_count"
+                             f"{{{label}}} {latency.count}")
+            for counter, help_text, attribute in (
+                    ("errors", "Failed calls", "errors"),
+                    ("results", "Results returned", "results")):
+                family = f"youtube_operation_{counter}_total"
+                lines.append(f"# HELP {family} {help_text} per operation.")
+                lines.append(f"# TYPE {family} counter")
+                for name, operation in operations:
+                    lines.append(f'{family}{{operation="{name}"}} '
+                                 f"{getattr(operation, attribute)}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Writes prometheus_text to a file, replacing it atomically so a
+        scraper never reads a partial dump."""
+        path = Path(path)
+        temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        temp_path.write_text(self.prometheus_text())
+        os.replace(temp_path, path)
@@ -1,16 +1,30 @@
 """A youtube terminal simulator."""
 from .video_player import VideoPlayer
 from .command_parser import CommandException
+from .catalog_watcher import CatalogWatcher
 from .command_parser import CommandParser
+from .metrics import Metrics
+from .state_journal import StateJournal
+from .video_library import VideoLibrary
+import argparse
+import io
+import sys
 
 
-if __name__ == "__main__":
+# Size of the chunks written to stdout in script mode.
+_OUTPUT_CHUNK_SIZE = 1 << 16
+
+
+def run(parser):
+    """Reads commands from stdin and executes them until EXIT or the end of
+    the input."""
     print("""Hello and welcome to YouTube, what would you like to do?
     Enter HELP for list of available commands or EXIT to terminate.""")
-    video_player = VideoPlayer()
-    parser = CommandParser(video_player)
     while True:
-        command = input("YT> ")
+        try:
+            command = input("YT> ")
+        except EOFError:
+            break
         if command.upper() == "EXIT":
             break
         try:
@@ -19,3 +33,78 @@ if __name__ == "__main__":
             print(e)
     print("YouTube has now terminated its execution. "
           "Thank you and goodbye!")
+
+
+def run_script(parser, script):
+    """Executes a whole command script without a terminal.
+
+    The script is read in one go and replaces stdin, so follow-up answers
+    such as the video to play after a search are taken from the next lines,
+    exactly as when the script is piped into the interactive mode. All
+    output goes through a single buffered writer that is flushed in large
+    chunks, and is byte-identical to the interactive mode's output.
+
+    Args:
+        parser: The CommandParser executing the commands.
+        script: A text file object holding one command per line.
+    """
+    stdin, stdout = sys.stdin, sys.stdout
+    stdout.flush()
+    sys.stdin = io.StringIO(script.read())
+    sys.stdout = open(stdout.fileno(), "w", buffering=_OUTPUT_CHUNK_SIZE,
+                      encoding=stdout.encoding, closefd=False)
+    try:
+        run(parser)
+    finally:
+        sys.stdout.close()
+        sys.stdin, sys.stdout = stdin, stdout
+
+
+def main(argv=None):
+    arguments = argparse.ArgumentParser(description=__doc__)
+    arguments.add_argument(
+        "--script", type=argparse.FileType("r"), metavar="FILE",
+        help="execute the commands in FILE ('-' for stdin) and exit")
+    arguments.add_argument(
+        "--state", metavar="DIR",
+        help="save the playlists and flags in DIR and restore them on start")
+    arguments.add_argument(
+        "--metrics", metavar="FILE",
+        help="collect command metrics, shown by STATS, and write them to "
+             "FILE in the Prometheus text format on exit")
+    arguments.add_argument(
+        "--watch", type=float, metavar="SECONDS",
+        help="check the videos file every SECONDS and apply its changes")
+    arguments.add_argument(
+        "--snapshot", metavar="FILE",
+        help="load the catalog and its indexes from FILE, compiled on the "
+             "first run and whenever the videos file changes")
+    args = arguments.parse_args(argv)
+
+    journal = None if args.state is None else StateJournal(args.state)
+    metrics = None if args.metrics is None else Metrics()
+    library = VideoLibrary(snapshot_file=args.snapshot)
+    player = VideoPlayer(video_library=library, journal=journal,
+                         metrics=metrics)
+    parser = CommandParser(player, metrics=metrics)
+    watcher = None
+    if args.watch is not None:
+        watcher = CatalogWatcher(library, args.watch)
+        watcher.subscribe(lambda diff: player.reconcile_playlists(diff.removed))
+        watcher.start()
+    try:
+        if args.script is None:
+            run(parser)
+        else:
+            with args.script:
+                run_script(parser, args.script)
+    finally:
+        if watcher is not None:
+            watcher.stop()
+        player.close()
+        if metrics is not None:
+            metrics.write_prometheus(args.metrics)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""A reader/writer lock class."""
+
+from contextlib import contextmanager
+import functools
+import threading
+
+
+class ReadWriteLock:
+    """A lock shared by many readers or held by a single writer.
+
+    Waiting writers take precedence over new readers, so a steady stream
+    of searches cannot starve a flag update. The lock is not reentrant:
+    code holding it must not acquire it again.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writing = False
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read_locked(self):
+        """Holds the lock as one of possibly many readers."""
+        with self._condition:
+            while self._writing or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def write_locked(self):
+        """Holds the lock as its only writer."""
+        with self._condition:
+            self._waiting_writers += 1
+            while self._writing or self._readers:
+                self._condition.wait()
+            self._waiting_writers -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writing = False
+                self._condition.notify_all()
+
+
+def reader(method):
+    """Runs a method while holding self._lock for reading."""
+    @functools.wraps(method)
+    def locked(self, *args, **kwargs):
+        with self._lock.read_locked():
+            return method(self, *args, **kwargs)
+    return locked
+
+
+def writer(method):
+    """Runs a method while holding self._lock for writing."""
+    @functools.wraps(method)
+    def locked(self, *args, **kwargs):
+        with self._lock.write_locked():
+            return method(self, *args, **kwargs)
+    return locked
@@ -0,0 +1,143 @@
+"""A search result cache class."""
+
+from collections import OrderedDict
+import threading
+
+
+class SearchCache:
+    """A bounded LRU cache of search results.
+
+    Results are stored per normalized query, as ("title", term) or
+    ("tag", tag) keys, and hold the unflagged matching videos in display
+    order. The cache subscribes to the library, and drops exactly the
+    entries a change can affect: those containing a video that is flagged
+    or removed, and those whose query matches a video that is allowed or
+    added.
+
+    The cache is thread-safe. A search that raced with a library change is
+    not cached: callers read the generation before searching and pass it
+    to put, which ignores results computed before the latest change.
+    """
+
+    def __init__(self, capacity=256):
+        """SearchCache constructor.
+
+        Args:
+            capacity: The maximum number of cached queries.
+        """
+        self._capacity = capacity
+        self._entries = OrderedDict()
+        # Cached keys whose results contain each video id.
+        self._keys_by_video = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def generation(self):
+        """A counter increased by every library change."""
+        return self._generation
+
+    def get(self, key):
+        """Returns the cached results of a query, or None on a miss."""
+        with self._lock:
+            videos = self._entries.get(key)
+            if videos is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return videos
+
+    def put(self, key, videos, generation=None):
+        """Caches the results of a query, evicting the least recently used
+        query when the cache is full.
+
+        Args:
+            key: The normalized query.
+            videos: The results of the query.
+            generation: The generation read before the query was run. The
+                results are dropped if the library changed since.
+        """
+        if self._capacity <= 0:
+            return
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._put(key, videos)
+
+    def _put(self, key, videos):
+        if key in self._entries:
+            self._drop(key)
+        elif len(self._entries) >= self._capacity:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+        videos = tuple(videos)
+        self._entries[key] = videos
+        for video in videos:
+            self._keys_by_video.setdefault(video.video_id, set()).add(key)
+
+    def clear(self):
+        """Drops every cached query."""
+        with self._lock:
+            self._generation += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._keys_by_video.clear()
+
+    def _drop(self, key):
+        for video in self._entries.pop(key):
+            keys = self._keys_by_video[video.video_id]
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_video[video.video_id]
+
+    def video_changed(self, event, video):
+        """Library listener invalidating the queries affected by a change.
+
+        A reload drops every query at once: checking each cached query
+        against each changed video would take longer than running the
+        searches again.
+
+        Args:
+            event: One of "add", "remove", "flag", "allow" or "reload".
+            video: The Video object that changed, or the CatalogDiff of a
+                reload.
+        """
+        if event == "reload":
+            self.clear()
+            return
+        with self._lock:
+            self._generation += 1
+            if event in ("flag", "remove"):
+                stale = list(self._keys_by_video.get(video.video_id, ()))
+            else:
+                title = video.title.lower()
+                tags = {tag.lower() for tag in video.tags}
+                stale = [key for key in self._entries
+                         if (key[1] in title if key[0] == "title"
+                             else key[1] in tags)]
+            for key in stale:
+                self._drop(key)
+            self.invalidations += len(stale)
+
+    def stats(self):
+        """Returns the cache counters as a dict."""
+        with self._lock:
+            return self._stats()
+
+    def _stats(self):
+        return {
+            "size": len(self._entries),
+            "capacity": self._capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,307 @@
+"""A youtube simulator server.
+
+Serves the same commands as run.py to many concurrent clients over a TCP
+or Unix socket. Each connection gets its own session, while all sessions
+share one library. The protocol is the interactive one: the server sends
+the greeting and a "YT> " prompt, and answers every command line with its
+output followed by the next prompt. Searches never wait for an answer;
+use PLAY_RESULT <number> to play a result.
+
+Run from the python/ directory:
+
+    python3 -m src.server --port 8765
+    python3 -m src.server --unix /tmp/youtube.sock
+    python3 -m src.server --port 8765 --snapshot /tmp/videos.snapshot
+    python3 -m src.server --port 8766 --mapped
+    python3 -m src.server --port 8767 --shards 4
+    python3 -m src.server --port 8768 --workers 4
+"""
+from .command_parser import CommandException
+from .catalog_watcher import CatalogWatcher
+from .command_parser import CommandParser
+from .mapped_library import MappedVideoLibrary
+from .metrics import Metrics
+from .sharded_library import ShardedVideoLibrary
+from .session_manager import SessionManager
+from .video_library import VideoLibrary
+import argparse
+import asyncio
+import io
+import logging
+import multiprocessing
+import signal
+import socket
+import threading
+
+
+GREETING = """Hello and welcome to YouTube, what would you like to do?
+    Enter HELP for list of available commands or EXIT to terminate.
+"""
+GOODBYE = "YouTube has now terminated its execution. Thank you and goodbye!\n"
+PROMPT = "YT> "
+
+_log = logging.getLogger(__name__)
+
+# Longest accepted command line, in bytes.
+_MAX_LINE_LENGTH = 1 << 16
+# Pending output per connection above which the server waits for the client
+# to read before executing its next command.
+_HIGH_WATER_MARK = 1 << 20
+
+
+class CommandServer:
+    """A class used to serve CommandParser sessions over asyncio streams."""
+
+    def __init__(self, session_manager=None, metrics=None):
+        """CommandServer constructor.
+
+        Args:
+            session_manager: The SessionManager hosting the sessions.
+                Defaults to one over a new VideoLibrary.
+            metrics: Optional Metrics recording the commands of all the
+                connections.
+        """
+        if session_manager is None:
+            session_manager = SessionManager(metrics=metrics)
+        self._sessions = session_manager
+        self._metrics = metrics
+        self._servers = []
+        # Connection tasks, mapped to whether they are executing a command.
+        self._connections = {}
+        self._closing = False
+
+    async def start_tcp(self, host="127.0.0.1", port=0):
+        """Starts listening on a TCP port and returns the bound address."""
+        server = await asyncio.start_server(
+            self._serve_connection, host, port, limit=_MAX_LINE_LENGTH)
+        self._servers.append(server)
+        return server.sockets[0].getsockname()[:2]
+
+    async def start_unix(self, path):
+        """Starts listening on a Unix socket."""
+        self._servers.append(await asyncio.start_unix_server(
+            self._serve_connection, path, limit=_MAX_LINE_LENGTH))
+
+    async def start_socket(self, sock):
+        """Starts accepting connections on a bound, listening socket, for
+        instance one inherited from the process that forked this one."""
+        if sock.family == socket.AF_UNIX:
+            server = await asyncio.start_unix_server(
+                self._serve_connection, sock=sock, limit=_MAX_LINE_LENGTH)
+        else:
+            server = await asyncio.start_server(
+                self._serve_connection, sock=sock, limit=_MAX_LINE_LENGTH)
+        self._servers.append(server)
+
+    async def _serve_connection(self, reader, writer):
+        task = asyncio.current_task()
+        self._connections[task] = False
+        writer.transport.set_write_buffer_limits(high=_HIGH_WATER_MARK)
+        output = io.StringIO()
+        session_id, player = self._sessions.open_session(output=output)
+        parser = CommandParser(player, output=output, metrics=self._metrics)
+        loop = asyncio.get_running_loop()
+        try:
+            writer.write((GREETING + PROMPT).encode())
+            await writer.drain()
+            while not self._closing:
+                try:
+                    line = await reader.readline()
+                except (asyncio.LimitOverrunError, ValueError):
+                    # The line is longer than _MAX_LINE_LENGTH.
+                    break
+                command = line.decode(errors="replace")
+                if not line or command.strip().upper() == "EXIT":
+                    break
+                self._connections[task] = True
+                # Commands run in the default thread pool so a slow listing
+                # does not stall the other connections.
+                await loop.run_in_executor(
+                    None, _execute, parser, output, command)
+                self._connections[task] = False
+                writer.write((output.getvalue() + PROMPT).encode())
+                output.seek(0)
+                output.truncate()
+                # Backpressure: stop reading from a client that does not
+                # read its responses.
+                await writer.drain()
+            writer.write(GOODBYE.encode())
+            await writer.drain()
+        except asyncio.CancelledError:
+            if self._closing:
+                writer.write(GOODBYE.encode())
+        except ConnectionError:
+            pass
+        finally:
+            del self._connections[task]
+            self._sessions.close_session(session_id)
+            writer.close()
+
+    async def shutdown(self, timeout=5.0):
+        """Stops accepting connections and closes the open ones.
+
+        Idle connections are closed at once. Connections executing a
+        command get its output and the goodbye message, and are cancelled
+        if they are still running after the timeout.
+        """
+        self._closing = True
+        for server in self._servers:
+            server.close()
+        for task, busy in list(self._connections.items()):
+            if not busy:
+                task.cancel()
+        if self._connections:
+            _, pending = await asyncio.wait(
+                list(self._connections), timeout=timeout)
+            for task in pending:
+                task.cancel()
+        for server in self._servers:
+            await server.wait_closed()
+
+
+def _execute(parser, output, command):
+    try:
+        parser.execute_command(command.split())
+    except CommandException as e:
+        print(e, file=output)
+    except Exception:
+        # A failing command must not end the session.
+        _log.exception("Command %r failed", command.strip())
+        print("Cannot run command: An internal error occurred",
+              file=output)
+
+
+async def _serve(args, library=None, sock=None, metrics_file=None):
+    """Serves until SIGINT or SIGTERM. Pre-forked workers get the shared
+    library and the listening socket from the parent."""
+    metrics_file = metrics_file or args.metrics
+    metrics = None if metrics_file is None else Metrics()
+    search_cache_size = 1024
+    if library is not None:
+        # Other workers change the flags without notifying the cache.
+        search_cache_size = 0
+    elif args.mapped:
+        library = MappedVideoLibrary()
+    elif args.shards is not None:
+        library = ShardedVideoLibrary(shards=args.shards)
+    video_library = library
+    if video_library is None:
+        video_library = VideoLibrary(snapshot_file=args.snapshot)
+    sessions = SessionManager(video_library,
+                              search_cache_size=search_cache_size,
+                              metrics=metrics)
+    server = CommandServer(sessions, metrics=metrics)
+    watcher = None
+    if args.watch is not None:
+        watcher = CatalogWatcher(sessions.video_library, args.watch)
+        watcher.subscribe(
+            lambda diff: sessions.reconcile_playlists(diff.removed))
+        watcher.start()
+    if sock is not None:
+        await server.start_socket(sock)
+    elif args.unix:
+        await server.start_unix(args.unix)
+        print(f"Serving on {args.unix}")
+    else:
+        host, port = await server.start_tcp(args.host, args.port)
+        print(f"Serving on {host}:{port}")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signal_number, stop.set)
+    await stop.wait()
+    await server.shutdown()
+    if watcher is not None:
+        watcher.stop()
+    if library is not None:
+        library.close()
+    if metrics is not None:
+        metrics.write_prometheus(metrics_file)
+
+
+def _serve_worker(args, library, sock, worker):
+    metrics_file = None if args.metrics is None else f"{args.metrics}.{worker}"
+    asyncio.run(_serve(args, library, sock, metrics_file))
+
+
+def _serve_workers(args):
+    """Builds the catalog once in shared memory, binds the socket, and
+    forks the workers serving it. Stops them on SIGINT or SIGTERM."""
+    # Imported here: multiprocessing.shared_memory needs Python 3.8, and
+    # the other modes do not.
+    from .shared_library import SharedVideoLibrary
+
+    context = multiprocessing.get_context("fork")
+    library = SharedVideoLibrary(context=context)
+    if args.unix:
+        sock = socket.socket(socket.AF_UNIX)
+        sock.bind(args.unix)
+        sock.listen()
+        address = args.unix
+    else:
+        sock = socket.create_server((args.host, args.port))
+        address = "{}:{}".format(*sock.getsockname()[:2])
+
+    stop = threading.Event()
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signal_number, lambda *_: stop.set())
+    workers = [context.Process(target=_serve_worker,
+                               args=(args, library, sock, worker),
+                               name=f"server-worker-{worker}")
+               for worker in range(args.workers)]
+    for process in workers:
+        process.start()
+    print(f"Serving on {address} with {args.workers} workers")
+    try:
+        stop.wait()
+    finally:
+        for process in workers:
+            process.terminate()
+        for process in workers:
+            process.join()
+        sock.close()
+        library.close()
+
+
+def main(argv=None):
+    arguments = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arguments.add_argument("--host", default="127.0.0.1")
+    arguments.add_argument("--port", type=int, default=8765)
+    arguments.add_argument("--unix", metavar="PATH",
+                           help="listen on a Unix socket instead of TCP")
+    arguments.add_argument("--metrics", metavar="FILE",
+                           help="collect command metrics and write them to "
+                                "FILE in the Prometheus text format on exit")
+    catalog = arguments.add_mutually_exclusive_group()
+    catalog.add_argument("--watch", type=float, metavar="SECONDS",
+                         help="reload the videos file every SECONDS when "
+                              "it changes")
+    catalog.add_argument("--mapped", action="store_true",
+                         help="map the videos file read-only instead of "
+                              "loading it, sharing it with other servers "
+                              "on the host")
+    catalog.add_argument("--shards", type=int, metavar="N",
+                         help="split the catalog over N worker processes "
+                              "that search in parallel")
+    catalog.add_argument("--workers", type=int, metavar="N",
+                         help="serve from N forked processes sharing one "
+                              "catalog in shared memory")
+    arguments.add_argument("--snapshot", metavar="FILE",
+                           help="load the catalog and its indexes from "
+                                "FILE, compiled on the first start and "
+                                "whenever the videos file changes")
+    args = arguments.parse_args(argv)
+    if args.snapshot is not None and (
+            args.mapped or args.shards is not None
+            or args.workers is not None):
+        arguments.error("--snapshot only applies to the default library, "
+                        "not to --mapped, --shards or --workers")
+    if args.workers is not None:
+        _serve_workers(args)
+    else:
+        asyncio.run(_serve(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""A session manager class."""
+
+from .search_cache import SearchCache
+from .video_library import VideoLibrary
+from .video_player import VideoPlayer
+import itertools
+import threading
+
+
+class SessionManager:
+    """A class used to host many user sessions over one shared library.
+
+    Every session is a VideoPlayer holding only that user's playback,
+    playlist and search state. The library and the search result cache
+    are shared by all sessions, so an idle session costs a few hundred
+    bytes.
+    """
+
+    def __init__(self, video_library=None, search_cache_size=1024,
+                 interactive=False, metrics=None):
+        """SessionManager constructor.
+
+        Args:
+            video_library: The library shared by the sessions. Defaults to
+                a new VideoLibrary.
+            search_cache_size: The number of search queries whose results
+                are cached for all sessions, 0 to disable the cache.
+            interactive: Whether searches in the sessions ask on stdin which
+                result to play. Servers leave this False and use
+                PLAY_RESULT instead.
+            metrics: Optional Metrics shared by the players of the
+                sessions.
+        """
+        if video_library is None:
+            video_library = VideoLibrary()
+        self._video_library = video_library
+        self._search_cache = SearchCache(search_cache_size)
+        video_library.subscribe(self._search_cache.video_changed)
+        self._interactive = interactive
+        self._metrics = metrics
+        self._sessions = {}
+        self._session_ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @property
+    def video_library(self):
+        return self._video_library
+
+    def __len__(self):
+        """Returns the number of open sessions."""
+        return len(self._sessions)
+
+    def open_session(self, seed=None, output=None):
+        """Opens a new session.
+
+        Args:
+            seed: Optional seed for PLAY_RANDOM in this session.
+            output: The text stream the session writes to. Defaults to the
+                current sys.stdout.
+
+        Returns:
+            The session id and the VideoPlayer of the session.
+        """
+        player = VideoPlayer(seed=seed, video_library=self._video_library,
+                             interactive=self._interactive,
+                             search_cache=self._search_cache,
+                             output=output, metrics=self._metrics)
+        with self._lock:
+            session_id = next(self._session_ids)
+            self._sessions[session_id] = player
+        return session_id, player
+
+    def get_session(self, session_id):
+        """Returns the VideoPlayer of a session, or None if it is not open."""
+        return self._sessions.get(session_id)
+
+    def close_session(self, session_id):
+        """Closes a session and drops its state.
+
+        Returns:
+            The VideoPlayer of the session. None if it was not open.
+        """
+        with self._lock:
+            return self._sessions.pop(session_id, None)
+
+    def reconcile_playlists(self, video_ids):
+        """Removes videos from the playlists of every session, for instance
+        after a reload removed them from the library."""
+        with self._lock:
+            players = list(self._sessions.values())
+        for player in players:
+            player.reconcile_playlists(video_ids)
+
+    def search_cache_stats(self):
+        """Returns the counters of the search cache shared by the
+        sessions."""
+        return self._search_cache.stats()
@@ -0,0 +1,360 @@
+"""A video library class partitioning the catalog across processes."""
+
+from .video import Video
+from .library_rows import Listeners
+from .video_file import _read_video_file
+from .video_library import VideoLibrary
+from contextlib import ExitStack
+from pathlib import Path
+import heapq
+import multiprocessing
+import os
+import random
+import threading
+import zlib
+
+
+def shard_of(video_id, shards):
+    """Returns the shard owning a video id, out of the given number of
+    shards."""
+    return zlib.crc32(video_id.encode("utf-8")) % shards
+
+
+def _fields(video):
+    """Returns the fields a shard sends for a video. Tuples of strings are
+    pickled much faster than Video objects."""
+    return (video.title, video.video_id, video.tags,
+            video.flag_reason if video.is_flagged else None)
+
+
+def _video(title, video_id, tags, flag_reason):
+    """Returns a Video object built from the fields sent by a shard."""
+    video = Video(title, video_id, tags)
+    if flag_reason is not None:
+        video.flag(flag_reason)
+    return video
+
+
+class _Shard:
+    """The slice of the catalog held by one worker process.
+
+    Listings are returned with the line at which each video first appears
+    in the videos file, so the parent can merge them into the order of a
+    single VideoLibrary.
+    """
+
+    def __init__(self, video_file, shard, shards):
+        self._lines = {}
+        records = []
+        for line, record in enumerate(_read_video_file(video_file)):
+            video_id = record[1]
+            if shard_of(video_id, shards) == shard:
+                self._lines.setdefault(video_id, line)
+                records.append(record)
+        self._library = VideoLibrary(video_file, records=records)
+
+    def _keyed(self, videos):
+        """Returns (title, line, fields) tuples, which sort like
+        videos_sorted_by_title."""
+        lines = self._lines
+        return [(video.title, lines[video.video_id], _fields(video))
+                for video in videos]
+
+    def length(self):
+        return len(self._library)
+
+    def all_videos(self):
+        lines = self._lines
+        return [(lines[video.video_id], _fields(video))
+                for video in self._library.get_all_videos()]
+
+    def sorted_videos(self, count):
+        return self._keyed(self._library.videos_sorted_by_title(0, count))
+
+    def search_titles(self, search_term):
+        return self._keyed(self._library.search_titles(search_term))
+
+    def videos_with_tag(self, video_tag):
+        return self._keyed(self._library.videos_with_tag(video_tag))
+
+    def get_video(self, video_id):
+        video = self._library.get_video(video_id)
+        return None if video is None else _fields(video)
+
+    def flag_video(self, video_id, flag_reason):
+        if self._library.flag_video(video_id, flag_reason):
+            return self.get_video(video_id)
+        return None
+
+    def allow_video(self, video_id):
+        if self._library.allow_video(video_id):
+            return self.get_video(video_id)
+        return None
+
+    def random_playable_video(self, seed):
+        video = self._library.random_playable_video(random.Random(seed))
+        return None if video is None else _fields(video)
+
+
+def _serve_shard(connection, video_file, shard, shards):
+    """Runs a shard: answers (method, args) requests until it receives
+    None."""
+    try:
+        worker = _Shard(video_file, shard, shards)
+    except Exception as e:
+        connection.send((False, e))
+        return
+    connection.send((True, worker.length()))
+    while True:
+        request = connection.recv()
+        if request is None:
+            return
+        method, args = request
+        try:
+            connection.send((True, getattr(worker, method)(*args)))
+        except Exception as e:
+            connection.send((False, e))
+
+
+class ShardedVideoLibrary(Listeners):
+    """A Video Library split across worker processes.
+
+    Videos are assigned to shards by a hash of their id, and each shard
+    holds a VideoLibrary with the indexes of its own videos in a process of
+    its own. Searches and listings are sent to every shard at once and the
+    sorted partial results are merged; lookups and flag changes go to the
+    shard owning the video. Searches thus run on as many cores as there are
+    shards, and a catalog can be larger than one interpreter could hold.
+
+    Results are copies sent back by the shards, so a Video object is not
+    updated when its video is flagged later. The catalog is read-only.
+    Requests to a shard are serialized, and a search waits for every shard.
+    """
+
+    def __init__(self, video_file=None, shards=None):
+        """The ShardedVideoLibrary class is initialized.
+
+        Every shard parses the videos file and keeps its own videos, so no
+        records are sent between processes and the shards load in parallel.
+
+        Args:
+            video_file: The videos file to load. Defaults to the videos.txt
+                shipped next to this module.
+            shards: The number of worker processes, None for one per CPU.
+        """
+        if video_file is None:
+            video_file = Path(__file__).parent / "videos.txt"
+        if shards is None:
+            shards = os.cpu_count() or 1
+        self._video_file = video_file
+        self._connections = []
+        self._processes = []
+        self._locks = [threading.Lock() for _ in range(shards)]
+        self._init_listeners()
+        for shard in range(shards):
+            connection, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=_serve_shard, args=(child, video_file, shard, shards),
+                name=f"video-shard-{shard}", daemon=True)
+            process.start()
+            child.close()
+            self._connections.append(connection)
+            self._processes.append(process)
+        try:
+            self._lengths = [self._receive(connection)
+                             for connection in self._connections]
+        except BaseException:
+            self.close()
+            raise
+        # Unflagged videos per shard, to draw random videos uniformly.
+        # Every flag change goes through this object, so it stays exact.
+        self._playable_counts = list(self._lengths)
+
+    def close(self):
+        """Stops the shard processes. The library cannot be used
+        afterwards."""
+        for lock, connection in zip(self._locks, self._connections):
+            with lock:
+                try:
+                    connection.send(None)
+                except OSError:
+                    pass
+                connection.close()
+        for process in self._processes:
+            process.join()
+
+    @staticmethod
+    def _receive(connection):
+        return ShardedVideoLibrary._result(connection.recv())
+
+    @staticmethod
+    def _result(reply):
+        succeeded, result = reply
+        if not succeeded:
+            raise result
+        return result
+
+    def _call(self, shard, method, *args):
+        """Runs a method of the _Shard class in one shard."""
+        with self._locks[shard]:
+            return self._request(shard, method, *args)
+
+    def _request(self, shard, method, *args):
+        self._connections[shard].send((method, args))
+        return self._receive(self._connections[shard])
+
+    def _gather(self, method, *args):
+        """Runs a method of the _Shard class in every shard at once and
+        returns the results in shard order."""
+        with ExitStack() as stack:
+            # Always locked in shard order, so gathers cannot deadlock.
+            for lock in self._locks:
+                stack.enter_context(lock)
+            for connection in self._connections:
+                connection.send((method, args))
+            # Read every reply before raising, so no reply is left behind
+            # in a pipe.
+            replies = [connection.recv() for connection in self._connections]
+        return [self._result(reply) for reply in replies]
+
+    def _merged(self, method, *args):
+        """Merges the (title, line, fields) lists returned by the shards
+        into one list of videos in title order."""
+        return [_video(*fields) for _, _, fields in heapq.merge(
+            *self._gather(method, *args))]
+
+    def _owner(self, video_id):
+        return shard_of(video_id, len(self._connections))
+
+    @property
+    def video_file(self):
+        """Returns the path of the videos file the library was loaded
+        from."""
+        return self._video_file
+
+    def __len__(self):
+        """Returns the number of videos in the library."""
+        return sum(self._lengths)
+
+    def get_all_videos(self):
+        """Returns all available video information from the video library."""
+        return [_video(*fields) for _, fields in heapq.merge(
+            *self._gather("all_videos"))]
+
+    def get_video(self, video_id):
+        """Returns the video object (title, url, tags) from the video library.
+
+        Args:
+            video_id: The video url.
+
+        Returns:
+            A Video object for the requested video_id. None if the video
+            does not exist.
+        """
+        fields = self._call(self._owner(video_id), "get_video", video_id)
+        return None if fields is None else _video(*fields)
+
+    def videos_sorted_by_title(self, offset=0, limit=None):
+        """Returns all videos sorted by title.
+
+        Videos with the same title are in the order of get_all_videos.
+        Every shard sends its first offset + limit videos, so deep pages
+        cost more than early ones.
+
+        Args:
+            offset: The number of videos to skip.
+            limit: The maximum number of videos to return, None for all.
+        """
+        stop = None if limit is None else offset + limit
+        return self._merged("sorted_videos", stop)[offset:stop]
+
+    def search_titles(self, search_term):
+        """Returns all videos whose title contains the search term.
+
+        The comparison is case insensitive.
+
+        Args:
+            search_term: The text to look for in the video titles.
+
+        Returns:
+            A list of Video objects, in the same order as
+            videos_sorted_by_title.
+        """
+        return self._merged("search_titles", search_term)
+
+    def videos_with_tag(self, video_tag):
+        """Returns all videos that have the given tag.
+
+        The comparison is case insensitive.
+
+        Args:
+            video_tag: The tag to look for.
+
+        Returns:
+            A list of Video objects, in the same order as
+            videos_sorted_by_title.
+        """
+        return self._merged("videos_with_tag", video_tag)
+
+    def flag_video(self, video_id, flag_reason):
+        """Marks a video as flagged so it can no longer be played.
+
+        Args:
+            video_id: The video url.
+            flag_reason: Reason for flagging the video.
+
+        Returns:
+            True if the video was flagged, False if it does not exist or was
+            already flagged.
+        """
+        shard = self._owner(video_id)
+        with self._locks[shard]:
+            fields = self._request(shard, "flag_video", video_id, flag_reason)
+            if fields is None:
+                return False
+            self._playable_counts[shard] -= 1
+        self._notify("flag", _video(*fields))
+        return True
+
+    def allow_video(self, video_id):
+        """Removes the flag from a video.
+
+        Args:
+            video_id: The video url.
+
+        Returns:
+            True if the flag was removed, False if the video does not exist
+            or was not flagged.
+        """
+        shard = self._owner(video_id)
+        with self._locks[shard]:
+            fields = self._request(shard, "allow_video", video_id)
+            if fields is None:
+                return False
+            self._playable_counts[shard] += 1
+        self._notify("allow", _video(*fields))
+        return True
+
+    def random_playable_video(self, rng):
+        """Returns a random video that is not flagged.
+
+        A shard is drawn with a probability proportional to its unflagged
+        videos, then draws one of them, so every video is equally likely.
+
+        Args:
+            rng: The random.Random instance used to draw the video.
+
+        Returns:
+            A Video object. None if every video is flagged.
+        """
+        counts = list(self._playable_counts)
+        total = sum(counts)
+        if not total:
+            return None
+        index = rng.randrange(total)
+        for shard, count in enumerate(counts):
+            if index < count:
+                fields = self._call(shard, "random_playable_video",
+                                    rng.getrandbits(64))
+                return None if fields is None else _video(*fields)
+            index -= count
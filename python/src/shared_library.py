@@ -0,0 +1,490 @@
+"""A video library class holding the catalog in shared memory."""
+
+from .video import Video
+from .library_rows import Listeners
+from .video_file import _read_video_file
+from array import array
+from bisect import bisect_right
+from multiprocessing import shared_memory
+from pathlib import Path
+import multiprocessing
+import os
+import re
+import struct
+import zlib
+
+
+_MAGIC = b"YTSH"
+_VERSION = 1
+
+# The regions of the shared block and the item format of each. The catalog
+# regions are read-only once built; the last four hold the flags.
+_REGIONS = (
+    # Per row its UTF-8 title, id and comma-joined tags, separated by
+    # newlines, which no field holds, and the offset of each row and of the
+    # end.
+    ("text", "B"),
+    ("row_starts", "Q"),
+    # Lowercase titles in title order, each followed by a newline, with the
+    # offset of each one and of the end.
+    ("lower_titles", "B"),
+    ("lower_starts", "Q"),
+    # The row at each position of the title order.
+    ("order", "I"),
+    # Open-addressing hash table from video id to row + 1, 0 when empty.
+    ("slots", "I"),
+    # Sorted distinct lowercase tags, their offsets, and per tag the range
+    # of its postings: the title order positions of the videos having it.
+    ("tag_text", "B"),
+    ("tag_starts", "Q"),
+    ("posting_starts", "Q"),
+    ("postings", "I"),
+    # One byte per row, 1 when flagged.
+    ("flags", "B"),
+    # Per row the offset and length of its flag reason in the reasons heap.
+    ("reason_spans", "I"),
+    ("reasons", "B"),
+    # The bytes of the reasons heap in use and the number of flagged rows.
+    ("state", "Q"),
+)
+_WRITABLE = ("flags", "reason_spans", "reasons", "state")
+_HEADER = struct.Struct("<4sI" + "QQ" * len(_REGIONS))
+_ALIGNMENT = 8
+# Draws of a random row before falling back to listing the unflagged rows.
+_RANDOM_ATTEMPTS = 32
+
+
+def _slot_count(count):
+    """Returns the power of two of hash table slots for count videos."""
+    slots = 8
+    while slots < 2 * count:
+        slots *= 2
+    return slots
+
+
+class SharedVideoLibrary(Listeners):
+    """A Video Library living in one shared memory block.
+
+    A parent process builds the catalog once, with its title, id and tag
+    lookups, into a multiprocessing.shared_memory block. Workers attach to
+    the block instead of loading the videos file, so they start at once
+    and the catalog is in memory only once, however many workers there
+    are. Titles, ids and tags are decoded from the block when a video is
+    returned.
+
+    The catalog is read-only. Flags live in the block too, so a video
+    flagged by one worker is flagged for all of them; changes to the flags
+    are serialized by a lock shared by the processes. Listeners are only
+    notified of the changes made through their own process, so players
+    sharing a library across processes should not cache searches.
+
+    Workers get the library as an argument of multiprocessing.Process, or
+    by inheriting it when forked. The process that built the library
+    removes the block when it closes it.
+    """
+
+    def __init__(self, video_file=None, reason_capacity=1 << 20,
+                 context=None):
+        """The SharedVideoLibrary class is initialized, building the shared
+        block.
+
+        Args:
+            video_file: The videos file to load. Defaults to the videos.txt
+                shipped next to this module.
+            reason_capacity: The bytes of shared memory holding the reasons
+                of the flagged videos.
+            context: The multiprocessing context the workers are started
+                from, which must also create the lock. Defaults to the
+                default context.
+        """
+        if video_file is None:
+            video_file = Path(__file__).parent / "videos.txt"
+        regions = self._build(video_file, reason_capacity)
+
+        layout = []
+        size = _HEADER.size
+        for name, code in _REGIONS:
+            size += -size % _ALIGNMENT
+            length = len(regions[name]) * array(code).itemsize
+            layout.append((size, length))
+            size += length
+        memory = shared_memory.SharedMemory(create=True, size=size)
+        try:
+            _HEADER.pack_into(memory.buf, 0, _MAGIC, _VERSION,
+                              *(value for span in layout for value in span))
+            for (name, _), (offset, length) in zip(_REGIONS, layout):
+                memory.buf[offset:offset + length] = memoryview(
+                    regions[name]).cast("B")
+        except BaseException:
+            memory.close()
+            memory.unlink()
+            raise
+        if context is None:
+            context = multiprocessing.get_context()
+        self._open(memory, context.Lock(), os.getpid())
+        self._video_file = video_file
+
+    @staticmethod
+    def _build(video_file, reason_capacity):
+        """Returns the contents of every region for a videos file."""
+        # The last line with an id wins, in the first one's place.
+        records = {}
+        for title, video_id, tags in _read_video_file(video_file):
+            records[video_id] = (title, tags)
+        count = len(records)
+
+        text = bytearray()
+        row_starts = array("Q")
+        for video_id, (title, tags) in records.items():
+            row_starts.append(len(text))
+            text += f"{title}\n{video_id}\n{','.join(tags)}".encode("utf-8")
+        row_starts.append(len(text))
+
+        titles = [title for title, _ in records.values()]
+        order = array("I", sorted(range(count),
+                                  key=lambda row: (titles[row], row)))
+        lower_titles = bytearray()
+        lower_starts = array("Q")
+        for row in order:
+            lower_starts.append(len(lower_titles))
+            lower_titles += titles[row].lower().encode("utf-8") + b"\n"
+        lower_starts.append(len(lower_titles))
+
+        slots = array("I", bytes(4 * _slot_count(count)))
+        mask = len(slots) - 1
+        for row, video_id in enumerate(records):
+            slot = zlib.crc32(video_id.encode("utf-8")) & mask
+            while slots[slot]:
+                slot = (slot + 1) & mask
+            slots[slot] = row + 1
+
+        tag_positions = {}
+        tags_by_row = [tags for _, tags in records.values()]
+        for position, row in enumerate(order):
+            for tag in tags_by_row[row]:
+                positions = tag_positions.setdefault(tag.lower(), [])
+                if not positions or positions[-1] != position:
+                    positions.append(position)
+        tag_text = bytearray()
+        tag_starts = array("Q")
+        posting_starts = array("Q")
+        postings = array("I")
+        for tag in sorted(tag_positions, key=lambda tag: tag.encode("utf-8")):
+            tag_starts.append(len(tag_text))
+            tag_text += tag.encode("utf-8")
+            posting_starts.append(len(postings))
+            postings.extend(tag_positions[tag])
+        tag_starts.append(len(tag_text))
+        posting_starts.append(len(postings))
+
+        return {
+            "text": text, "row_starts": row_starts,
+            "lower_titles": lower_titles, "lower_starts": lower_starts,
+            "order": order, "slots": slots,
+            "tag_text": tag_text, "tag_starts": tag_starts,
+            "posting_starts": posting_starts, "postings": postings,
+            "flags": bytearray(count),
+            "reason_spans": array("I", bytes(8 * count)),
+            "reasons": bytearray(reason_capacity),
+            "state": array("Q", [0, 0]),
+        }
+
+    @classmethod
+    def attach(cls, name, lock):
+        """Returns a library over a shared block built by another process.
+
+        Args:
+            name: The name of the shared memory block.
+            lock: The multiprocessing lock of the library that built it.
+        """
+        library = cls.__new__(cls)
+        library._open(shared_memory.SharedMemory(name), lock, None)
+        return library
+
+    def __reduce__(self):
+        # Workers receiving the library attach to the same block.
+        return SharedVideoLibrary.attach, (self._memory.name, self._lock)
+
+    def _open(self, memory, lock, owner_pid):
+        magic, version, *layout = _HEADER.unpack_from(memory.buf)
+        if magic != _MAGIC or version != _VERSION:
+            memory.close()
+            raise ValueError(f"{memory.name} is not a shared video library")
+        self._memory = memory
+        self._lock = lock
+        # Forked workers inherit this object, but must not remove the block.
+        self._owner_pid = owner_pid
+        self._video_file = None
+        self._init_listeners()
+        self._views = []
+        for index, (name, code) in enumerate(_REGIONS):
+            offset, length = layout[2 * index], layout[2 * index + 1]
+            view = memory.buf[offset:offset + length]
+            self._views.append(view)
+            if code != "B":
+                view = view.cast(code)
+                self._views.append(view)
+            if name not in _WRITABLE:
+                view = view.toreadonly()
+                self._views.append(view)
+            setattr(self, f"_{name}", view)
+        self._count = len(self._flags)
+
+    def close(self):
+        """Detaches from the shared block, and removes it if this process
+        built it. The library cannot be used afterwards."""
+        for view in reversed(self._views):
+            view.release()
+        self._memory.close()
+        if self._owner_pid == os.getpid():
+            self._memory.unlink()
+
+    @property
+    def name(self):
+        """Returns the name of the shared memory block."""
+        return self._memory.name
+
+    @property
+    def video_file(self):
+        """Returns the path of the videos file the library was built from,
+        None in the workers."""
+        return self._video_file
+
+    # Decoding
+
+    def _video(self, row):
+        """Returns a new Video object decoded from the shared block."""
+        starts = self._row_starts
+        title, video_id, tags = str(
+            self._text[starts[row]:starts[row + 1]], "utf-8").split("\n")
+        video = Video(title, video_id, tags.split(",") if tags else [])
+        if self._flags[row]:
+            with self._lock:
+                reason = self._reason(row)
+            if reason is not None:
+                video.flag(reason)
+        return video
+
+    def _reason(self, row):
+        """Returns the flag reason of a row, None if it is not flagged.
+        Must be called with the lock held."""
+        if not self._flags[row]:
+            return None
+        start = self._reason_spans[2 * row]
+        stop = start + self._reason_spans[2 * row + 1]
+        return str(self._reasons[start:stop], "utf-8")
+
+    def _row(self, video_id):
+        """Returns the row of a video, or None."""
+        key = video_id.encode("utf-8")
+        mask = len(self._slots) - 1
+        slot = zlib.crc32(key) & mask
+        while self._slots[slot]:
+            row = self._slots[slot] - 1
+            fields = bytes(self._text[self._row_starts[row]:
+                                      self._row_starts[row + 1]])
+            if fields.split(b"\n")[1] == key:
+                return row
+            slot = (slot + 1) & mask
+        return None
+
+    # Flags
+
+    def _compact_reasons(self):
+        """Moves the reasons of the flagged rows to the start of the heap,
+        dropping those of rows allowed since. Must be called with the lock
+        held."""
+        reasons = []
+        for row in range(self._count):
+            if self._flags[row]:
+                start = self._reason_spans[2 * row]
+                reasons.append((row, bytes(self._reasons[
+                    start:start + self._reason_spans[2 * row + 1]])))
+        used = 0
+        for row, reason in reasons:
+            self._reasons[used:used + len(reason)] = reason
+            self._reason_spans[2 * row] = used
+            used += len(reason)
+        self._state[0] = used
+
+    def flag_video(self, video_id, flag_reason):
+        """Marks a video as flagged so it can no longer be played.
+
+        Args:
+            video_id: The video url.
+            flag_reason: Reason for flagging the video.
+
+        Returns:
+            True if the video was flagged, False if it does not exist or was
+            already flagged.
+
+        Raises:
+            ValueError: The reasons of the flagged videos do not fit in the
+                reason_capacity of the library.
+        """
+        row = self._row(video_id)
+        if row is None:
+            return False
+        reason = flag_reason.encode("utf-8")
+        with self._lock:
+            if self._flags[row]:
+                return False
+            if self._state[0] + len(reason) > len(self._reasons):
+                self._compact_reasons()
+                if self._state[0] + len(reason) > len(self._reasons):
+                    raise ValueError("no room left for flag reasons")
+            used = self._state[0]
+            self._reasons[used:used + len(reason)] = reason
+            self._reason_spans[2 * row] = used
+            self._reason_spans[2 * row + 1] = len(reason)
+            self._state[0] = used + len(reason)
+            # Set last, so a reader never sees a flag without its reason.
+            self._flags[row] = 1
+            self._state[1] += 1
+        if self._listeners:
+            self._notify("flag", self._video(row))
+        return True
+
+    def allow_video(self, video_id):
+        """Removes the flag from a video.
+
+        Args:
+            video_id: The video url.
+
+        Returns:
+            True if the flag was removed, False if the video does not exist
+            or was not flagged.
+        """
+        row = self._row(video_id)
+        if row is None:
+            return False
+        with self._lock:
+            if not self._flags[row]:
+                return False
+            self._flags[row] = 0
+            self._state[1] -= 1
+        if self._listeners:
+            self._notify("allow", self._video(row))
+        return True
+
+    # Queries
+
+    def __len__(self):
+        """Returns the number of videos in the library."""
+        return self._count
+
+    def get_all_videos(self):
+        """Returns all available video information from the video library."""
+        return [self._video(row) for row in range(self._count)]
+
+    def get_video(self, video_id):
+        """Returns the video object (title, url, tags) from the video library.
+
+        Args:
+            video_id: The video url.
+
+        Returns:
+            A Video object for the requested video_id. None if the video
+            does not exist.
+        """
+        row = self._row(video_id)
+        return None if row is None else self._video(row)
+
+    def videos_sorted_by_title(self, offset=0, limit=None):
+        """Returns all videos sorted by title.
+
+        Videos with the same title are in the order of get_all_videos.
+
+        Args:
+            offset: The number of videos to skip.
+            limit: The maximum number of videos to return, None for all.
+        """
+        stop = None if limit is None else offset + limit
+        return [self._video(row) for row in self._order[offset:stop]]
+
+    def search_titles(self, search_term):
+        """Returns all videos whose title contains the search term.
+
+        The comparison is case insensitive. The lowercase titles are
+        scanned in title order, so the matches come out sorted.
+
+        Args:
+            search_term: The text to look for in the video titles.
+
+        Returns:
+            A list of Video objects, in the same order as
+            videos_sorted_by_title.
+        """
+        term = search_term.lower()
+        if not term:
+            return self.videos_sorted_by_title()
+        if "\n" in term:
+            return []
+        search = re.compile(re.escape(term.encode("utf-8"))).search
+        starts = self._lower_starts
+        videos = []
+        position = 0
+        while True:
+            match = search(self._lower_titles, position)
+            if match is None:
+                return videos
+            # Titles hold no newline, so a match never spans two titles.
+            index = bisect_right(starts, match.start()) - 1
+            videos.append(self._video(self._order[index]))
+            position = starts[index + 1]
+
+    def _tag_position(self, key):
+        """Returns where an encoded lowercase tag is, or belongs, in the
+        sorted tags."""
+        starts = self._tag_starts
+        low, high = 0, len(starts) - 1
+        while low < high:
+            middle = (low + high) // 2
+            tag = bytes(self._tag_text[starts[middle]:starts[middle + 1]])
+            if tag < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def videos_with_tag(self, video_tag):
+        """Returns all videos that have the given tag.
+
+        The comparison is case insensitive.
+
+        Args:
+            video_tag: The tag to look for.
+
+        Returns:
+            A list of Video objects, in the same order as
+            videos_sorted_by_title.
+        """
+        key = video_tag.lower().encode("utf-8")
+        index = self._tag_position(key)
+        starts = self._tag_starts
+        if index == len(starts) - 1 or (
+                self._tag_text[starts[index]:starts[index + 1]] != key):
+            return []
+        postings = self._postings[self._posting_starts[index]:
+                                  self._posting_starts[index + 1]]
+        return [self._video(self._order[position]) for position in postings]
+
+    def random_playable_video(self, rng):
+        """Returns a random video that is not flagged.
+
+        Args:
+            rng: The random.Random instance used to draw the video.
+
+        Returns:
+            A Video object. None if every video is flagged.
+        """
+        if self._state[1] >= self._count:
+            return None
+        # Random rows are drawn until an unflagged one comes up, which takes
+        # few draws unless most videos are flagged.
+        for _ in range(_RANDOM_ATTEMPTS):
+            row = rng.randrange(self._count)
+            if not self._flags[row]:
+                return self._video(row)
+        playable = [row for row in range(self._count) if not self._flags[row]]
+        return self._video(rng.choice(playable)) if playable else None
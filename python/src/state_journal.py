@@ -0,0 +1,225 @@
+"""A write-ahead journal of the playlists and flags of a player.
+
+Every change is appended to the current journal segment as one record:
+
+    length        payload length, unsigned 32-bit little-endian
+    checksum      crc32 of the payload, unsigned 32-bit little-endian
+    payload       the operation and its fields, UTF-8, separated by NUL
+
+Records reach the operating system as they are appended, so they survive
+the process crashing, and are fsynced in batches, so only the last batch
+can be lost when the machine goes down.
+
+Now and then the whole state is compacted into a snapshot file holding the
+records that rebuild it, and the journal moves on to a new segment. The
+snapshot names the first segment it does not cover, so recovery loads the
+snapshot and replays only the segments written after it. A record cut
+short by a crash ends its segment and is truncated away.
+"""
+
+from pathlib import Path
+import os
+import struct
+import threading
+import time
+import zlib
+
+
+_RECORD = struct.Struct("<II")
+_MAGIC = b"YTJS"
+_VERSION = 1
+# magic, version, first segment not covered, number of records.
+_SNAPSHOT_HEADER = struct.Struct("<4sIQQ")
+_SNAPSHOT_NAME = "state.snapshot"
+_SEGMENT_SUFFIX = ".journal"
+
+
+def _encode(op, fields):
+    payload = "\0".join((op, *fields)).encode("utf-8")
+    return _RECORD.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def _decode(data, offset=0):
+    """Yields the records in data and the offset after each one, stopping
+    at the first incomplete or corrupt record."""
+    end = len(data)
+    while offset + _RECORD.size <= end:
+        length, checksum = _RECORD.unpack_from(data, offset)
+        start = offset + _RECORD.size
+        payload = data[start:start + length]
+        if len(payload) != length or zlib.crc32(payload) != checksum:
+            return
+        offset = start + length
+        yield payload.decode("utf-8").split("\0"), offset
+
+
+class StateJournal:
+    """A class used to persist the playlists and flags of a VideoPlayer.
+
+    Records are (op, *fields) lists of strings. The journal does not
+    interpret them; the player decides what they mean.
+    """
+
+    def __init__(self, directory, sync_batch=256, sync_interval=1.0,
+                 snapshot_every=100_000):
+        """StateJournal constructor.
+
+        Args:
+            directory: The directory holding the snapshot and the journal
+                segments. It is created if needed.
+            sync_batch: The number of appended records after which the
+                journal is fsynced.
+            sync_interval: The number of seconds after which appended
+                records are fsynced, even if the batch is not full.
+            snapshot_every: The number of appended records after which
+                snapshot_due becomes True.
+        """
+        self._directory = Path(directory)
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self._sync_batch = sync_batch
+        self._sync_interval = sync_interval
+        self._snapshot_every = snapshot_every
+        self._lock = threading.Lock()
+        self._segment = 0
+        self._file = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._since_snapshot = 0
+
+    def _segment_path(self, segment):
+        return self._directory / f"{segment:012d}{_SEGMENT_SUFFIX}"
+
+    def _segments(self):
+        return sorted(int(path.name[:-len(_SEGMENT_SUFFIX)])
+                      for path in self._directory.glob(f"*{_SEGMENT_SUFFIX}"))
+
+    def recover(self):
+        """Yields the records of the saved state, oldest first: those of
+        the snapshot, then those of the journal tail.
+
+        The journal accepts appends once the generator is exhausted.
+        """
+        first_segment = 0
+        snapshot_path = self._directory / _SNAPSHOT_NAME
+        if snapshot_path.exists():
+            data = snapshot_path.read_bytes()
+            magic, version, first_segment, count = \
+                _SNAPSHOT_HEADER.unpack_from(data)
+            if magic != _MAGIC or version != _VERSION:
+                raise ValueError(f"{snapshot_path} is not a state snapshot")
+            recovered = 0
+            for record, _ in _decode(data, _SNAPSHOT_HEADER.size):
+                recovered += 1
+                yield record
+            if recovered != count:
+                raise ValueError(f"{snapshot_path} is corrupt")
+
+        segments = [segment for segment in self._segments()
+                    if segment >= first_segment]
+        valid_length = 0
+        for segment in segments:
+            data = self._segment_path(segment).read_bytes()
+            valid_length = 0
+            for record, valid_length in _decode(data):
+                self._since_snapshot += 1
+                yield record
+
+        self._segment = segments[-1] if segments else first_segment
+        self._file = open(self._segment_path(self._segment), "ab")
+        if segments:
+            # Drop a record torn by a crash, so new records follow valid
+            # ones.
+            self._file.truncate(valid_length)
+
+    def append(self, op, *fields):
+        """Appends a record to the journal.
+
+        Args:
+            op: The name of the operation.
+            fields: The string arguments of the operation.
+        """
+        record = _encode(op, fields)
+        with self._lock:
+            self._file.write(record)
+            self._file.flush()
+            self._unsynced += 1
+            self._since_snapshot += 1
+            if (self._unsynced >= self._sync_batch or
+                    time.monotonic() - self._last_sync >= self._sync_interval):
+                self._sync()
+
+    @property
+    def snapshot_due(self):
+        """Whether enough records were appended since the last snapshot
+        for write_snapshot to be worthwhile."""
+        return self._since_snapshot >= self._snapshot_every
+
+    def write_snapshot(self, records):
+        """Replaces the saved state with a compacted copy.
+
+        The current segment is closed and a new one started; the snapshot
+        covers everything before the new segment, and the older segments
+        are deleted once it is in place.
+
+        Args:
+            records: The records that rebuild the current state, as
+                (op, *fields) sequences of strings.
+        """
+        with self._lock:
+            self._sync()
+            self._file.close()
+            old_segment = self._segment
+            self._segment += 1
+            self._file = open(self._segment_path(self._segment), "ab")
+            self._since_snapshot = 0
+
+            body = bytearray()
+            count = 0
+            for op, *fields in records:
+                body += _encode(op, fields)
+                count += 1
+            snapshot_path = self._directory / _SNAPSHOT_NAME
+            temp_path = snapshot_path.with_name(f"{_SNAPSHOT_NAME}.tmp")
+            with open(temp_path, "wb") as snapshot_file:
+                snapshot_file.write(_SNAPSHOT_HEADER.pack(
+                    _MAGIC, _VERSION, self._segment, count))
+                snapshot_file.write(body)
+                snapshot_file.flush()
+                os.fsync(snapshot_file.fileno())
+            os.replace(temp_path, snapshot_path)
+            self._sync_directory()
+
+            for segment in self._segments():
+                if segment <= old_segment:
+                    self._segment_path(segment).unlink()
+
+    def sync(self):
+        """Forces the appended records to disk."""
+        with self._lock:
+            self._sync()
+
+    def _sync(self):
+        if self._unsynced:
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def _sync_directory(self):
+        try:
+            directory = os.open(self._directory, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(directory)
+        except OSError:
+            pass
+        finally:
+            os.close(directory)
+
+    def close(self):
+        """Syncs and closes the journal."""
+        with self._lock:
+            if self._file is not None:
+                self._sync()
+                self._file.close()
+                self._file = None
@@ -6,12 +6,14 @@ from typing import Sequence
 class Video:
     """A class used to represent a Video."""
 
+    # Large catalogs hold millions of videos, so skip the per-instance dict.
+    __slots__ = ("_title", "_video_id", "_is_flagged", "_flag_reason",
+                 "_tags")
+
     def __init__(self, video_title: str, video_id: str, video_tags: Sequence[str]):
         """Video constructor."""
         self._title = video_title
         self._video_id = video_id
-        self._is_playing = False
-        self._is_paused = False
         self._is_flagged = False
         self._flag_reason = ""
 
@@ -34,30 +36,6 @@ class Video:
         """Returns the list of tags of a video."""
         return self._tags
 
-    def play(self):
-        self._is_playing = True
-        self._is_paused = False
-
-    def pause(self):
-        self._is_playing = False
-        self._is_paused = True
-
-    def resume(self):
-        self._is_playing = True
-        self._is_paused = False
-
-    def stop(self):
-        self._is_playing = False
-        self._is_paused = False
-
-    @property
-    def is_paused(self) -> bool:
-        return self._is_paused
-
-    @property
-    def is_playing(self) -> bool:
-        return self._is_playing
-
     @property
     def is_flagged(self) -> bool:
         return self._is_flagged
@@ -68,4 +46,8 @@ class Video:
 
     def flag(self, reason):
         self._is_flagged = True
-        self._flag_reason = reason
\ No newline at end of file
+        self._flag_reason = reason
+
+    def allow(self):
+        self._is_flagged = False
+        self._flag_reason = ""
@@ -0,0 +1,114 @@
+"""Parsing of videos files.
+
+Each line of a videos file holds a title, a video id and comma-separated
+tags, separated by "|".
+
+Large files can be parsed in parallel: the file is split into byte
+ranges that start and end on line boundaries, the ranges are parsed in a
+process pool, and the records come back in file order. Feeding them to a
+library one after the other gives exactly the result of a sequential
+load, including for duplicate ids, where the last line wins. Both parsers
+share the same line parsing and, like it, assume that no field holds a
+quoted line break.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import csv
+import io
+import os
+
+
+# Helper Wrapper around CSV reader to strip whitespace from around
+# each item.
+def _csv_reader_with_strip(reader):
+    yield from ((item.strip() for item in line) for line in reader)
+
+
+def _read_video_file(video_file):
+    """Yields a (title, video_id, tags) tuple for each line of a videos
+    file."""
+    with open(video_file) as lines:
+        yield from _parse_video_lines(lines)
+
+
+def _parse_video_lines(lines):
+    """Yields a (title, video_id, tags) tuple for each line of videos file
+    text."""
+    reader = _csv_reader_with_strip(csv.reader(lines, delimiter="|"))
+    for video_info in reader:
+        title, url, tags = video_info
+        yield (
+            title,
+            url,
+            [tag.strip() for tag in tags.split(",")] if tags else [],
+        )
+
+
+# Files smaller than this per range are parsed in the calling process,
+# where starting the workers would cost more than it saves.
+_MIN_RANGE_SIZE = 1 << 20
+# Ranges per worker, so a worker that finishes early can take another one.
+_RANGES_PER_WORKER = 4
+
+
+def line_aligned_ranges(video_file, count):
+    """Splits a file into at most count (start, end) byte ranges, each
+    starting at the beginning of a line and ending after a newline or at
+    the end of the file."""
+    size = os.path.getsize(video_file)
+    bounds = [0]
+    with open(video_file, "rb") as data:
+        for i in range(1, count):
+            target = size * i // count
+            if target <= bounds[-1]:
+                continue
+            data.seek(target - 1)
+            # Finish the line the target falls in; if the byte before the
+            # target is a newline, the target already starts a line.
+            data.readline()
+            position = data.tell()
+            if bounds[-1] < position < size:
+                bounds.append(position)
+    bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+
+def _parse_range(video_file, start, end):
+    """Returns the records of the lines in a byte range of a file."""
+    with open(video_file, "rb") as data:
+        data.seek(start)
+        chunk = data.read(end - start)
+    # The same decoding and newline handling as open(video_file).
+    lines = io.TextIOWrapper(io.BytesIO(chunk))
+    # Share the tag strings, so each is pickled once per range.
+    tags_seen = {}
+    return [
+        (title, video_id, [tags_seen.setdefault(tag, tag) for tag in tags])
+        for title, video_id, tags in _parse_video_lines(lines)]
+
+
+def read_video_file_parallel(video_file, workers=None):
+    """Yields a (title, video_id, tags) tuple for each line of a videos
+    file, in file order, parsing the file in worker processes.
+
+    Args:
+        video_file: The videos file.
+        workers: The number of worker processes. Defaults to the number of
+            CPUs.
+    """
+    workers = workers or os.cpu_count() or 1
+    ranges = []
+    if workers > 1:
+        count = min(workers * _RANGES_PER_WORKER,
+                    os.path.getsize(video_file) // _MIN_RANGE_SIZE)
+        if count > 1:
+            ranges = line_aligned_ranges(video_file, count)
+    if len(ranges) <= 1:
+        yield from _read_video_file(video_file)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        chunks = executor.map(_parse_range, *zip(*(
+            (video_file, start, end) for start, end in ranges)))
+        for records in chunks:
+            yield from records
@@ -1,37 +1,360 @@
 """A video library class."""
 
 from .video import Video
+from .rwlock import ReadWriteLock, reader, writer
+from .video_snapshot import Snapshot, load_snapshot, write_snapshot
+from .video_file import read_video_file_parallel
+from array import array
 from pathlib import Path
-import csv
+from bisect import bisect_left, insort
+import itertools
+import os
 
 
-# Helper Wrapper around CSV reader to strip whitespace from around
-# each item.
-def _csv_reader_with_strip(reader):
-    yield from ((item.strip() for item in line) for line in reader)
+# Length of the title substrings used as keys of the title index.
+_NGRAM_SIZE = 3
 
 
-class VideoLibrary:
-    """A class used to represent a Video Library."""
+def _ngrams(text):
+    """Returns the set of distinct n-grams contained in text."""
+    return {text[i:i + _NGRAM_SIZE]
+            for i in range(len(text) - _NGRAM_SIZE + 1)}
+
+
+class CatalogDiff:
+    """The changes a reload applied to a library.
+
+    Each attribute lists video ids in catalog order: the videos that were
+    added, removed, and changed (retitled or retagged).
+    """
+
+    __slots__ = ("added", "removed", "changed")
 
     def __init__(self):
-        """The VideoLibrary class is initialized."""
+        self.added = []
+        self.removed = []
+        self.changed = []
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+
+class VideoLibrary:
+    """A class used to represent a Video Library.
+
+    The library can be shared between threads: lookups, searches and
+    listings run concurrently under a read lock, while changes take the
+    lock exclusively.
+    """
+
+    def __init__(self, video_file=None, snapshot_file=None, workers=1,
+                 records=None):
+        """The VideoLibrary class is initialized.
+
+        Args:
+            video_file: The videos file to load. Defaults to the videos.txt
+                shipped next to this module.
+            snapshot_file: Optional path of a compiled snapshot of the videos
+                file and of the indexes built from it. The library loads
+                from it when it matches the videos file, and rebuilds it
+                otherwise.
+            workers: The number of processes parsing the videos file, None
+                for one per CPU. Worth it for files of millions of lines.
+            records: Optional (title, video_id, tags) tuples to load instead
+                of the contents of the videos file, which is then only used
+                by reload.
+        """
         self._videos = {}
-        with open(Path(__file__).parent / "videos.txt") as video_file:
-            reader = _csv_reader_with_strip(
-                csv.reader(video_file, delimiter="|"))
-            for video_info in reader:
-                title, url, tags = video_info
-                self._videos[url] = Video(
-                    title,
-                    url,
-                    [tag.strip() for tag in tags.split(",")] if tags else [],
-                )
+        # Position of each video in insertion order, used to return index
+        # lookups in the same order as a scan over self._videos.
+        self._ranks = {}
+        self._rank_counter = itertools.count()
+        self._lower_titles = {}
+        # (title, rank, video_id) of every video, kept sorted so listings
+        # come out in title order without sorting the catalog per request.
+        # None while the catalog is loaded, and sorted once afterwards.
+        self._title_order = None
+        self._title_index = {}
+        self._tag_index = {}
+        # Shared copies of every tag string and tag tuple seen so far, so
+        # videos with the same tags do not each hold their own copies.
+        self._tag_table = {}
+        # Ids of the unflagged videos, and the position of each id in that
+        # list, so videos can be drawn at random and swap-removed in O(1).
+        self._playable_ids = []
+        self._playable_positions = {}
+        self._listeners = []
+        # Searches and listings share the lock, changes hold it alone.
+        self._lock = ReadWriteLock()
+
+        if video_file is None:
+            video_file = Path(__file__).parent / "videos.txt"
+        self._video_file = video_file
+        self._workers = workers
+        if records is None and snapshot_file is not None:
+            snapshot = load_snapshot(snapshot_file, video_file)
+            if snapshot is not None:
+                self._load_snapshot(snapshot)
+                return
+        parsed = records is None
+        if parsed:
+            source_stat = os.stat(video_file)
+            records = read_video_file_parallel(video_file, workers)
+
+        for title, url, tags in records:
+            self._store_video(Video(title, url, self._intern_tags(tags)))
+        self._title_order = sorted(
+            (video.title, self._ranks[video_id], video_id)
+            for video_id, video in self._videos.items())
+
+        if parsed and snapshot_file is not None:
+            write_snapshot(snapshot_file, video_file, source_stat,
+                           self._snapshot())
+
+    def _snapshot(self):
+        """Returns the Snapshot of a freshly loaded library, whose ranks are
+        the positions of the videos."""
+        ranks = self._ranks
+        return Snapshot(
+            [(video.title, video.video_id, video.tags)
+             for video in self._videos.values()],
+            [rank for _, rank, _ in self._title_order],
+            {gram: array("I", map(ranks.__getitem__, video_ids))
+             for gram, video_ids in self._title_index.items()},
+            {tag: array("I", map(ranks.__getitem__, video_ids))
+             for tag, video_ids in self._tag_index.items()})
+
+    def _load_snapshot(self, snapshot):
+        """Fills the library and its indexes from a Snapshot, without
+        indexing the videos one by one."""
+        videos = [Video(title, video_id, self._intern_tags(tags))
+                  for title, video_id, tags in snapshot.records]
+        ids = [video.video_id for video in videos]
+        positions = range(len(ids))
+        self._videos = dict(zip(ids, videos))
+        self._ranks = dict(zip(ids, positions))
+        self._rank_counter = itertools.count(len(ids))
+        self._lower_titles = {video.video_id: video.title.lower()
+                              for video in videos}
+        self._title_order = [
+            (videos[position].title, position, ids[position])
+            for position in snapshot.title_order]
+        video_id = ids.__getitem__
+        self._title_index = {
+            gram: set(map(video_id, postings))
+            for gram, postings in snapshot.title_index.items()}
+        self._tag_index = {
+            tag: set(map(video_id, postings))
+            for tag, postings in snapshot.tag_index.items()}
+        self._playable_ids = ids
+        self._playable_positions = dict(zip(ids, positions))
+
+    def _intern_tags(self, tags):
+        """Returns the shared tuple holding the given tags."""
+        key = tuple(tags)
+        shared = self._tag_table.get(key)
+        if shared is None:
+            shared = tuple(self._tag_table.setdefault(tag, tag) for tag in key)
+            self._tag_table[shared] = shared
+        return shared
+
+    def _store_video(self, video):
+        """Adds a video to the library and its indexes, replacing any video
+        with the same id."""
+        video_id = video.video_id
+        if video_id in self._videos:
+            self._unindex_video(self._videos[video_id])
+        else:
+            self._ranks[video_id] = next(self._rank_counter)
+        self._videos[video_id] = video
+        self._index_video(video)
+
+    def _index_video(self, video):
+        if not video.is_flagged:
+            self._add_playable(video.video_id)
+        self._index_title(video)
+        for tag in video.tags:
+            self._tag_index.setdefault(tag.lower(), set()).add(video.video_id)
+
+    def _unindex_video(self, video):
+        self._remove_playable(video.video_id)
+        self._unindex_title(video)
+        for tag in video.tags:
+            key = tag.lower()
+            postings = self._tag_index[key]
+            postings.discard(video.video_id)
+            if not postings:
+                del self._tag_index[key]
+
+    def _add_playable(self, video_id):
+        if video_id not in self._playable_positions:
+            self._playable_positions[video_id] = len(self._playable_ids)
+            self._playable_ids.append(video_id)
+
+    def _remove_playable(self, video_id):
+        position = self._playable_positions.pop(video_id, None)
+        if position is None:
+            return
+        last_id = self._playable_ids.pop()
+        if last_id != video_id:
+            self._playable_ids[position] = last_id
+            self._playable_positions[last_id] = position
+
+    def _index_title(self, video):
+        if self._title_order is not None:
+            insort(self._title_order,
+                   (video.title, self._ranks[video.video_id], video.video_id))
+        lower_title = video.title.lower()
+        self._lower_titles[video.video_id] = lower_title
+        for gram in _ngrams(lower_title):
+            self._title_index.setdefault(gram, set()).add(video.video_id)
+
+    def _unindex_title(self, video):
+        video_id = video.video_id
+        if self._title_order is not None:
+            key = (video.title, self._ranks[video_id], video_id)
+            del self._title_order[bisect_left(self._title_order, key)]
+        lower_title = self._lower_titles.pop(video_id)
+        for gram in _ngrams(lower_title):
+            postings = self._title_index[gram]
+            postings.discard(video_id)
+            if not postings:
+                del self._title_index[gram]
+
+    def _in_title_order(self, video_ids):
+        """Returns the videos with the given ids sorted by title.
+
+        Small sets are sorted directly, large ones are collected by walking
+        the title order, whichever takes fewer steps.
+        """
+        if len(video_ids) * len(video_ids).bit_length() < len(
+                self._title_order):
+            ranks = self._ranks
+            keys = sorted((self._videos[video_id].title, ranks[video_id],
+                           video_id) for video_id in video_ids)
+            return [self._videos[video_id] for _, _, video_id in keys]
+        return [self._videos[video_id]
+                for _, _, video_id in self._title_order
+                if video_id in video_ids]
+
+    @writer
+    def subscribe(self, listener):
+        """Registers a callable notified of every change to the library.
+
+        The listener is called with the event, one of "add", "remove",
+        "flag" or "allow", and the Video object concerned. A reload sends
+        no per-video events but a single "reload" event with its
+        CatalogDiff.
+        """
+        self._listeners.append(listener)
+
+    @writer
+    def unsubscribe(self, listener):
+        """Stops notifying a listener registered with subscribe."""
+        self._listeners.remove(listener)
+
+    def _notify(self, event, video):
+        for listener in self._listeners:
+            listener(event, video)
+
+    @writer
+    def add_video(self, video):
+        """Adds a video to the library, replacing any video with the same id.
+
+        Args:
+            video: The Video object to add.
+        """
+        self._add_video(video)
+
+    def _add_video(self, video, notify=True):
+        replaced = self._videos.get(video.video_id)
+        self._store_video(video)
+        if not notify:
+            return
+        if replaced:
+            self._notify("remove", replaced)
+        self._notify("add", video)
+
+    @writer
+    def remove_video(self, video_id):
+        """Removes a video from the library.
+
+        Args:
+            video_id: The video url.
+
+        Returns:
+            The removed Video object. None if the video does not exist.
+        """
+        return self._remove_video(video_id)
+
+    def _remove_video(self, video_id, notify=True):
+        video = self._videos.pop(video_id, None)
+        if video:
+            self._unindex_video(video)
+            del self._ranks[video_id]
+            if notify:
+                self._notify("remove", video)
+        return video
+
+    @property
+    def video_file(self):
+        """Returns the path of the videos file the library was loaded
+        from."""
+        return self._video_file
 
+    def reload(self):
+        """Applies the changes made to the videos file since it was loaded.
+
+        Only the videos whose line was added, removed or changed are
+        touched, so the indexes are updated in place and the flags of the
+        other videos are kept. A changed video keeps its flag. The file is
+        parsed before the library is locked, so searches only wait while
+        the changes are applied.
+
+        Returns:
+            The CatalogDiff of the applied changes.
+        """
+        records = {video_id: (title, tags) for title, video_id, tags
+                   in read_video_file_parallel(self._video_file,
+                                               self._workers)}
+        return self._apply_records(records)
+
+    @writer
+    def _apply_records(self, records):
+        diff = CatalogDiff()
+        for video_id in [video_id for video_id in self._videos
+                         if video_id not in records]:
+            self._remove_video(video_id, notify=False)
+            diff.removed.append(video_id)
+
+        for video_id, (title, tags) in records.items():
+            video = self._videos.get(video_id)
+            if video is None:
+                diff.added.append(video_id)
+            elif video.title != title or video.tags != tuple(tags):
+                diff.changed.append(video_id)
+            else:
+                continue
+            replacement = Video(title, video_id, self._intern_tags(tags))
+            if video is not None and video.is_flagged:
+                replacement.flag(video.flag_reason)
+            self._add_video(replacement, notify=False)
+        if diff:
+            # One event for the whole reload: listeners such as the search
+            # cache would otherwise do their work once per video.
+            self._notify("reload", diff)
+        return diff
+
+    def __len__(self):
+        """Returns the number of videos in the library."""
+        return len(self._videos)
+
+    @reader
     def get_all_videos(self):
         """Returns all available video information from the video library."""
         return list(self._videos.values())
 
+    @reader
     def get_video(self, video_id):
         """Returns the video object (title, url, tags) from the video library.
 
@@ -43,3 +366,122 @@ class VideoLibrary:
             does not exist.
         """
         return self._videos.get(video_id, None)
+
+    @reader
+    def videos_sorted_by_title(self, offset=0, limit=None):
+        """Returns all videos sorted by title.
+
+        Videos with the same title are in the order of get_all_videos.
+
+        Args:
+            offset: The number of videos to skip.
+            limit: The maximum number of videos to return, None for all.
+        """
+        stop = None if limit is None else offset + limit
+        return [self._videos[video_id]
+                for _, _, video_id in self._title_order[offset:stop]]
+
+    @reader
+    def search_titles(self, search_term):
+        """Returns all videos whose title contains the search term.
+
+        The comparison is case insensitive. Terms at least as long as an
+        n-gram are answered from the title index: the posting lists of the
+        term's n-grams are intersected and only the surviving candidates are
+        checked against the full term.
+
+        Args:
+            search_term: The text to look for in the video titles.
+
+        Returns:
+            A list of Video objects, in the same order as
+            videos_sorted_by_title.
+        """
+        term = search_term.lower()
+        if len(term) < _NGRAM_SIZE:
+            return [self._videos[video_id]
+                    for _, _, video_id in self._title_order
+                    if term in self._lower_titles[video_id]]
+
+        postings = []
+        for gram in _ngrams(term):
+            posting = self._title_index.get(gram)
+            if not posting:
+                return []
+            postings.append(posting)
+        postings.sort(key=len)
+
+        candidates = postings[0].intersection(*postings[1:])
+        return self._in_title_order({
+            video_id for video_id in candidates
+            if term in self._lower_titles[video_id]})
+
+    @reader
+    def videos_with_tag(self, video_tag):
+        """Returns all videos that have the given tag.
+
+        The comparison is case insensitive.
+
+        Args:
+            video_tag: The tag to look for.
+
+        Returns:
+            A list of Video objects, in the same order as
+            videos_sorted_by_title.
+        """
+        return self._in_title_order(
+            self._tag_index.get(video_tag.lower(), set()))
+
+    @writer
+    def flag_video(self, video_id, flag_reason):
+        """Marks a video as flagged so it can no longer be played.
+
+        Args:
+            video_id: The video url.
+            flag_reason: Reason for flagging the video.
+
+        Returns:
+            True if the video was flagged, False if it does not exist or was
+            already flagged.
+        """
+        video = self._videos.get(video_id)
+        if video is None or video.is_flagged:
+            return False
+        video.flag(flag_reason)
+        self._remove_playable(video_id)
+        self._notify("flag", video)
+        return True
+
+    @writer
+    def allow_video(self, video_id):
+        """Removes the flag from a video.
+
+        Args:
+            video_id: The video url.
+
+        Returns:
+            True if the flag was removed, False if the video does not exist
+            or was not flagged.
+        """
+        video = self._videos.get(video_id)
+        if video is None or not video.is_flagged:
+            return False
+        video.allow()
+        self._add_playable(video_id)
+        self._notify("allow", video)
+        return True
+
+    @reader
+    def random_playable_video(self, rng):
+        """Returns a random video that is not flagged.
+
+        Args:
+            rng: The random.Random instance used to draw the video.
+
+        Returns:
+            A Video object. None if every video is flagged.
+        """
+        if not self._playable_ids:
+            return None
+        video_id = self._playable_ids[rng.randrange(len(self._playable_ids))]
+        return self._videos[video_id]
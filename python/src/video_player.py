@@ -3,42 +3,301 @@
 from src import video
 from .video_library import VideoLibrary
 from .video_playlist import Playlist
-from random import choice
+from .search_cache import SearchCache
+from itertools import islice
+from random import Random
+import functools
+import heapq
+import re
+import threading
+import time
+
+
+def _synchronized(method):
+    """Runs a VideoPlayer method while holding the player's lock."""
+    @functools.wraps(method)
+    def locked(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return locked
+
+
+# Used by the players created without a seed, so they do not each carry
+# the few kilobytes of a Random instance's state.
+_SHARED_RANDOM = Random()
+
 
 class VideoPlayer:
-    """A class used to represent a Video Player."""
+    """A class used to represent a Video Player.
+
+    A player holds the state of one user session: the playing video, the
+    playlists and the last search results. The library, and optionally the
+    search cache, can be shared by many players.
+    """
+
+    __slots__ = ("_video_library", "_search_cache", "_random",
+                 "_interactive", "_lock", "_current_playing_video",
+                 "_is_paused", "_playlists", "_last_results",
+                 "_playable_results", "_print", "_journal",
+                 "_metrics", "_cache_listener")
 
-    def __init__(self):
-        self._video_library = VideoLibrary()
+    def __init__(self, seed=None, video_library=None, search_cache_size=256,
+                 interactive=True, search_cache=None, output=None,
+                 journal=None, metrics=None):
+        """VideoPlayer constructor.
+
+        Args:
+            seed: Optional seed for PLAY_RANDOM, for reproducible runs.
+            video_library: The library to play videos from, for instance a
+                ColumnarVideoLibrary. Defaults to a new VideoLibrary.
+            search_cache_size: The number of search queries whose results
+                are cached, 0 to disable the cache.
+            interactive: Whether searches ask on stdin which result to play.
+                When False, searches return right after listing the results
+                and a result is played with play_result.
+            search_cache: A SearchCache already subscribed to the library,
+                shared with other players. Replaces search_cache_size.
+            output: The text stream the player writes to. Defaults to the
+                current sys.stdout.
+            journal: Optional StateJournal the playlists and flags are
+                saved to. The state it holds is restored first.
+            metrics: Optional Metrics recording the latency and result
+                count of the searches. None disables the timing.
+        """
+        if video_library is None:
+            video_library = VideoLibrary()
+        self._video_library = video_library
+        # The listener of a cache owned by this player, unsubscribed by
+        # close. An empty cache stores nothing and needs no listener.
+        self._cache_listener = None
+        if search_cache is None:
+            search_cache = SearchCache(search_cache_size)
+            if search_cache_size > 0:
+                self._cache_listener = search_cache.video_changed
+                video_library.subscribe(self._cache_listener)
+        self._search_cache = search_cache
+        self._random = _SHARED_RANDOM if seed is None else Random(seed)
+        self._interactive = interactive
+        self._print = functools.partial(print, file=output)
+        self._metrics = metrics
+        # Guards the playback, playlist and search state of this player.
+        self._lock = threading.RLock()
         self._current_playing_video = None
+        self._is_paused = False
         self._playlists = {}
+        # The results of the last search, and the range of result indexes
+        # that were shown and can be played.
+        self._last_results = ()
+        self._playable_results = range(0)
+        self._journal = None
+        if journal is not None:
+            self._restore(journal.recover())
+            self._journal = journal
+
+    # Persistence
+    def _restore(self, records):
+        """Replays journal records without printing or journaling them.
+
+        The records are folded into the final playlists and flags first,
+        so the library is only touched once per video however long the
+        journal is. Videos that are no longer in the library are skipped.
+        """
+        playlists = {}
+        flags = {}
+        for op, *fields in records:
+            if op == "create":
+                playlists[self.normalize_playlist_name(fields[0])] = (
+                    fields[0], {})
+            elif op == "delete":
+                playlists.pop(fields[0], None)
+            elif op == "flag":
+                flags[fields[0]] = fields[1]
+            elif op == "allow":
+                flags[fields[0]] = None
+            elif fields[0] in playlists:
+                video_ids = playlists[fields[0]][1]
+                if op == "add":
+                    video_ids[fields[1]] = None
+                elif op == "remove":
+                    video_ids.pop(fields[1], None)
+                else:
+                    video_ids.clear()
+
+        library = self._video_library
+        for video_id, reason in flags.items():
+            if reason is None:
+                library.allow_video(video_id)
+            else:
+                library.flag_video(video_id, reason)
+        for name, (original_name, video_ids) in playlists.items():
+            playlist = self._playlists[name] = Playlist(original_name, name)
+            for video_id in video_ids:
+                video = library.get_video(video_id)
+                if video is not None:
+                    playlist.add_video(video)
+
+    def _state_records(self):
+        """Yields the journal records that rebuild the current state."""
+        for name, playlist in self._playlists.items():
+            yield ("create", playlist.original_name)
+            for video_id in playlist.videos:
+                yield ("add", name, video_id)
+        for video in self._video_library.get_all_videos():
+            if video.is_flagged:
+                yield ("flag", video.video_id, video.flag_reason)
 
-    # Utility functions
-    def sort_videos_by_title(self, video):
-        return video.title
+    def _record(self, op, *fields):
+        """Appends a change to the journal, compacting it when due."""
+        journal = self._journal
+        if journal is None:
+            return
+        journal.append(op, *fields)
+        if journal.snapshot_due:
+            journal.write_snapshot(self._state_records())
+
+    @_synchronized
+    def close(self):
+        """Syncs and closes the journal, if any, and stops updating the
+        search cache owned by this player."""
+        if self._cache_listener is not None:
+            self._video_library.unsubscribe(self._cache_listener)
+            self._cache_listener = None
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
 
+    # Utility functions
     def normalize_playlist_name(self, playlist_name):
         return playlist_name.replace(" ", "").lower()
 
-    def number_of_videos(self):
-        num_videos = len(self._video_library.get_all_videos())
-        print(f"{num_videos} videos in the library")
+    def format_video(self, video):
+        return f"{video.title} ({video.video_id}) [{' '.join(video.tags)}]"
 
-    def show_all_videos(self):
-        """Returns all videos."""
+    def format_listed_video(self, video):
+        suffix = f" - FLAGGED (reason: {video.flag_reason})" if video.is_flagged else ""
+        return f"\t {self.format_video(video)}{suffix}"
 
-        # Get the videos
-        videos = self._video_library.get_all_videos()
+    def _page(self, items, offset, limit):
+        return islice(items, offset, None if limit is None else offset + limit)
 
-        # Sort by title
-        videos.sort(key = self.sort_videos_by_title)
+    def find_videos(self, search_term):
+        """Returns a tuple of the unflagged videos whose titles contain the
+        search_term, sorted by title. Nothing is printed or asked.
 
-        print("Here's a list of all available videos:")
+        Args:
+            search_term: The query to be used in search.
+        """
+        return self._find("find_videos", ("title", search_term.lower()),
+                          self._video_library.search_titles, search_term)
+
+    def find_videos_with_tag(self, video_tag):
+        """Returns a tuple of the unflagged videos that have the given tag,
+        sorted by title. Nothing is printed or asked.
+
+        Args:
+            video_tag: The video tag to be used in search.
+        """
+        return self._find("find_videos_with_tag", ("tag", video_tag.lower()),
+                          self._video_library.videos_with_tag, video_tag)
+
+    def _find(self, operation, key, search, query):
+        """Returns the unflagged videos search(query) finds, through the
+        search cache."""
+        metrics = self._metrics
+        if metrics is not None:
+            start = time.perf_counter_ns()
+        videos = self._search_cache.get(key)
+        if videos is None:
+            generation = self._search_cache.generation
+            videos = tuple(
+                video for video in search(query) if not video.is_flagged)
+            self._search_cache.put(key, videos, generation)
+        if metrics is not None:
+            metrics.observe(operation, time.perf_counter_ns() - start,
+                            results=len(videos))
+        return videos
+
+    def search_cache_stats(self):
+        """Returns the hit, miss, eviction and invalidation counters of the
+        search result cache."""
+        return self._search_cache.stats()
+
+    # Streaming API: each generator yields the lines the matching command
+    # prints for its results, formatting one row at a time.
+    def iter_all_videos(self, offset=0, limit=None):
+        """Yields the rows of SHOW_ALL_VIDEOS, sorted by title.
+
+        Args:
+            offset: The number of rows to skip.
+            limit: The maximum number of rows to yield, None for all.
+        """
+        for video in self._video_library.videos_sorted_by_title(offset, limit):
+            yield self.format_listed_video(video)
+
+    def iter_playlist(self, playlist_name, offset=0, limit=None):
+        """Yields the rows of SHOW_PLAYLIST. Yields nothing if the playlist
+        does not exist.
+
+        Args:
+            playlist_name: The playlist name.
+            offset: The number of rows to skip.
+            limit: The maximum number of rows to yield, None for all.
+        """
+        with self._lock:
+            playlist = self._playlists.get(self.normalize_playlist_name(playlist_name))
+            if playlist is None:
+                return
+            video_ids = list(self._page(playlist.videos, offset, limit))
+        for video_id in video_ids:
+            video = self._video_library.get_video(video_id)
+            # Skips videos a reload removed before the playlists were
+            # reconciled.
+            if video is not None:
+                yield self.format_listed_video(video)
+
+    def iter_search_results(self, search_term, offset=0, limit=None):
+        """Yields the numbered rows of SEARCH_VIDEOS.
+
+        Args:
+            search_term: The query to be used in search.
+            offset: The number of rows to skip.
+            limit: The maximum number of rows to yield, None for all.
+        """
+        return self._iter_results(self.find_videos(search_term), offset, limit)
+
+    def iter_tag_results(self, video_tag, offset=0, limit=None):
+        """Yields the numbered rows of SEARCH_VIDEOS_WITH_TAG.
+
+        Args:
+            video_tag: The video tag to be used in search.
+            offset: The number of rows to skip.
+            limit: The maximum number of rows to yield, None for all.
+        """
+        return self._iter_results(self.find_videos_with_tag(video_tag), offset, limit)
+
+    def _iter_results(self, videos, offset, limit):
+        for index, video in enumerate(self._page(videos, offset, limit),
+                                      offset + 1):
+            yield f"\t{index}) {self.format_video(video)}"
+
+    def number_of_videos(self):
+        num_videos = len(self._video_library)
+        self._print(f"{num_videos} videos in the library")
 
-        for video in videos:
-            suffix = f" - FLAGGED (reason: {video.flag_reason})" if video.is_flagged else ""
-            print(f"\t {video.title} ({video.video_id}) [{' '.join(video.tags)}]{suffix}")
+    def show_all_videos(self, offset=0, limit=None):
+        """Returns all videos.
 
+        Args:
+            offset: The number of videos to skip.
+            limit: The maximum number of videos to show, None for all.
+        """
+
+        self._print("Here's a list of all available videos:")
+
+        for line in self.iter_all_videos(offset, limit):
+            self._print(line)
+
+    @_synchronized
     def play_video(self, video_id):
         """Plays the respective video.
 
@@ -52,97 +311,86 @@ class VideoPlayer:
         # Make sure video exists
         if video:
             if video.is_flagged:
-                print(f"Cannot play video: Video is currently flagged (reason: {video.flag_reason})")
+                self._print(f"Cannot play video: Video is currently flagged (reason: {video.flag_reason})")
                 return
 
             # Stop any playing video
             if (self._current_playing_video):
-                print(f"Stopping video: {self._current_playing_video.title}")
-                self._current_playing_video.stop()
-            
+                self._print(f"Stopping video: {self._current_playing_video.title}")
+
             # Play the current video
             self._current_playing_video = video
-            print(f"Playing video: {self._current_playing_video.title}")
-            self._current_playing_video.play()
+            self._is_paused = False
+            self._print(f"Playing video: {self._current_playing_video.title}")
         else:
-            print("Cannot play video: Video does not exist")
+            self._print("Cannot play video: Video does not exist")
 
+    @_synchronized
     def stop_video(self):
         """Stops the current video."""
 
         # Stop the current playing video
         if (self._current_playing_video):
-            print(f"Stopping video: {self._current_playing_video.title}")
-            self._current_playing_video.stop()
+            self._print(f"Stopping video: {self._current_playing_video.title}")
             self._current_playing_video = None
+            self._is_paused = False
         else:
-            print("Cannot stop video: No video is currently playing")
+            self._print("Cannot stop video: No video is currently playing")
 
+    @_synchronized
     def play_random_video(self):
         """Plays a random video from the video library."""
 
-        # Get the videos
-        videos = self._video_library.get_all_videos()
-        if len(videos) == 0:
-            print("No videos available")
-            return
-
-        # Make sure all videos are not flagged
-        all_flaged = True
-        for video in videos:
-            if not video.is_flagged:
-                all_flaged = False
-                break
-
-        if all_flaged:
-            print("No videos available")
+        # Get a random video to play among the unflagged ones
+        random_video = self._video_library.random_playable_video(self._random)
+        if not random_video:
+            self._print("No videos available")
             return
 
-        # Get a random video to play
-        random_video = choice(videos)
-        while random_video.is_flagged:
-            random_video = choice(videos)
-
         # Play the video
         self.play_video(random_video.video_id)
 
+    @_synchronized
     def pause_video(self):
         """Pauses the current video."""
 
         # Pause the current playing video
         if (self._current_playing_video):
-            if (self._current_playing_video.is_paused):
-                print(f"Video already paused: {self._current_playing_video.title}")
+            if (self._is_paused):
+                self._print(f"Video already paused: {self._current_playing_video.title}")
             else:
-                self._current_playing_video.pause()
-                print(f"Pausing video: {self._current_playing_video.title}")
+                self._is_paused = True
+                self._print(f"Pausing video: {self._current_playing_video.title}")
         else:
-            print("Cannot pause video: No video is currently playing")
+            self._print("Cannot pause video: No video is currently playing")
 
+    @_synchronized
     def continue_video(self):
         """Resumes playing the current video."""
 
         # Continue the current playing video
         if (self._current_playing_video):
-            if (not self._current_playing_video.is_paused):
-                print("Cannot continue video: Video is not paused")
+            if (not self._is_paused):
+                self._print("Cannot continue video: Video is not paused")
             else:
-                self._current_playing_video.resume()
-                print(f"Continuing video: {self._current_playing_video.title}")
+                self._is_paused = False
+                self._print(f"Continuing video: {self._current_playing_video.title}")
         else:
-            print("Cannot continue video: No video is currently playing")
+            self._print("Cannot continue video: No video is currently playing")
 
+    @_synchronized
     def show_playing(self):
         """Displays video currently playing."""
 
         # Display the current playing video
         if (self._current_playing_video):
-            paused_state = " - PAUSED" if self._current_playing_video.is_paused else ""
+            paused_state = " - PAUSED" if self._is_paused else ""
             video = self._current_playing_video
-            print(f"Currently playing: {video.title} ({video.video_id}) [{' '.join(video.tags)}]{paused_state}")
+            self._print(f"Currently playing: {video.title} ({video.video_id}) [{' '.join(video.tags)}]{paused_state}")
         else:
-            print("No video is currently playing")
+            self._print("No video is currently playing")
 
+    @_synchronized
     def create_playlist(self, playlist_name):
         """Creates a playlist with a given name.
 
@@ -152,11 +400,13 @@ class VideoPlayer:
         
         name = self.normalize_playlist_name(playlist_name)
         if name in self._playlists:
-            print("Cannot create playlist: A playlist with the same name already exists")
+            self._print("Cannot create playlist: A playlist with the same name already exists")
         else:
             self._playlists[name] = Playlist(playlist_name, name)
-            print(f"Successfully created new playlist: {playlist_name}")
+            self._record("create", playlist_name)
+            self._print(f"Successfully created new playlist: {playlist_name}")
 
+    @_synchronized
     def add_to_playlist(self, playlist_name, video_id):
         """Adds a video to a playlist with a given name.
 
@@ -167,61 +417,65 @@ class VideoPlayer:
         
         name = self.normalize_playlist_name(playlist_name)
         if (name not in self._playlists):
-            print(f"Cannot add video to {playlist_name}: Playlist does not exist")
+            self._print(f"Cannot add video to {playlist_name}: Playlist does not exist")
             return
         
         playlist = self._playlists[name]
         video = self._video_library.get_video(video_id)
         if (not video):
-            print(f"Cannot add video to {playlist_name}: Video does not exist")
+            self._print(f"Cannot add video to {playlist_name}: Video does not exist")
             return
 
         if video.is_flagged:
-            print(f"CCannot add video to my_playlist: Video is currently flagged (reason: {video.flag_reason})")
+            self._print(f"CCannot add video to my_playlist: Video is currently flagged (reason: {video.flag_reason})")
             return
 
         if (playlist.has_video(video)):
-            print(f"Cannot add video to {playlist_name}: Video already added")
+            self._print(f"Cannot add video to {playlist_name}: Video already added")
             return
 
         playlist.add_video(video)
-        print(f"Added video to {playlist_name}: {video.title}")
+        self._record("add", name, video_id)
+        self._print(f"Added video to {playlist_name}: {video.title}")
 
+    @_synchronized
     def show_all_playlists(self):
         """Display all playlists."""
 
         if len(self._playlists) == 0:
-            print("No playlists exist yet")
+            self._print("No playlists exist yet")
             return
 
-        print("Showing all playlists:")
+        self._print("Showing all playlists:")
         for name in sorted(self._playlists.keys()):
             playlist = self._playlists[name]
-            print(f"\t{playlist.original_name}")
+            self._print(f"\t{playlist.original_name}")
 
-    def show_playlist(self, playlist_name):
+    @_synchronized
+    def show_playlist(self, playlist_name, offset=0, limit=None):
         """Display all videos in a playlist with a given name.
 
         Args:
             playlist_name: The playlist name.
+            offset: The number of videos to skip.
+            limit: The maximum number of videos to show, None for all.
         """
         
         name = self.normalize_playlist_name(playlist_name)
         if (name not in self._playlists):
-            print(f"Cannot show playlist {playlist_name}: Playlist does not exist")
+            self._print(f"Cannot show playlist {playlist_name}: Playlist does not exist")
             return
 
-        print(f"Showing playlist: {playlist_name}")
+        self._print(f"Showing playlist: {playlist_name}")
 
         playlist = self._playlists[name]
         if len(playlist.videos) == 0:
-            print("No videos here yet")
+            self._print("No videos here yet")
         else:
-            for video_id in playlist.videos:
-                video = self._video_library.get_video(video_id)
-                suffix = f" - FLAGGED (reason: {video.flag_reason})" if video.is_flagged else ""
-                print(f"\t {video.title} ({video.video_id}) [{' '.join(video.tags)}]{suffix}")
+            for line in self.iter_playlist(playlist_name, offset, limit):
+                self._print(line)
 
+    @_synchronized
     def remove_from_playlist(self, playlist_name, video_id):
         """Removes a video to a playlist with a given name.
 
@@ -232,22 +486,24 @@ class VideoPlayer:
         
         name = self.normalize_playlist_name(playlist_name)
         if (name not in self._playlists):
-            print(f"Cannot remove video from {playlist_name}: Playlist does not exist")
+            self._print(f"Cannot remove video from {playlist_name}: Playlist does not exist")
             return
         
         playlist = self._playlists[name]
         video = self._video_library.get_video(video_id)
         if (not video):
-            print(f"Cannot remove video from {playlist_name}: Video does not exist")
+            self._print(f"Cannot remove video from {playlist_name}: Video does not exist")
             return
 
         if (not playlist.has_video(video)):
-            print(f"Cannot remove video from {playlist_name}: Video is not in playlist")
+            self._print(f"Cannot remove video from {playlist_name}: Video is not in playlist")
             return
 
         playlist.remove_video(video)
-        print(f"Removed video from {playlist_name}: {video.title}")
+        self._record("remove", name, video_id)
+        self._print(f"Removed video from {playlist_name}: {video.title}")
 
+    @_synchronized
     def clear_playlist(self, playlist_name):
         """Removes all videos from a playlist with a given name.
 
@@ -257,13 +513,15 @@ class VideoPlayer:
         
         name = self.normalize_playlist_name(playlist_name)
         if (name not in self._playlists):
-            print(f"Cannot clear playlist {playlist_name}: Playlist does not exist")
+            self._print(f"Cannot clear playlist {playlist_name}: Playlist does not exist")
             return
 
         playlist = self._playlists[name]
         playlist.clear()
-        print(f"Successfully removed all videos from {playlist_name}")
+        self._record("clear", name)
+        self._print(f"Successfully removed all videos from {playlist_name}")
 
+    @_synchronized
     def delete_playlist(self, playlist_name):
         """Deletes a playlist with a given name.
 
@@ -273,85 +531,140 @@ class VideoPlayer:
         
         name = self.normalize_playlist_name(playlist_name)
         if (name not in self._playlists):
-            print(f"Cannot delete playlist {playlist_name}: Playlist does not exist")
+            self._print(f"Cannot delete playlist {playlist_name}: Playlist does not exist")
             return
 
         self._playlists.pop(name)
-        print(f"Deleted playlist: {playlist_name}")
+        self._record("delete", name)
+        self._print(f"Deleted playlist: {playlist_name}")
 
-    def search_videos(self, search_term):
+    @_synchronized
+    def reconcile_playlists(self, video_ids):
+        """Removes videos from every playlist, silently and in one pass,
+        and stops the current video if it is one of them.
+
+        Called after a reload removed videos from the library, so playlists
+        do not list videos that no longer exist.
+
+        Args:
+            video_ids: The ids of the removed videos.
+        """
+        removed = set(video_ids)
+        for name, playlist in self._playlists.items():
+            for video_id in sorted(playlist.remove_video_ids(removed)):
+                self._record("remove", name, video_id)
+        playing = self._current_playing_video
+        if playing is not None and playing.video_id in removed:
+            self._current_playing_video = None
+            self._is_paused = False
+
+    @_synchronized
+    def search_videos(self, search_term, offset=0, limit=None):
         """Display all the videos whose titles contain the search_term.
 
         Args:
             search_term: The query to be used in search.
+            offset: The number of results to skip.
+            limit: The maximum number of results to show, None for all.
         """
-        
-        videos = []
-        for video in self._video_library.get_all_videos():
-            if not video.is_flagged and search_term.lower() in video.title.lower():
-                videos.append(video)
 
-        if len(videos) == 0:
-            print(f"No search results for {search_term}")
-            return
+        self._show_search_results(
+            search_term, self.find_videos(search_term), offset, limit)
 
-        videos.sort(key=self.sort_videos_by_title)
+    @_synchronized
+    def search_videos_top(self, search_term, k):
+        """Display the k best matches for the search_term.
 
-        print(f"Here are the results for {search_term}:")
+        Titles that contain the search_term as a whole word rank first,
+        then titles where the match starts earlier, then title order. Only
+        the best k results are kept while scanning the matches, in a
+        bounded heap.
 
-        index = 1
-        for video in videos:
-            print(f"\t{index}) {video.title} ({video.video_id}) [{' '.join(video.tags)}]")
-            index += 1
+        Args:
+            search_term: The query to be used in search.
+            k: The number of results to show.
+        """
 
-        print("Would you like to play any of the above? If yes, specify the number of the video.")
-        print("If your answer is not a valid number, we will assume it's a no.")
+        term = search_term.lower()
+        word = re.compile(rf"(?<!\w){re.escape(term)}(?!\w)")
 
-        chosen = input()
+        def rank(indexed_video):
+            index, video = indexed_video
+            title = video.title.lower()
+            return (word.search(title) is None, title.find(term), index)
 
-        if str.isnumeric(chosen):
-            chosen_index = int(chosen) - 1
-            if chosen_index >= 0 and chosen_index < len(videos):
-                self.play_video(videos[chosen_index].video_id)
+        # The matches come in title order, so the index breaks ties.
+        best = heapq.nsmallest(k, enumerate(self.find_videos(search_term)), key=rank)
+        self._show_search_results(
+            search_term, [video for _, video in best], 0, None)
 
-    def search_videos_tag(self, video_tag):
+    @_synchronized
+    def search_videos_tag(self, video_tag, offset=0, limit=None):
         """Display all videos whose tags contains the provided tag.
 
         Args:
             video_tag: The video tag to be used in search.
+            offset: The number of results to skip.
+            limit: The maximum number of results to show, None for all.
         """
-        
-        videos = []
-        for video in self._video_library.get_all_videos():
-            if not video.is_flagged:
-                for tag in video.tags:
-                    if video_tag.lower() == tag.lower():
-                        videos.append(video)
-                        break
+
+        self._show_search_results(
+            video_tag, self.find_videos_with_tag(video_tag), offset, limit)
+
+    def _show_search_results(self, query, videos, offset, limit):
+        """Displays a page of search results and remembers them for
+        play_result. In interactive mode, also asks which one to play."""
+
+        self._last_results = videos
+        self._playable_results = range(0)
 
         if len(videos) == 0:
-            print(f"No search results for {video_tag}")
+            self._print(f"No search results for {query}")
+            return
+
+        lines = list(self._iter_results(videos, offset, limit))
+        if not lines:
+            self._print(f"No search results for {query} on this page "
+                        f"({len(videos)} in total)")
             return
 
-        videos.sort(key=self.sort_videos_by_title)
+        self._print(f"Here are the results for {query}:")
+        for line in lines:
+            self._print(line)
+        self._playable_results = range(offset, offset + len(lines))
 
-        print(f"Here are the results for {video_tag}:")
+        if not self._interactive:
+            self._print("Use PLAY_RESULT <number> to play any of the above.")
+            return
 
-        index = 1
-        for video in videos:
-            print(f"\t{index}) {video.title} ({video.video_id}) [{' '.join(video.tags)}]")
-            index += 1
+        self._print("Would you like to play any of the above? If yes, specify the number of the video.")
+        self._print("If your answer is not a valid number, we will assume it's a no.")
 
-        print("Would you like to play any of the above? If yes, specify the number of the video.")
-        print("If your answer is not a valid number, we will assume it's a no.")
-        
         chosen = input()
 
-        if str.isnumeric(chosen):
-            chosen_index = int(chosen) - 1
-            if chosen_index >= 0 and chosen_index < len(videos):
-                self.play_video(videos[chosen_index].video_id)
+        if chosen.isdecimal() and int(chosen) - 1 in self._playable_results:
+            self.play_result(chosen)
+
+    @_synchronized
+    def play_result(self, result_number):
+        """Plays one of the results shown by the last search.
 
+        Args:
+            result_number: The number of the result, as shown by the search.
+        """
+
+        if not self._playable_results:
+            self._print("Cannot play result: No search results to choose from")
+            return
+
+        index = int(result_number) - 1 if result_number.isdecimal() else -1
+        if index not in self._playable_results:
+            self._print("Cannot play result: Result number is not in the last search results")
+            return
+
+        self.play_video(self._last_results[index].video_id)
+
+    @_synchronized
     def flag_video(self, video_id, flag_reason=""):
         """Mark a video as flagged.
 
@@ -362,21 +675,24 @@ class VideoPlayer:
         
         video = self._video_library.get_video(video_id)
         if not video:
-            print("Cannot flag video: Video does not exist")
-            return
-
-        if video.is_flagged:
-            print("Cannot flag video: Video is already flagged")
+            self._print("Cannot flag video: Video does not exist")
             return
 
+        # The library checks and sets the flag atomically, in case another
+        # player flags the same video concurrently.
         reason = "Not supplied" if flag_reason == "" else flag_reason
-        video.flag(reason)
+        if not self._video_library.flag_video(video_id, reason):
+            self._print("Cannot flag video: Video is already flagged")
+            return
+        self._record("flag", video_id, reason)
 
-        if video.is_playing or video.is_paused:
+        current = self._current_playing_video
+        if current and current.video_id == video_id:
             self.stop_video()
 
-        print(f"Successfully flagged video: {video.title} (reason: {reason})")
+        self._print(f"Successfully flagged video: {video.title} (reason: {reason})")
 
+    @_synchronized
     def allow_video(self, video_id):
         """Removes a flag from a video.
 
@@ -386,11 +702,12 @@ class VideoPlayer:
         
         video = self._video_library.get_video(video_id)
         if not video:
-            print("Cannot remove flag from video: Video does not exist")
+            self._print("Cannot remove flag from video: Video does not exist")
             return
 
-        if not video.is_flagged:
-            print("Cannot remove flag from video: Video is not flagged")
+        if not self._video_library.allow_video(video_id):
+            self._print("Cannot remove flag from video: Video is not flagged")
             return
+        self._record("allow", video_id)
 
-        print(f"Successfully removed flag from video: {video.title}")
+        self._print(f"Successfully removed flag from video: {video.title}")
@@ -5,13 +5,15 @@ class Playlist:
     """A class used to represent a Playlist."""
 
     def __init__(self, original_name, formatted_name) -> None:
-        self._videos = []
+        # Video ids as keys of an insertion-ordered dict, giving O(1)
+        # membership, insertion and removal while keeping display order.
+        self._videos = {}
         self._original_name = original_name
         self._formatted_name = formatted_name
 
     @property
-    def videos(self): 
-        return self._videos
+    def videos(self):
+        return self._videos.keys()
     
     @property
     def original_name(self): 
@@ -25,10 +27,18 @@ class Playlist:
         return video.video_id in self._videos
     
     def add_video(self, video):
-        self._videos.append(video.video_id)
+        self._videos[video.video_id] = None
 
     def remove_video(self, video):
-        self._videos.remove(video.video_id)
+        del self._videos[video.video_id]
+
+    def remove_video_ids(self, video_ids):
+        """Removes the videos with the given ids, and returns the ids that
+        were in the playlist."""
+        removed = self._videos.keys() & video_ids
+        for video_id in removed:
+            del self._videos[video_id]
+        return removed
 
     def clear(self):
         self._videos.clear()
\ No newline at end of file
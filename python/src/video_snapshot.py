@@ -0,0 +1,272 @@
+"""Compiled binary snapshots of a videos file.
+
+A snapshot stores the parsed catalog and the indexes a VideoLibrary builds
+from it, so that a library can start without parsing the source file or
+indexing its titles again. Videos are referred to by their position in
+the catalog. All integers are little-endian unsigned 32-bit values, so the
+file can be mapped and read in place:
+
+    header        magic, version, source size, source mtime, source sha256,
+                  number of videos, strings and tags, number of n-grams
+                  and n-gram postings, number of tag keys and tag postings
+    string offs   byte offset of each string in the string table
+    titles        string index of each video title
+    ids           string index of each video id
+    tag offs      start of each video's tags in the tag ids, plus an end
+    tag ids       string index of each tag
+    title order   position of each video in title order
+    n-grams       string index of each n-gram of the lowercase titles
+    n-gram offs   start of each n-gram's postings, plus an end
+    n-gram posts  positions of the videos whose title holds each n-gram
+    tag keys      string index of each lowercase tag
+    tag key offs  start of each tag key's postings, plus an end
+    tag posts     positions of the videos having each tag key
+    string table  UTF-8 strings, each terminated by a NUL byte
+
+Every distinct string is stored once, so common tags cost a single entry.
+"""
+
+from array import array
+import hashlib
+import mmap
+import os
+import struct
+import sys
+
+
+_MAGIC = b"YTVS"
+_VERSION = 2
+_HEADER = struct.Struct("<4sIQQ32sIIIIIII")
+# The source size and mtime, right after the magic and version.
+_SOURCE_STAT = struct.Struct("<QQ")
+_SOURCE_STAT_OFFSET = 8
+
+
+class Snapshot:
+    """A catalog and its indexes, as stored in a snapshot.
+
+    Attributes:
+        records: The (title, video_id, tags) tuples in catalog order, with
+            one tuple per video id.
+        title_order: The positions of the videos in records, sorted by
+            title and then by position.
+        title_index: A dict from each n-gram of the lowercase titles to an
+            array of the positions of the videos whose title holds it.
+        tag_index: A dict from each lowercase tag to an array of the
+            positions of the videos having it.
+    """
+
+    __slots__ = ("records", "title_order", "title_index", "tag_index")
+
+    def __init__(self, records, title_order, title_index, tag_index):
+        self.records = records
+        self.title_order = title_order
+        self.title_index = title_index
+        self.tag_index = tag_index
+
+
+def _source_digest(source_path):
+    digest = hashlib.sha256()
+    with open(source_path, "rb") as source:
+        for chunk in iter(lambda: source.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def _u32_array(buffer, offset, count):
+    values = array("I")
+    values.frombytes(buffer[offset:offset + 4 * count])
+    if len(values) != count:
+        raise ValueError("Truncated snapshot")
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def load_snapshot(snapshot_path, source_path):
+    """Reads the catalog and its indexes from a snapshot of the given
+    source file.
+
+    Args:
+        snapshot_path: The snapshot file.
+        source_path: The videos file the snapshot was compiled from.
+
+    Returns:
+        A Snapshot. None if the snapshot is missing, unreadable or does
+        not match the source.
+    """
+    try:
+        with open(snapshot_path, "rb") as snapshot_file, \
+                mmap.mmap(snapshot_file.fileno(), 0,
+                          access=mmap.ACCESS_READ) as buffer:
+            snapshot, touched_stat = _read_snapshot(buffer, source_path)
+    except (OSError, ValueError, IndexError, struct.error,
+            UnicodeDecodeError):
+        return None
+    if touched_stat is not None:
+        _update_source_stat(snapshot_path, touched_stat)
+    return snapshot
+
+
+def _update_source_stat(snapshot_path, source_stat):
+    """Records a new size and mtime for an unchanged source file, so the
+    next load does not hash it again. Failures are ignored."""
+    try:
+        with open(snapshot_path, "r+b") as snapshot_file:
+            snapshot_file.seek(_SOURCE_STAT_OFFSET)
+            snapshot_file.write(_SOURCE_STAT.pack(source_stat.st_size,
+                                                  source_stat.st_mtime_ns))
+    except OSError:
+        pass
+
+
+def _read_snapshot(buffer, source_path):
+    """Returns the Snapshot read from a buffer and, when the source was
+    touched without being changed, its new os.stat_result. The Snapshot is
+    None if it does not match the source."""
+    (magic, version, size, mtime_ns, digest, video_count, string_count,
+     tag_count, gram_count, gram_posting_count, tag_key_count,
+     tag_posting_count) = _HEADER.unpack_from(buffer)
+    if magic != _MAGIC or version != _VERSION:
+        return None, None
+
+    stat = os.stat(source_path)
+    touched_stat = None
+    if (stat.st_size, stat.st_mtime_ns) != (size, mtime_ns):
+        # The source was touched or copied; only trust the snapshot when
+        # the contents are unchanged.
+        if stat.st_size != size or _source_digest(source_path) != digest:
+            return None, None
+        touched_stat = stat
+
+    offset = _HEADER.size + 4 * string_count
+
+    def read(count):
+        nonlocal offset
+        values = _u32_array(buffer, offset, count)
+        offset += 4 * count
+        return values
+
+    titles = read(video_count)
+    ids = read(video_count)
+    tag_offsets = read(video_count + 1)
+    tag_ids = read(tag_count)
+    title_order = read(video_count)
+    grams = read(gram_count)
+    gram_offsets = read(gram_count + 1)
+    gram_postings = read(gram_posting_count)
+    tag_keys = read(tag_key_count)
+    tag_key_offsets = read(tag_key_count + 1)
+    tag_postings = read(tag_posting_count)
+
+    strings = buffer[offset:].decode("utf-8").split("\0")
+    if len(strings) != string_count + 1:
+        raise ValueError("Corrupt snapshot string table")
+    records = [
+        (strings[titles[i]], strings[ids[i]],
+         tuple(strings[tag_id]
+               for tag_id in tag_ids[tag_offsets[i]:tag_offsets[i + 1]]))
+        for i in range(video_count)
+    ]
+    snapshot = Snapshot(
+        records, title_order,
+        _read_index(strings, grams, gram_offsets, gram_postings),
+        _read_index(strings, tag_keys, tag_key_offsets, tag_postings))
+    return snapshot, touched_stat
+
+
+def _read_index(strings, keys, offsets, postings):
+    return {strings[key]: postings[offsets[i]:offsets[i + 1]]
+            for i, key in enumerate(keys)}
+
+
+def write_snapshot(snapshot_path, source_path, source_stat, snapshot):
+    """Compiles a catalog and its indexes into a snapshot of the given
+    source file.
+
+    The source is hashed after it was parsed, so the snapshot is only
+    written if the source still has the size and mtime it had before: an
+    edit made during the parse would otherwise be trusted on the next
+    load. The snapshot is written to a temporary file and moved into
+    place, so readers never see a partial file. Failures are ignored: the
+    snapshot is only a cache of the source file.
+
+    Args:
+        snapshot_path: The snapshot file to write.
+        source_path: The videos file the records were parsed from.
+        source_stat: The os.stat_result of the source taken before parsing.
+        snapshot: The Snapshot to write.
+    """
+    string_ids = {}
+    string_offsets = array("I")
+    table = bytearray()
+
+    def intern(text):
+        string_id = string_ids.get(text)
+        if string_id is None:
+            encoded = text.encode("utf-8")
+            if b"\0" in encoded:
+                raise ValueError("Cannot store NUL in a snapshot string")
+            string_id = string_ids[text] = len(string_offsets)
+            string_offsets.append(len(table))
+            table.extend(encoded)
+            table.append(0)
+        return string_id
+
+    def index_arrays(index):
+        keys = array("I")
+        offsets = array("I", [0])
+        postings = array("I")
+        for key, positions in index.items():
+            keys.append(intern(key))
+            postings.extend(positions)
+            offsets.append(len(postings))
+        return keys, offsets, postings
+
+    titles = array("I")
+    ids = array("I")
+    tag_offsets = array("I", [0])
+    tag_ids = array("I")
+    try:
+        for title, video_id, tags in snapshot.records:
+            titles.append(intern(title))
+            ids.append(intern(video_id))
+            tag_ids.extend(intern(tag) for tag in tags)
+            tag_offsets.append(len(tag_ids))
+        title_order = array("I", snapshot.title_order)
+        grams, gram_offsets, gram_postings = index_arrays(
+            snapshot.title_index)
+        tag_keys, tag_key_offsets, tag_postings = index_arrays(
+            snapshot.tag_index)
+        digest = _source_digest(source_path)
+        stat = os.stat(source_path)
+        if (stat.st_size, stat.st_mtime_ns) != (source_stat.st_size,
+                                                source_stat.st_mtime_ns):
+            return
+        header = _HEADER.pack(
+            _MAGIC, _VERSION, source_stat.st_size, source_stat.st_mtime_ns,
+            digest, len(titles), len(string_offsets), len(tag_ids),
+            len(grams), len(gram_postings), len(tag_keys), len(tag_postings))
+    except (OSError, ValueError, OverflowError):
+        return
+
+    sections = (string_offsets, titles, ids, tag_offsets, tag_ids,
+                title_order, grams, gram_offsets, gram_postings, tag_keys,
+                tag_key_offsets, tag_postings)
+    if sys.byteorder == "big":
+        for values in sections:
+            values.byteswap()
+
+    temp_path = f"{snapshot_path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "wb") as snapshot_file:
+            snapshot_file.write(header)
+            for values in sections:
+                values.tofile(snapshot_file)
+            snapshot_file.write(table)
+        os.replace(temp_path, snapshot_path)
+    except OSError:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
@@ -0,0 +1,135 @@
+import os
+import time
+
+import pytest
+
+from src.catalog_watcher import CatalogWatcher
+from src.columnar_library import ColumnarVideoLibrary
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+
+_CATALOG = (
+    "Funny Dogs | funny_dogs_video_id | #dog , #animal\n"
+    "Amazing Cats | amazing_cats_video_id | #cat , #animal\n"
+    "Life at Google | life_at_google_video_id | #google , #career\n"
+)
+_CHANGED_CATALOG = (
+    "Funny Dogs | funny_dogs_video_id | #dog , #animal\n"
+    "Amazing Cats and Kittens | amazing_cats_video_id | #cat , #animal\n"
+    "Video about nothing | nothing_video_id |\n"
+)
+
+
+def _write(path, text):
+    path.write_text(text)
+    # Make sure the change is visible even on coarse mtime clocks.
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+@pytest.fixture(params=[VideoLibrary, ColumnarVideoLibrary])
+def library_class(request):
+    return request.param
+
+
+def test_reload_applies_the_diff(tmp_path, library_class):
+    path = tmp_path / "videos.txt"
+    path.write_text(_CATALOG)
+    library = library_class(path)
+    library.flag_video("amazing_cats_video_id", "too_cute")
+    library.flag_video("funny_dogs_video_id", "too_funny")
+    events = []
+    library.subscribe(lambda event, change: events.append((event, change)))
+
+    path.write_text(_CHANGED_CATALOG)
+    diff = library.reload()
+    assert diff.added == ["nothing_video_id"]
+    assert diff.removed == ["life_at_google_video_id"]
+    assert diff.changed == ["amazing_cats_video_id"]
+    assert events == [("reload", diff)]
+
+    assert len(library) == 3
+    assert library.get_video("life_at_google_video_id") is None
+    cats = library.get_video("amazing_cats_video_id")
+    assert cats.title == "Amazing Cats and Kittens"
+    assert cats.flag_reason == "too_cute"
+    assert library.get_video("funny_dogs_video_id").flag_reason == "too_funny"
+    assert [video.video_id for video in library.search_titles("kitten")] == [
+        "amazing_cats_video_id"]
+    assert library.search_titles("google") == []
+    assert library.videos_with_tag("#career") == []
+    assert [video.title for video in library.videos_sorted_by_title()] == [
+        "Amazing Cats and Kittens", "Funny Dogs", "Video about nothing"]
+
+    assert not library.reload()
+
+
+def test_watcher_waits_for_a_stable_file(tmp_path, capfd):
+    path = tmp_path / "videos.txt"
+    path.write_text(_CATALOG)
+    library = VideoLibrary(path)
+    player = VideoPlayer(video_library=library)
+    player.create_playlist("mine")
+    player.add_to_playlist("mine", "life_at_google_video_id")
+    player.add_to_playlist("mine", "funny_dogs_video_id")
+    watcher = CatalogWatcher(library, interval=0.01)
+    diffs = []
+    watcher.subscribe(diffs.append)
+    watcher.subscribe(lambda diff: player.reconcile_playlists(diff.removed))
+
+    assert watcher.check() is None
+    _write(path, _CHANGED_CATALOG)
+    # The first poll sees the change, the next one applies it.
+    assert watcher.check() is None
+    assert len(library) == 3 and diffs == []
+    assert watcher.check().removed == ["life_at_google_video_id"]
+    assert watcher.check() is None
+    assert len(diffs) == 1
+
+    capfd.readouterr()
+    player.show_playlist("mine")
+    out, err = capfd.readouterr()
+    assert out.splitlines() == [
+        "Showing playlist: mine",
+        "\t Funny Dogs (funny_dogs_video_id) [#dog #animal]"]
+
+
+def test_watcher_thread_reloads(tmp_path):
+    path = tmp_path / "videos.txt"
+    path.write_text(_CATALOG)
+    library = ColumnarVideoLibrary(path)
+    watcher = CatalogWatcher(library, interval=0.01)
+    reloaded = []
+    watcher.subscribe(reloaded.append)
+    watcher.start()
+    try:
+        _write(path, _CHANGED_CATALOG)
+        for _ in range(500):
+            if reloaded:
+                break
+            time.sleep(0.01)
+    finally:
+        watcher.stop()
+    assert reloaded and library.get_video("nothing_video_id") is not None
+
+
+def test_removed_videos_leave_playlists_and_playback(capfd):
+    library = VideoLibrary()
+    player = VideoPlayer(video_library=library)
+    player.create_playlist("mine")
+    player.add_to_playlist("mine", "life_at_google_video_id")
+    player.add_to_playlist("mine", "funny_dogs_video_id")
+    player.play_video("life_at_google_video_id")
+
+    library.remove_video("life_at_google_video_id")
+    capfd.readouterr()
+    player.show_playlist("mine")
+    out, err = capfd.readouterr()
+    assert out.splitlines() == [
+        "Showing playlist: mine",
+        "\t Funny Dogs (funny_dogs_video_id) [#dog #animal]"]
+
+    player.reconcile_playlists(["life_at_google_video_id"])
+    player.show_playing()
+    out, err = capfd.readouterr()
+    assert out.splitlines() == ["No video is currently playing"]
@@ -0,0 +1,71 @@
+from src.columnar_library import ColumnarVideoLibrary
+from src.video import Video
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+
+
+def test_columnar_library_mutations(summary):
+    columnar = ColumnarVideoLibrary()
+    columnar.flag_video("amazing_cats_video_id", "dont_like_cats")
+    video = columnar.get_video("amazing_cats_video_id")
+    assert video.is_flagged and video.flag_reason == "dont_like_cats"
+    columnar.allow_video("amazing_cats_video_id")
+    assert not columnar.get_video("amazing_cats_video_id").is_flagged
+
+    columnar.add_video(Video("Funny Dogs 2", "funny_dogs_video_id", ["#dog"]))
+    columnar.add_video(Video("Cat Nap", "cat_nap_video_id", ["#Cat"]))
+    assert columnar.remove_video("another_cat_video_id").title == (
+        "Another Cat Video")
+    assert columnar.remove_video("another_cat_video_id") is None
+    assert len(columnar) == 5
+    assert [video.video_id for video in columnar.get_all_videos()] == [
+        "funny_dogs_video_id", "amazing_cats_video_id",
+        "life_at_google_video_id", "nothing_video_id", "cat_nap_video_id"]
+    assert summary(columnar.search_titles("dogs")) == [
+        ("Funny Dogs 2", "funny_dogs_video_id", ("#dog",), False, "")]
+    assert [video.video_id for video in columnar.videos_with_tag("#cat")] == [
+        "amazing_cats_video_id", "cat_nap_video_id"]
+    assert columnar.videos_with_tag("#animal")[0].video_id == (
+        "amazing_cats_video_id")
+
+    assert [video.video_id for video in columnar.videos_sorted_by_title()] == [
+        "amazing_cats_video_id", "cat_nap_video_id", "funny_dogs_video_id",
+        "life_at_google_video_id", "nothing_video_id"]
+
+    columnar.add_video(Video("Another Cat Video", "another_cat_video_id", []))
+    assert columnar.get_all_videos()[-1].video_id == "another_cat_video_id"
+
+
+def test_player_with_columnar_library(capfd):
+    player = VideoPlayer(video_library=ColumnarVideoLibrary())
+    player.number_of_videos()
+    player.flag_video("funny_dogs_video_id", "dont_like_dogs")
+    player.show_all_videos()
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert len(lines) == 8
+    assert "5 videos in the library" in lines[0]
+    assert ("Funny Dogs (funny_dogs_video_id) [#dog #animal] - FLAGGED "
+            "(reason: dont_like_dogs)") in lines[5]
+
+
+def test_columnar_library_reclaims_replaced_rows(summary):
+    columnar = ColumnarVideoLibrary()
+    library = VideoLibrary()
+    for target in (columnar, library):
+        target.flag_video("funny_dogs_video_id", "dont_like_dogs")
+    for i in range(1000):
+        for target in (columnar, library):
+            target.add_video(Video(f"Cat Nap {i}", "cat_nap_video_id",
+                                   [f"#nap{i}"]))
+            target.add_video(Video(f"Dog Nap {i}", f"dog_nap_{i}_id", []))
+            target.remove_video(f"dog_nap_{i}_id")
+    assert len(columnar._titles) < 2000
+    assert len(columnar._tag_names) < 200
+    assert summary(columnar.get_all_videos()) == summary(
+        library.get_all_videos())
+    assert summary(columnar.search_titles("nap")) == summary(
+        library.search_titles("nap"))
+    assert summary(columnar.videos_with_tag("#nap999")) == summary(
+        library.videos_with_tag("#nap999"))
+    assert columnar.videos_with_tag("#nap0") == []
@@ -0,0 +1,104 @@
+import pytest
+
+from src.command_parser import CommandException, CommandParser
+from src.video_player import VideoPlayer
+
+
+def test_execute_command_is_case_insensitive(capfd):
+    parser = CommandParser(VideoPlayer())
+    parser.execute_command(["play", "amazing_cats_video_id"])
+    parser.execute_command(["Show_Playing", "ignored"])
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert len(lines) == 2
+    assert "Playing video: Amazing Cats" in lines[0]
+    assert ("Currently playing: Amazing Cats (amazing_cats_video_id) "
+            "[#cat #animal]") in lines[1]
+
+
+def test_execute_command_wrong_arguments():
+    parser = CommandParser(VideoPlayer())
+    with pytest.raises(CommandException, match="followed by video_id"):
+        parser.execute_command(["PLAY"])
+    with pytest.raises(CommandException, match="optional flag reason"):
+        parser.execute_command(["FLAG_VIDEO", "a", "b", "c"])
+
+
+def test_execute_unknown_command(capfd):
+    parser = CommandParser(VideoPlayer())
+    parser.execute_command(["DANCE"])
+    out, err = capfd.readouterr()
+    assert ("Please enter a valid command, type HELP for a list of "
+            "available commands.") in out
+
+
+def test_register_command(capfd):
+    parser = CommandParser(VideoPlayer())
+    parser.register_command(
+        "echo", lambda *words: print(" ".join(words)), (1, 2),
+        "Please enter ECHO command followed by one or two words.")
+    parser.execute_command(["ECHO", "hello", "world"])
+    out, err = capfd.readouterr()
+    assert out == "hello world\n"
+    with pytest.raises(CommandException, match="one or two words"):
+        parser.execute_command(["ECHO"])
+
+
+def test_show_all_videos_with_limit_and_offset(capfd):
+    parser = CommandParser(VideoPlayer())
+    parser.execute_command(["SHOW_ALL_VIDEOS", "--limit", "2", "--offset=1"])
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert len(lines) == 3
+    assert "Here's a list of all available videos:" in lines[0]
+    assert "Another Cat Video (another_cat_video_id) [#cat #animal]" in lines[1]
+    assert "Funny Dogs (funny_dogs_video_id) [#dog #animal]" in lines[2]
+
+
+def test_search_videos_with_offset_keeps_numbering(capfd, monkeypatch):
+    monkeypatch.setattr("builtins.input", lambda *args: "1")
+    parser = CommandParser(VideoPlayer())
+    parser.execute_command(["SEARCH_VIDEOS", "cat", "--offset", "1"])
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert len(lines) == 4
+    assert "2) Another Cat Video (another_cat_video_id) [#cat #animal]" in lines[1]
+    assert "Playing video" not in out
+
+
+def test_page_options_must_be_numbers():
+    parser = CommandParser(VideoPlayer())
+    with pytest.raises(CommandException, match="number after --limit"):
+        parser.execute_command(["SHOW_ALL_VIDEOS", "--limit", "-1"])
+    with pytest.raises(CommandException, match="number after --offset"):
+        parser.execute_command(["SHOW_PLAYLIST", "my_playlist", "--offset"])
+    with pytest.raises(CommandException, match="number after --limit"):
+        parser.execute_command(["SHOW_ALL_VIDEOS", "--limit", "\u00b2"])
+
+
+def test_search_videos_top_command(capfd, monkeypatch):
+    monkeypatch.setattr("builtins.input", lambda *args: "No")
+    parser = CommandParser(VideoPlayer())
+    parser.execute_command(["SEARCH_VIDEOS", "cat", "top", "1"])
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert len(lines) == 4
+    assert "1) Another Cat Video (another_cat_video_id) [#cat #animal]" in lines[1]
+    with pytest.raises(CommandException, match="optionally TOP"):
+        parser.execute_command(["SEARCH_VIDEOS", "cat", "BEST", "1"])
+    with pytest.raises(CommandException, match="optionally TOP"):
+        parser.execute_command(["SEARCH_VIDEOS", "cat", "TOP"])
+    with pytest.raises(CommandException, match="optionally TOP"):
+        parser.execute_command(["SEARCH_VIDEOS", "cat", "TOP", "0"])
+    with pytest.raises(CommandException, match="optionally TOP"):
+        parser.execute_command(["SEARCH_VIDEOS", "cat", "TOP", "\u00b2"])
+
+
+def test_search_page_past_the_results_has_no_prompt(capfd):
+    parser = CommandParser(VideoPlayer(interactive=False))
+    parser.execute_command(["SEARCH_VIDEOS", "cat", "--offset", "5"])
+    parser.execute_command(["PLAY_RESULT", "1"])
+    out, err = capfd.readouterr()
+    assert out.splitlines() == [
+        "No search results for cat on this page (2 in total)",
+        "Cannot play result: No search results to choose from"]
@@ -0,0 +1,114 @@
+import random
+import sys
+import threading
+
+import pytest
+
+from src.columnar_library import ColumnarVideoLibrary
+from src.video import Video
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+
+_WORDS = ["cat", "dog", "google", "funny", "amazing", "life", "video"]
+_TAGS = ["#cat", "#dog", "#animal", "#career"]
+
+
+def _ids(videos):
+    return [video.video_id for video in videos]
+
+
+def _write_catalog(path, count):
+    rng = random.Random(1)
+    with open(path, "w") as video_file:
+        for i in range(count):
+            title = " ".join(rng.sample(_WORDS, 3)).title()
+            tags = " , ".join(rng.sample(_TAGS, 2))
+            video_file.write(f"{title} {i} | video_{i}_id | {tags}\n")
+
+
+def _playable_ids(library):
+    if isinstance(library, VideoLibrary):
+        return list(library._playable_ids)
+    return [library._id_bytes(row).decode()
+            for row in library._playable_rows]
+
+
+@pytest.fixture
+def fast_switching():
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+@pytest.mark.parametrize("library_class", [VideoLibrary, ColumnarVideoLibrary])
+def test_concurrent_sessions_keep_library_consistent(
+        tmp_path, capfd, fast_switching, library_class):
+    video_file = tmp_path / "videos.txt"
+    _write_catalog(video_file, 300)
+    library = library_class(video_file)
+    players = [VideoPlayer(seed=i, video_library=library, interactive=False)
+               for i in range(6)]
+    errors = []
+
+    def flagger(player, seed):
+        rng = random.Random(seed)
+        for _ in range(300):
+            video_id = f"video_{rng.randrange(300)}_id"
+            if rng.random() < 0.5:
+                player.flag_video(video_id, "stress")
+            else:
+                player.allow_video(video_id)
+
+    def searcher(player, seed):
+        rng = random.Random(seed)
+        for _ in range(300):
+            term = rng.choice(_WORDS)
+            for video in player.find_videos(term):
+                if term not in video.title.lower():
+                    errors.append(f"{video.title} does not match {term}")
+            tag = rng.choice(_TAGS)
+            for video in player.find_videos_with_tag(tag):
+                if tag not in video.tags:
+                    errors.append(f"{video.title} is not tagged {tag}")
+            player.play_random_video()
+            player.show_all_videos(limit=5)
+
+    def mutator(seed):
+        rng = random.Random(seed)
+        for i in range(200):
+            video_id = f"video_{rng.randrange(300)}_id"
+            if library.remove_video(video_id) is None:
+                library.add_video(Video(f"Funny Comeback {i}", video_id,
+                                        ["#dog"]))
+
+    threads = [threading.Thread(target=flagger, args=(players[i], i))
+               for i in range(3)]
+    threads += [threading.Thread(target=searcher, args=(players[i], i))
+                for i in range(3, 6)]
+    threads.append(threading.Thread(target=mutator, args=(99,)))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    capfd.readouterr()
+
+    assert errors == []
+    videos = library.get_all_videos()
+    assert len(videos) == len(library)
+    playable = _playable_ids(library)
+    assert len(playable) == len(set(playable))
+    assert set(playable) == {video.video_id for video in videos
+                             if not video.is_flagged}
+    assert [video.title for video in library.videos_sorted_by_title()] == (
+        sorted(video.title for video in videos))
+    # Libraries may return new Video objects, so compare the ids.
+    for player in players:
+        for term in _WORDS:
+            assert _ids(player.find_videos(term)) == _ids(
+                video for video in library.search_titles(term)
+                if not video.is_flagged)
+        for tag in _TAGS:
+            assert _ids(player.find_videos_with_tag(tag)) == _ids(
+                video for video in library.videos_with_tag(tag)
+                if not video.is_flagged)
@@ -0,0 +1,40 @@
+import pytest
+
+
+# Duplicate ids and titles, non-ASCII titles and tags, a title whose
+# lowercase form changes length, stray whitespace, a CRLF line ending and
+# no newline at the end of the file.
+CATALOG = (
+    "Funny Dogs | funny_dogs_video_id | #dog , #animal\n"
+    "Amazing Cats | amazing_cats_video_id | #cat , #animal\r\n"
+    "  Café au lait | cafe_video_id | #Café,#drink \n"
+    "\u212aelvin scale | kelvin_video_id | #science\n"
+    "Another Cat Video | another_cat_video_id | #cat , #animal\n"
+    "Life at Google | life_at_google_video_id | #google , #career\n"
+    "Video about nothing | nothing_video_id |\n"
+    "Amazing Cats | more_cats_video_id | #cat\n"
+    "Funny Dogs, again | funny_dogs_video_id | #dog\n"
+    "Cat Nap | cat_nap_video_id | #CAT , #sleep\n"
+    "Amazing Cats, again | amazing_cats_video_id | #CAT\n"
+    "Last line | last_video_id | #last"
+)
+
+
+def _summary(videos):
+    return [(video.title, video.video_id, tuple(video.tags), video.is_flagged,
+             video.flag_reason) for video in videos]
+
+
+@pytest.fixture
+def summary():
+    """Returns a function listing the fields of videos, to compare the
+    results of two libraries."""
+    return _summary
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    """Returns the path of a videos file holding CATALOG."""
+    path = tmp_path / "videos.txt"
+    path.write_bytes(CATALOG.encode("utf-8"))
+    return path
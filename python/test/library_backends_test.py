@@ -0,0 +1,85 @@
+import random
+
+import pytest
+
+from src.columnar_library import ColumnarVideoLibrary
+from src.mapped_library import MappedVideoLibrary
+from src.sharded_library import ShardedVideoLibrary
+from src.video_library import VideoLibrary
+
+
+def _shared_library(path):
+    pytest.importorskip("multiprocessing.shared_memory")
+    from src.shared_library import SharedVideoLibrary
+    return SharedVideoLibrary(path)
+
+
+_BACKENDS = {
+    "columnar": ColumnarVideoLibrary,
+    "mapped": MappedVideoLibrary,
+    "sharded": lambda path: ShardedVideoLibrary(path, shards=3),
+    "shared": _shared_library,
+}
+
+
+@pytest.fixture(params=sorted(_BACKENDS))
+def backend(request, catalog):
+    """Returns each alternative library loaded from the catalog."""
+    library = _BACKENDS[request.param](catalog)
+    yield library
+    close = getattr(library, "close", None)
+    if close is not None:
+        close()
+
+
+def test_backend_matches_video_library(catalog, backend, summary):
+    library = VideoLibrary(catalog)
+    for video_id in ["amazing_cats_video_id", "cafe_video_id"]:
+        library.flag_video(video_id, "not_today")
+        backend.flag_video(video_id, "not_today")
+
+    assert len(backend) == len(library) == 10
+    assert summary(backend.get_all_videos()) == summary(
+        library.get_all_videos())
+    assert summary(backend.videos_sorted_by_title()) == summary(
+        library.videos_sorted_by_title())
+    assert summary(backend.videos_sorted_by_title(2, 3)) == summary(
+        library.videos_sorted_by_title(2, 3))
+    for term in ["", "a", "CAT", "at g", "café", "CAFÉ", "k", "dogs ",
+                 "dogs,", " au", "e | ", "ts\nfu", "id", "#dog", "xyz",
+                 "line"]:
+        assert summary(backend.search_titles(term)) == summary(
+            library.search_titles(term)), term
+    for tag in ["#CAT", "#animal", "#café", "#drink", "#Dog",
+                "#dog , #animal", "animal", "#last", "#blah", ""]:
+        assert summary(backend.videos_with_tag(tag)) == summary(
+            library.videos_with_tag(tag)), tag
+    for video_id in ["funny_dogs_video_id", "cafe_video_id",
+                     "last_video_id", "does_not_exist"]:
+        assert summary(filter(None, [backend.get_video(video_id)])) == (
+            summary(filter(None, [library.get_video(video_id)]))), video_id
+
+
+def test_backend_flags(backend):
+    events = []
+    backend.subscribe(lambda event, video: events.append(
+        (event, video.video_id, video.flag_reason)))
+
+    assert backend.flag_video("funny_dogs_video_id", "dont_like_dogs")
+    assert not backend.flag_video("funny_dogs_video_id", "again")
+    assert not backend.flag_video("does_not_exist", "why")
+    assert backend.get_video("funny_dogs_video_id").flag_reason == (
+        "dont_like_dogs")
+    rng = random.Random(0)
+    drawn = {backend.random_playable_video(rng).video_id for _ in range(300)}
+    assert len(drawn) == 9 and "funny_dogs_video_id" not in drawn
+
+    assert backend.allow_video("funny_dogs_video_id")
+    assert not backend.allow_video("funny_dogs_video_id")
+    assert not backend.get_video("funny_dogs_video_id").is_flagged
+    assert events == [("flag", "funny_dogs_video_id", "dont_like_dogs"),
+                      ("allow", "funny_dogs_video_id", "")]
+
+    for video in backend.get_all_videos():
+        backend.flag_video(video.video_id, "all")
+    assert backend.random_playable_video(rng) is None
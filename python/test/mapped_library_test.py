@@ -0,0 +1,41 @@
+import pytest
+
+from src.mapped_library import MappedVideoLibrary
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+
+
+def test_mapped_library_rejects_malformed_lines(tmp_path):
+    path = tmp_path / "videos.txt"
+    path.write_text("Funny Dogs | funny_dogs_video_id\n")
+    with pytest.raises(ValueError):
+        MappedVideoLibrary(path)
+    path.write_text("")
+    assert len(MappedVideoLibrary(path)) == 0
+
+
+def test_player_with_mapped_library(capfd):
+    player = VideoPlayer(video_library=MappedVideoLibrary(),
+                         interactive=False)
+    player.flag_video("funny_dogs_video_id", "dont_like_dogs")
+    player.search_videos_tag("#animal")
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert lines[1:3] == [
+        "Here are the results for #animal:",
+        "\t1) Amazing Cats (amazing_cats_video_id) [#cat #animal]"]
+
+
+def test_match_before_the_first_title(tmp_path, summary):
+    path = tmp_path / "videos.txt"
+    path.write_text(" Zed | z_id | \n"
+                    "Funny Dogs | funny_dogs_video_id | #dog\n"
+                    "Cat Video | cat_video_id | #cat\n")
+    library = VideoLibrary(path)
+    mapped = MappedVideoLibrary(path)
+    for term in [" ", "z", "dogs"]:
+        assert summary(mapped.search_titles(term)) == summary(
+            library.search_titles(term)), term
+    assert [video.title for video in mapped.search_titles(" ")] == [
+        "Cat Video", "Funny Dogs"]
+    mapped.close()
@@ -0,0 +1,68 @@
+import pytest
+
+from src.command_parser import CommandException, CommandParser
+from src.metrics import LatencyHistogram, Metrics
+from src.video_player import VideoPlayer
+
+
+def test_histogram_quantiles_are_within_bucket_precision():
+    histogram = LatencyHistogram()
+    for value in range(1, 100_001):
+        histogram.record(value * 1000)
+    assert histogram.count == 100_000
+    assert histogram.max == 100_000_000
+    for fraction in (0.5, 0.95, 0.99):
+        expected = fraction * 100_000_000
+        assert expected <= histogram.quantile(fraction) <= expected * 1.07
+    assert histogram.quantile(1.0) == histogram.max
+    assert LatencyHistogram().quantile(0.5) == 0
+
+
+def test_commands_are_counted(capfd):
+    metrics = Metrics()
+    parser = CommandParser(VideoPlayer(interactive=False, metrics=metrics),
+                           metrics=metrics)
+    parser.execute_command(["SEARCH_VIDEOS_WITH_TAG", "#cat"])
+    parser.execute_command(["SEARCH_VIDEOS_WITH_TAG", "#dog"])
+    parser.execute_command(["DANCE"])
+    with pytest.raises(CommandException):
+        parser.execute_command(["PLAY"])
+
+    summary = metrics.summary()
+    assert summary["SEARCH_VIDEOS_WITH_TAG"]["calls"] == 2
+    assert summary["SEARCH_VIDEOS_WITH_TAG"]["errors"] == 0
+    assert summary["find_videos_with_tag"]["results"] == 3
+    assert summary["UNKNOWN"]["errors"] == 1
+    assert summary["PLAY"]["errors"] == 1
+    stats = summary["SEARCH_VIDEOS_WITH_TAG"]
+    assert 0 < stats["p50"] <= stats["p99"] <= stats["max"]
+
+    capfd.readouterr()
+    parser.execute_command(["STATS"])
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert lines[0].split()[:4] == ["operation", "calls", "errors", "results"]
+    assert lines[4].split()[:4] == ["find_videos_with_tag", "2", "0", "3"]
+
+
+def test_stats_without_metrics(capfd):
+    parser = CommandParser(VideoPlayer())
+    parser.execute_command(["STATS"])
+    out, err = capfd.readouterr()
+    assert out == "Statistics are not being collected.\n"
+
+
+def test_prometheus_dump(tmp_path):
+    metrics = Metrics()
+    metrics.observe("PLAY", 2_000_000)
+    metrics.observe("PLAY", 4_000_000, error=True)
+    path = tmp_path / "metrics.prom"
+    metrics.write_prometheus(path)
+    text = path.read_text()
+    assert "# TYPE youtube_operation_latency_seconds summary" in text
+    assert ('youtube_operation_latency_seconds_count{operation="PLAY"} 2'
+            in text)
+    assert ('youtube_operation_latency_seconds_sum{operation="PLAY"} '
+            '0.006000000' in text)
+    assert 'youtube_operation_errors_total{operation="PLAY"} 1' in text
+    assert list(tmp_path.iterdir()) == [path]
@@ -236,3 +236,23 @@ def test_continue_none_playing(capfd):
     lines = out.splitlines()
     assert len(lines) == 1
     assert "Cannot continue video: No video is currently playing" in lines[0]
+
+
+def test_play_random_video_with_seed_is_reproducible(capfd):
+    outputs = []
+    for _ in range(2):
+        player = VideoPlayer(seed=42)
+        for _ in range(5):
+            player.play_random_video()
+        out, err = capfd.readouterr()
+        outputs.append(out)
+    assert outputs[0] == outputs[1]
+    assert len(outputs[0].splitlines()) == 9
+
+
+def test_iter_all_videos_streams_rows():
+    player = VideoPlayer()
+    rows = player.iter_all_videos(offset=3)
+    assert next(rows) == "\t Life at Google (life_at_google_video_id) [#google #career]"
+    assert next(rows) == "\t Video about nothing (nothing_video_id) []"
+    assert next(rows, None) is None
@@ -235,3 +235,21 @@ def test_delete_playlist_nonexistent(capfd):
     lines = out.splitlines()
     assert len(lines) == 1
     assert "Cannot delete playlist my_cool_playlist: Playlist does not exist" in lines[0]
+
+
+def test_remove_from_playlist_keeps_order_of_other_videos(capfd):
+    player = VideoPlayer()
+    player.create_playlist("my_playlist")
+    player.add_to_playlist("my_playlist", "nothing_video_id")
+    player.add_to_playlist("my_playlist", "amazing_cats_video_id")
+    player.add_to_playlist("my_playlist", "funny_dogs_video_id")
+    player.remove_from_playlist("my_playlist", "amazing_cats_video_id")
+    player.add_to_playlist("my_playlist", "amazing_cats_video_id")
+    player.show_playlist("my_playlist")
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert len(lines) == 10
+    assert "Showing playlist: my_playlist" in lines[6]
+    assert "Video about nothing (nothing_video_id) []" in lines[7]
+    assert "Funny Dogs (funny_dogs_video_id) [#dog #animal]" in lines[8]
+    assert "Amazing Cats (amazing_cats_video_id) [#cat #animal]" in lines[9]
@@ -140,3 +140,65 @@ def test_search_videos_tag_no_results(capfd):
     lines = out.splitlines()
     assert len(lines) == 1
     assert "No search results for #blah" in lines[0]
+
+
+def test_iter_search_results_streams_numbered_rows():
+    player = VideoPlayer()
+    assert list(player.iter_search_results("cat", limit=1)) == [
+        "\t1) Amazing Cats (amazing_cats_video_id) [#cat #animal]"]
+    assert list(player.iter_tag_results("#ANIMAL", offset=2)) == [
+        "\t3) Funny Dogs (funny_dogs_video_id) [#dog #animal]"]
+
+
+@mock.patch('builtins.input', lambda *args: '1')
+def test_search_videos_top_ranks_whole_words_first(capfd):
+    player = VideoPlayer()
+    player.search_videos_top("cat", 2)
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert len(lines) == 6
+    assert "Here are the results for cat:" in lines[0]
+    assert "1) Another Cat Video (another_cat_video_id) [#cat #animal]" in lines[1]
+    assert "2) Amazing Cats (amazing_cats_video_id) [#cat #animal]" in lines[2]
+    assert "Playing video: Another Cat Video" in lines[5]
+
+
+@mock.patch('builtins.input', lambda *args: 'No')
+def test_search_videos_top_ranks_earlier_matches_first(capfd):
+    player = VideoPlayer()
+    player.search_videos_top("o", 3)
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert len(lines) == 6
+    assert "1) Another Cat Video (another_cat_video_id) [#cat #animal]" in lines[1]
+    assert "2) Video about nothing (nothing_video_id) []" in lines[2]
+    assert "3) Funny Dogs (funny_dogs_video_id) [#dog #animal]" in lines[3]
+
+
+def test_non_interactive_search_then_play_result(capfd):
+    player = VideoPlayer(interactive=False)
+    player.play_result("1")
+    videos = player.find_videos("cat")
+    player.search_videos("cat", limit=1)
+    player.play_result("2")
+    player.play_result("1")
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert [video.title for video in videos] == [
+        "Amazing Cats", "Another Cat Video"]
+    assert len(lines) == 6
+    assert "Cannot play result: No search results to choose from" in lines[0]
+    assert "Here are the results for cat:" in lines[1]
+    assert "1) Amazing Cats (amazing_cats_video_id) [#cat #animal]" in lines[2]
+    assert "Use PLAY_RESULT <number> to play any of the above." in lines[3]
+    assert ("Cannot play result: Result number is not in the last search "
+            "results") in lines[4]
+    assert "Playing video: Amazing Cats" in lines[5]
+
+
+def test_find_videos_with_tag_does_not_print(capfd):
+    player = VideoPlayer(interactive=False)
+    videos = player.find_videos_with_tag("#CAREER")
+    out, err = capfd.readouterr()
+    assert out == ""
+    assert [video.video_id for video in videos] == ["life_at_google_video_id"]
@@ -269,3 +269,17 @@ def test_allow_video_show_playlist(capfd):
     assert "Successfully removed flag from video: Amazing Cats" in lines[5]
     assert "Showing playlist: my_playlist" in lines[6]
     assert "Amazing Cats (amazing_cats_video_id) [#cat #animal]" in lines[7]
+
+
+def test_allow_video_can_play_random_again(capfd):
+    player = VideoPlayer()
+    for video_id in ["funny_dogs_video_id", "amazing_cats_video_id",
+                     "another_cat_video_id", "life_at_google_video_id",
+                     "nothing_video_id"]:
+        player.flag_video(video_id)
+    player.allow_video("nothing_video_id")
+    player.play_random_video()
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert len(lines) == 7
+    assert "Playing video: Video about nothing" in lines[6]
@@ -0,0 +1,50 @@
+import subprocess
+import sys
+from pathlib import Path
+
+_PYTHON_DIR = Path(__file__).parent.parent
+
+_SCRIPT = """NUMBER_OF_VIDEOS
+SHOW_ALL_VIDEOS
+play amazing_cats_video_id
+SEARCH_VIDEOS cat
+2
+CREATE_PLAYLIST my_playlist
+ADD_TO_PLAYLIST my_playlist nothing_video_id
+SHOW_PLAYLIST my_playlist
+PLAY
+FLAG_VIDEO another_cat_video_id
+SHOW_PLAYING
+"""
+
+
+def _run(*args, script):
+    return subprocess.run(
+        [sys.executable, "-m", "src.run", *args], input=script.encode(),
+        cwd=_PYTHON_DIR, capture_output=True, check=True).stdout
+
+
+def test_script_mode_matches_interactive_mode(tmp_path):
+    script_file = tmp_path / "commands.txt"
+    script_file.write_text(_SCRIPT)
+
+    interactive = _run(script=_SCRIPT + "EXIT\n")
+    assert b"Playing video: Another Cat Video" in interactive
+    assert _run("--script", str(script_file), script="") == interactive
+    assert _run("--script", "-", script=_SCRIPT) == interactive
+
+
+def test_empty_search_page_does_not_wait_for_an_answer():
+    output = _run(script="SEARCH_VIDEOS_WITH_TAG #cat --offset 5\n"
+                         "SHOW_PLAYLIST nope\nEXIT\n").decode()
+    assert "No search results for #cat on this page (2 in total)" in output
+    assert "Would you like to play" not in output
+    assert "Cannot show playlist nope: Playlist does not exist" in output
+
+
+def test_snapshot_option_compiles_and_reuses_the_catalog(tmp_path):
+    snapshot = tmp_path / "videos.snapshot"
+    plain = _run(script=_SCRIPT + "EXIT\n")
+    assert _run("--snapshot", str(snapshot), script=_SCRIPT) == plain
+    assert snapshot.exists()
+    assert _run("--snapshot", str(snapshot), script=_SCRIPT) == plain
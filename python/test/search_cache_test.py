@@ -0,0 +1,102 @@
+from src.search_cache import SearchCache
+from src.video import Video
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+
+
+def _titles(rows):
+    return [row.split(") ", 1)[1].split(" (")[0] for row in rows]
+
+
+def test_repeated_searches_hit_the_cache():
+    player = VideoPlayer()
+    list(player.iter_search_results("cat"))
+    list(player.iter_search_results("CAT"))
+    list(player.iter_tag_results("#cat"))
+    stats = player.search_cache_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["size"] == 2
+
+
+def test_least_recently_used_query_is_evicted():
+    player = VideoPlayer(search_cache_size=2)
+    list(player.iter_search_results("cat"))
+    list(player.iter_search_results("dog"))
+    list(player.iter_search_results("cat"))
+    list(player.iter_search_results("google"))
+    list(player.iter_search_results("cat"))
+    stats = player.search_cache_stats()
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 2
+    list(player.iter_search_results("dog"))
+    assert player.search_cache_stats()["misses"] == 4
+
+
+def test_flag_and_allow_invalidate_only_affected_queries(capfd):
+    player = VideoPlayer()
+    list(player.iter_search_results("cat"))
+    list(player.iter_search_results("dog"))
+    list(player.iter_tag_results("#animal"))
+
+    player.flag_video("amazing_cats_video_id")
+    assert player.search_cache_stats()["invalidations"] == 2
+    assert _titles(player.iter_search_results("cat")) == ["Another Cat Video"]
+    assert _titles(player.iter_search_results("dog")) == ["Funny Dogs"]
+    assert player.search_cache_stats()["hits"] == 1
+
+    player.allow_video("amazing_cats_video_id")
+    assert player.search_cache_stats()["invalidations"] == 3
+    assert _titles(player.iter_tag_results("#ANIMAL")) == [
+        "Amazing Cats", "Another Cat Video", "Funny Dogs"]
+
+
+def test_library_changes_invalidate_affected_queries():
+    library = VideoLibrary()
+    player = VideoPlayer(video_library=library)
+    assert _titles(player.iter_search_results("cat")) == [
+        "Amazing Cats", "Another Cat Video"]
+    assert _titles(player.iter_search_results("google")) == ["Life at Google"]
+
+    library.add_video(Video("Cat Nap", "cat_nap_video_id", ["#cat"]))
+    library.remove_video("amazing_cats_video_id")
+    assert _titles(player.iter_search_results("cat")) == [
+        "Another Cat Video", "Cat Nap"]
+    assert player.search_cache_stats()["invalidations"] == 1
+    assert player.search_cache_stats()["hits"] == 0
+    list(player.iter_search_results("google"))
+    assert player.search_cache_stats()["hits"] == 1
+
+
+def test_disabled_cache_stores_nothing():
+    cache = SearchCache(0)
+    cache.put(("title", "cat"), [])
+    assert cache.get(("title", "cat")) is None
+    assert len(cache) == 0
+
+
+def test_closed_players_stop_listening_to_the_library():
+    library = VideoLibrary()
+    events = []
+    library.subscribe(lambda event, video: events.append(event))
+    for _ in range(10):
+        VideoPlayer(video_library=library).close()
+        VideoPlayer(video_library=library, search_cache_size=0).close()
+    assert len(library._listeners) == 1
+
+
+def test_reload_clears_the_cache_once(tmp_path):
+    path = tmp_path / "videos.txt"
+    path.write_text("Funny Dogs | funny_dogs_video_id | #dog\n"
+                    "Amazing Cats | amazing_cats_video_id | #cat\n")
+    library = VideoLibrary(path)
+    cache = SearchCache(8)
+    library.subscribe(cache.video_changed)
+    for query in ("dogs", "cats", "zebra"):
+        cache.put(("title", query), library.search_titles(query))
+
+    path.write_text("Funny Dogs | funny_dogs_video_id | #dog\n"
+                    "Zebra Crossing | zebra_video_id | #zebra\n"
+                    "Cat Nap | cat_nap_video_id | #cat\n")
+    library.reload()
+    assert len(cache) == 0 and cache.invalidations == 3
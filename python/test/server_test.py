@@ -0,0 +1,101 @@
+from src.server import CommandServer, GOODBYE, PROMPT
+from src.session_manager import SessionManager
+import asyncio
+import pytest
+import socket
+
+
+async def _command(reader, writer, command):
+    writer.write(command.encode() + b"\n")
+    response = await reader.readuntil(PROMPT.encode())
+    return response.decode()[:-len(PROMPT)]
+
+
+def test_connections_have_their_own_sessions():
+    async def scenario():
+        server = CommandServer()
+        host, port = await server.start_tcp()
+        first = await asyncio.open_connection(host, port)
+        second = await asyncio.open_connection(host, port)
+        for reader, _ in (first, second):
+            greeting = await reader.readuntil(PROMPT.encode())
+            assert greeting.decode().startswith("Hello and welcome")
+
+        playing = await _command(*first, "PLAY amazing_cats_video_id")
+        idle = await _command(*second, "SHOW_PLAYING")
+        results = await _command(*second, "SEARCH_VIDEOS cat")
+        played = await _command(*second, "PLAY_RESULT 2")
+        unknown = await _command(*first, "PLAYY")
+        first[1].write(b"EXIT\n")
+        goodbye = await first[0].read()
+        await server.shutdown()
+        closing = await second[0].read()
+        return playing, idle, results, played, unknown, goodbye, closing
+
+    (playing, idle, results, played, unknown, goodbye,
+     closing) = asyncio.run(scenario())
+    assert playing == "Playing video: Amazing Cats\n"
+    assert idle == "No video is currently playing\n"
+    assert "2) Another Cat Video (another_cat_video_id)" in results
+    assert "Use PLAY_RESULT <number> to play any of the above." in results
+    assert played == "Playing video: Another Cat Video\n"
+    assert "Please enter a valid command" in unknown
+    assert goodbye.decode() == GOODBYE
+    assert closing.decode() == GOODBYE
+
+
+def test_servers_share_a_socket_and_library():
+    pytest.importorskip("multiprocessing.shared_memory")
+    from src.shared_library import SharedVideoLibrary
+
+    async def scenario(library, sock):
+        servers = [CommandServer(SessionManager(library, search_cache_size=0))
+                   for _ in range(2)]
+        # Like forked workers, each server gets its own copy of the socket.
+        for server in servers:
+            await server.start_socket(sock.dup())
+        host, port = sock.getsockname()[:2]
+        connections = [await asyncio.open_connection(host, port)
+                       for _ in range(2)]
+        for reader, _ in connections:
+            await reader.readuntil(PROMPT.encode())
+        flagged = await _command(*connections[0],
+                                 "FLAG_VIDEO funny_dogs_video_id")
+        again = await _command(*connections[1],
+                               "FLAG_VIDEO funny_dogs_video_id")
+        for server in servers:
+            await server.shutdown()
+        return flagged, again
+
+    library = SharedVideoLibrary()
+    sock = socket.create_server(("127.0.0.1", 0))
+    try:
+        flagged, again = asyncio.run(scenario(library, sock))
+    finally:
+        sock.close()
+        library.close()
+    assert flagged == (
+        "Successfully flagged video: Funny Dogs (reason: Not supplied)\n")
+    assert again == "Cannot flag video: Video is already flagged\n"
+
+
+def test_failing_command_keeps_the_session(monkeypatch, caplog):
+    def fail(player):
+        raise ValueError("broken")
+
+    monkeypatch.setattr("src.video_player.VideoPlayer.number_of_videos", fail)
+
+    async def scenario():
+        server = CommandServer()
+        host, port = await server.start_tcp()
+        connection = await asyncio.open_connection(host, port)
+        await connection[0].readuntil(PROMPT.encode())
+        failed = await _command(*connection, "NUMBER_OF_VIDEOS")
+        playing = await _command(*connection, "PLAY amazing_cats_video_id")
+        await server.shutdown()
+        return failed, playing
+
+    failed, playing = asyncio.run(scenario())
+    assert failed == "Cannot run command: An internal error occurred\n"
+    assert playing == "Playing video: Amazing Cats\n"
+    assert "Command 'NUMBER_OF_VIDEOS' failed" in caplog.text
@@ -0,0 +1,50 @@
+from src.session_manager import SessionManager
+
+
+def test_sessions_have_their_own_playback_state(capfd):
+    manager = SessionManager()
+    first_id, first = manager.open_session()
+    second_id, second = manager.open_session()
+    first.play_video("amazing_cats_video_id")
+    first.pause_video()
+    second.play_video("amazing_cats_video_id")
+    first.show_playing()
+    second.show_playing()
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert len(lines) == 5
+    assert ("Currently playing: Amazing Cats (amazing_cats_video_id) "
+            "[#cat #animal] - PAUSED") in lines[3]
+    assert lines[4].endswith("[#cat #animal]")
+    assert first_id != second_id
+    assert len(manager) == 2
+
+
+def test_sessions_share_the_library_and_search_cache(capfd):
+    manager = SessionManager()
+    _, first = manager.open_session()
+    _, second = manager.open_session()
+    first.play_video("amazing_cats_video_id")
+    second.play_video("amazing_cats_video_id")
+    assert len(first.find_videos("cat")) == 2
+
+    second.flag_video("amazing_cats_video_id", "dont_like_cats")
+    assert [video.title for video in first.find_videos("cat")] == [
+        "Another Cat Video"]
+    first.show_playing()
+    second.show_playing()
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert "Currently playing: Amazing Cats" in lines[-2]
+    assert "No video is currently playing" in lines[-1]
+    assert manager.search_cache_stats()["invalidations"] == 1
+
+
+def test_close_session():
+    manager = SessionManager()
+    session_id, player = manager.open_session()
+    assert manager.get_session(session_id) is player
+    assert manager.close_session(session_id) is player
+    assert manager.get_session(session_id) is None
+    assert manager.close_session(session_id) is None
+    assert len(manager) == 0
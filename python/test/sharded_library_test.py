@@ -0,0 +1,34 @@
+import pytest
+
+from src.sharded_library import ShardedVideoLibrary, shard_of
+from src.video_player import VideoPlayer
+
+
+@pytest.fixture
+def sharded(catalog):
+    library = ShardedVideoLibrary(catalog, shards=3)
+    yield library
+    library.close()
+
+
+def test_videos_are_spread_over_the_shards():
+    shards = {shard_of(f"video_{i}_id", 4) for i in range(100)}
+    assert shards == {0, 1, 2, 3}
+
+
+def test_shard_errors_are_raised(tmp_path):
+    path = tmp_path / "videos.txt"
+    path.write_text("Funny Dogs | funny_dogs_video_id\n")
+    with pytest.raises(ValueError):
+        ShardedVideoLibrary(path, shards=2)
+
+
+def test_player_with_sharded_library(capfd, sharded):
+    player = VideoPlayer(video_library=sharded, interactive=False)
+    player.flag_video("amazing_cats_video_id", "dont_like_cats")
+    player.search_videos_tag("#cat")
+    out, err = capfd.readouterr()
+    assert out.splitlines()[1:4] == [
+        "Here are the results for #cat:",
+        "\t1) Amazing Cats (more_cats_video_id) [#cat]",
+        "\t2) Another Cat Video (another_cat_video_id) [#cat #animal]"]
@@ -0,0 +1,63 @@
+import multiprocessing
+
+import pytest
+
+pytest.importorskip("multiprocessing.shared_memory")
+
+from src.shared_library import SharedVideoLibrary
+from src.video_player import VideoPlayer
+
+
+@pytest.fixture
+def shared(catalog):
+    library = SharedVideoLibrary(catalog)
+    yield library
+    library.close()
+
+
+def test_flag_reasons_are_compacted(catalog):
+    shared = SharedVideoLibrary(catalog, reason_capacity=16)
+    try:
+        for _ in range(5):
+            assert shared.flag_video("cafe_video_id", "twelve bytes")
+            assert shared.allow_video("cafe_video_id")
+        assert shared.flag_video("nothing_video_id", "ten bytes!")
+        with pytest.raises(ValueError):
+            shared.flag_video("cafe_video_id", "twelve bytes")
+        assert shared.get_video("nothing_video_id").flag_reason == (
+            "ten bytes!")
+    finally:
+        shared.close()
+
+
+def _flag_in_worker(library, video_id, results):
+    results.put(library.flag_video(video_id, "from_worker"))
+    results.put(len(library.search_titles("cat")))
+    library.close()
+
+
+@pytest.mark.parametrize("start_method", ["fork", "spawn"])
+def test_workers_share_the_catalog_and_flags(catalog, start_method):
+    context = multiprocessing.get_context(start_method)
+    shared = SharedVideoLibrary(catalog, context=context)
+    results = context.Queue()
+    worker = context.Process(target=_flag_in_worker,
+                             args=(shared, "another_cat_video_id", results))
+    worker.start()
+    assert results.get(timeout=30) is True
+    assert results.get(timeout=30) == 4
+    worker.join()
+    assert shared.get_video("another_cat_video_id").flag_reason == (
+        "from_worker")
+    shared.close()
+
+
+def test_player_with_shared_library(capfd, shared):
+    player = VideoPlayer(video_library=shared, search_cache_size=0,
+                         interactive=False)
+    player.flag_video("amazing_cats_video_id", "dont_like_cats")
+    player.search_videos("cats")
+    out, err = capfd.readouterr()
+    assert out.splitlines()[1:3] == [
+        "Here are the results for cats:",
+        "\t1) Amazing Cats (more_cats_video_id) [#cat]"]
@@ -0,0 +1,86 @@
+from src.state_journal import StateJournal
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+
+
+def _playlists(player, capfd):
+    capfd.readouterr()
+    player.show_all_playlists()
+    player.show_playlist("my_PLAYlist")
+    out, _ = capfd.readouterr()
+    return out
+
+
+def _make_changes(player):
+    player.create_playlist("my_PLAYlist")
+    player.create_playlist("other")
+    player.add_to_playlist("my_playlist", "amazing_cats_video_id")
+    player.add_to_playlist("my_playlist", "funny_dogs_video_id")
+    player.add_to_playlist("my_playlist", "life_at_google_video_id")
+    player.remove_from_playlist("my_playlist", "funny_dogs_video_id")
+    player.clear_playlist("other")
+    player.delete_playlist("other")
+    player.flag_video("another_cat_video_id", "dont_like_cats")
+    player.flag_video("nothing_video_id")
+    player.allow_video("nothing_video_id")
+
+
+def test_state_survives_restart(tmp_path, capfd):
+    player = VideoPlayer(journal=StateJournal(tmp_path))
+    _make_changes(player)
+    expected = _playlists(player, capfd)
+    player.close()
+
+    library = VideoLibrary()
+    restored = VideoPlayer(video_library=library,
+                           journal=StateJournal(tmp_path))
+    assert _playlists(restored, capfd) == expected
+    assert "Showing all playlists:\n\tmy_PLAYlist\n" in expected
+    assert "Funny Dogs" not in expected
+    assert library.get_video("another_cat_video_id").flag_reason == \
+        "dont_like_cats"
+    assert not library.get_video("nothing_video_id").is_flagged
+    restored.close()
+
+
+def test_snapshot_compacts_the_journal(tmp_path, capfd):
+    player = VideoPlayer(journal=StateJournal(tmp_path, snapshot_every=5))
+    _make_changes(player)
+    player.create_playlist("late")
+    expected = _playlists(player, capfd)
+    player.close()
+
+    assert (tmp_path / "state.snapshot").exists()
+    assert len(list(tmp_path.glob("*.journal"))) == 1
+    journal = StateJournal(tmp_path)
+    # The snapshot taken after 10 changes, then the journal tail.
+    assert list(journal.recover()) == [
+        ["create", "my_PLAYlist"],
+        ["add", "my_playlist", "amazing_cats_video_id"],
+        ["add", "my_playlist", "life_at_google_video_id"],
+        ["flag", "another_cat_video_id", "dont_like_cats"],
+        ["flag", "nothing_video_id", "Not supplied"],
+        ["allow", "nothing_video_id"],
+        ["create", "late"]]
+    journal.close()
+
+    restored = VideoPlayer(journal=StateJournal(tmp_path))
+    assert _playlists(restored, capfd) == expected
+    restored.close()
+
+
+def test_torn_record_is_dropped(tmp_path):
+    journal = StateJournal(tmp_path)
+    list(journal.recover())
+    journal.append("create", "first")
+    journal.append("create", "second")
+    journal.close()
+    segment = next(tmp_path.glob("*.journal"))
+    segment.write_bytes(segment.read_bytes()[:-3])
+
+    journal = StateJournal(tmp_path)
+    assert list(journal.recover()) == [["create", "first"]]
+    journal.append("create", "third")
+    journal.close()
+    assert list(StateJournal(tmp_path).recover()) == [
+        ["create", "first"], ["create", "third"]]
@@ -0,0 +1,47 @@
+import pytest
+
+from src import video_file
+from src.video_file import (_read_video_file, line_aligned_ranges,
+                            read_video_file_parallel)
+from src.video_library import VideoLibrary
+
+
+def _write_catalog(path, count):
+    with open(path, "w", newline="") as catalog:
+        for i in range(count):
+            tags = "#café , #tag%d" % (i % 7) if i % 3 else ""
+            ending = "\r\n" if i % 5 == 0 else "\n"
+            # Every tenth line repeats an earlier id with a new title.
+            video_id = f"video_{i - 5 if i % 10 == 9 else i}_id"
+            catalog.write(f"Vidéo {i} | {video_id} | {tags}{ending}")
+    return path
+
+
+def test_ranges_start_on_lines_and_cover_the_file(tmp_path):
+    path = _write_catalog(tmp_path / "videos.txt", 200)
+    data = path.read_bytes()
+    ranges = line_aligned_ranges(path, 7)
+    assert len(ranges) == 7
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(data)
+    for (_, end), (start, _) in zip(ranges, ranges[1:]):
+        assert end == start
+        assert data[start - 1:start] == b"\n"
+    assert line_aligned_ranges(path, 1) == [(0, len(data))]
+
+
+@pytest.mark.parametrize("workers", [2, 3])
+def test_parallel_parse_matches_sequential_parse(tmp_path, monkeypatch,
+                                                 workers):
+    monkeypatch.setattr(video_file, "_MIN_RANGE_SIZE", 256)
+    path = _write_catalog(tmp_path / "videos.txt", 500)
+    assert list(read_video_file_parallel(path, workers)) == list(
+        _read_video_file(path))
+
+    sequential = VideoLibrary(path)
+    parallel = VideoLibrary(path, workers=workers)
+    assert len(parallel) == len(sequential) == 450
+    assert [(video.title, video.video_id, video.tags)
+            for video in parallel.get_all_videos()] == [
+        (video.title, video.video_id, video.tags)
+        for video in sequential.get_all_videos()]
+    assert parallel.get_video("video_4_id").title == "Vidéo 9"
@@ -0,0 +1,141 @@
+import os
+import random
+
+from src import video_library, video_snapshot
+from src.video import Video
+from src.video_library import VideoLibrary
+from src.video_snapshot import load_snapshot
+
+
+def _write_videos(path, text):
+    path.write_text(text)
+    return path
+
+
+def test_snapshot_round_trip(tmp_path):
+    source = _write_videos(
+        tmp_path / "videos.txt",
+        "Funny Dogs | funny_dogs_video_id |  #dog , #animal\n"
+        "Café Cats | cafe_cats_video_id |  #cat , #animal\n"
+        "Video about nothing | nothing_video_id |\n")
+    snapshot = tmp_path / "videos.snapshot"
+
+    library = VideoLibrary(source, snapshot)
+    assert snapshot.exists()
+    assert load_snapshot(snapshot, source).records == [
+        (video.title, video.video_id, tuple(video.tags))
+        for video in library.get_all_videos()]
+
+    cached = VideoLibrary(source, snapshot)
+    assert [(video.title, video.video_id, video.tags)
+            for video in cached.get_all_videos()] == [
+        (video.title, video.video_id, video.tags)
+        for video in library.get_all_videos()]
+    assert cached.videos_with_tag("#animal")[0].title == "Café Cats"
+
+
+def test_snapshot_is_rebuilt_when_source_changes(tmp_path):
+    source = _write_videos(
+        tmp_path / "videos.txt", "Funny Dogs | funny_dogs_video_id | #dog\n")
+    snapshot = tmp_path / "videos.snapshot"
+    VideoLibrary(source, snapshot)
+
+    _write_videos(source, "Funny Cats | funny_cats_video_id | #cat\n")
+    os.utime(source, ns=(0, 0))
+    assert load_snapshot(snapshot, source) is None
+
+    library = VideoLibrary(source, snapshot)
+    assert library.get_video("funny_dogs_video_id") is None
+    assert load_snapshot(snapshot, source).records == [
+        ("Funny Cats", "funny_cats_video_id", ("#cat",))]
+
+
+def test_snapshot_survives_touching_the_source(tmp_path):
+    source = _write_videos(
+        tmp_path / "videos.txt", "Funny Dogs | funny_dogs_video_id | #dog\n")
+    snapshot = tmp_path / "videos.snapshot"
+    VideoLibrary(source, snapshot)
+
+    os.utime(source, ns=(0, 0))
+    assert load_snapshot(snapshot, source).records == [
+        ("Funny Dogs", "funny_dogs_video_id", ("#dog",))]
+
+
+def test_touched_source_is_hashed_once(tmp_path, monkeypatch):
+    source = _write_videos(
+        tmp_path / "videos.txt", "Funny Dogs | funny_dogs_video_id | #dog\n")
+    snapshot = tmp_path / "videos.snapshot"
+    VideoLibrary(source, snapshot)
+    os.utime(source, ns=(0, 0))
+
+    digests = []
+    digest = video_snapshot._source_digest
+    monkeypatch.setattr(video_snapshot, "_source_digest",
+                        lambda path: digests.append(path) or digest(path))
+    for _ in range(3):
+        library = VideoLibrary(source, snapshot)
+        assert library.get_video("funny_dogs_video_id").title == "Funny Dogs"
+    assert digests == [source]
+
+
+def test_corrupt_snapshot_is_ignored(tmp_path):
+    source = _write_videos(
+        tmp_path / "videos.txt", "Funny Dogs | funny_dogs_video_id | #dog\n")
+    snapshot = tmp_path / "videos.snapshot"
+    snapshot.write_bytes(b"YTVS garbage")
+
+    library = VideoLibrary(source, snapshot)
+    assert library.get_video("funny_dogs_video_id").title == "Funny Dogs"
+    assert load_snapshot(snapshot, source) is not None
+
+
+def test_snapshot_restores_the_indexes(catalog, tmp_path, monkeypatch,
+                                       summary):
+    snapshot = tmp_path / "videos.snapshot"
+    parsed = VideoLibrary(catalog, snapshot)
+
+    def no_parse(*args):
+        raise AssertionError("the videos file was parsed")
+
+    monkeypatch.setattr(video_library, "read_video_file_parallel", no_parse)
+    cached = VideoLibrary(catalog, snapshot)
+    assert summary(cached.get_all_videos()) == summary(
+        parsed.get_all_videos())
+    assert summary(cached.videos_sorted_by_title()) == summary(
+        parsed.videos_sorted_by_title())
+    for term in ["", "a", "cat", "CAFÉ", "kel", "nothing", "xyz"]:
+        assert summary(cached.search_titles(term)) == summary(
+            parsed.search_titles(term)), term
+    for tag in ["#cat", "#café", "#dog", "#blah"]:
+        assert summary(cached.videos_with_tag(tag)) == summary(
+            parsed.videos_with_tag(tag)), tag
+
+    for library in (parsed, cached):
+        library.flag_video("more_cats_video_id", "too_many_cats")
+        library.remove_video("cat_nap_video_id")
+        library.add_video(Video("Cat Nap 2", "cat_nap_2_video_id", ["#cat"]))
+    assert summary(cached.search_titles("cat")) == summary(
+        parsed.search_titles("cat"))
+    assert summary(cached.get_all_videos()) == summary(
+        parsed.get_all_videos())
+    assert cached.random_playable_video(random.Random(0)) is not None
+
+
+def test_snapshot_is_not_written_when_the_source_changes_while_parsed(
+        tmp_path, monkeypatch):
+    source = _write_videos(
+        tmp_path / "videos.txt", "Funny Dogs | funny_dogs_video_id | #dog\n")
+    snapshot = tmp_path / "videos.snapshot"
+    parse = video_library.read_video_file_parallel
+
+    def parse_then_edit(*args):
+        records = list(parse(*args))
+        # A same-size edit, with a new mtime.
+        _write_videos(source, "Funny Cats | funny_cats_video_id | #cat\n")
+        os.utime(source, ns=(0, 0))
+        return records
+
+    monkeypatch.setattr(video_library, "read_video_file_parallel",
+                        parse_then_edit)
+    VideoLibrary(source, snapshot)
+    assert not snapshot.exists()
@@ -1,4 +1,5 @@
 from src.video_library import VideoLibrary
+from src.video import Video
 
 
 def test_library_has_all_videos():
@@ -24,3 +25,62 @@ def test_parses_video_correctly_without_tags():
     assert video.title == "Video about nothing"
     assert video.video_id == "nothing_video_id"
     assert video.tags == ()
+
+
+def test_search_titles_matches_sorted_scan():
+    library = VideoLibrary()
+    for term in ["", "a", "CAT", "at ", "video", "Life at Google", "xyz"]:
+        expected = [video for video in library.videos_sorted_by_title()
+                    if term.lower() in video.title.lower()]
+        assert library.search_titles(term) == expected
+
+
+def test_videos_with_tag_is_case_insensitive():
+    library = VideoLibrary()
+    videos = library.videos_with_tag("#CAT")
+    assert [video.video_id for video in videos] == [
+        "amazing_cats_video_id", "another_cat_video_id"]
+
+
+def test_indexes_follow_added_and_removed_videos():
+    library = VideoLibrary()
+    library.add_video(Video("Cat Nap", "cat_nap_video_id", ["#cat"]))
+    assert "cat_nap_video_id" in [
+        video.video_id for video in library.videos_with_tag("#cat")]
+    assert "cat_nap_video_id" in [
+        video.video_id for video in library.search_titles("nap")]
+
+    removed = library.remove_video("amazing_cats_video_id")
+    assert removed.title == "Amazing Cats"
+    assert library.get_video("amazing_cats_video_id") is None
+    assert [video.video_id for video in library.videos_with_tag("#cat")] == [
+        "another_cat_video_id", "cat_nap_video_id"]
+    assert library.search_titles("amazing") == []
+    assert library.remove_video("amazing_cats_video_id") is None
+
+
+def test_tags_are_shared_between_videos():
+    library = VideoLibrary()
+    amazing_cats = library.get_video("amazing_cats_video_id")
+    another_cat = library.get_video("another_cat_video_id")
+    funny_dogs = library.get_video("funny_dogs_video_id")
+    assert amazing_cats.tags is another_cat.tags
+    assert amazing_cats.tags[1] is funny_dogs.tags[1]
+
+
+def test_readded_video_is_listed_last():
+    library = VideoLibrary()
+    library.remove_video("funny_dogs_video_id")
+    library.add_video(Video("Cat Nap", "cat_nap_video_id", ["#cat"]))
+    assert [video.video_id for video in library.videos_with_tag("#cat")] == [
+        "amazing_cats_video_id", "another_cat_video_id", "cat_nap_video_id"]
+
+
+def test_videos_sorted_by_title_follows_mutations():
+    library = VideoLibrary()
+    library.add_video(Video("Zebras", "amazing_cats_video_id", []))
+    library.add_video(Video("Amazing Cats", "cat_nap_video_id", []))
+    library.remove_video("life_at_google_video_id")
+    assert [video.video_id for video in library.videos_sorted_by_title()] == [
+        "cat_nap_video_id", "another_cat_video_id", "funny_dogs_video_id",
+        "nothing_video_id", "amazing_cats_video_id"]